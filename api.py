@@ -0,0 +1,411 @@
+# Headless HTTP API for FluentBot (plain ASGI, no web framework) - for the mobile client and other services
+#
+#   pip install -r requirements-api.txt
+#   python api.py --workers 4 --port 8000          # default: one worker per CPU core
+#   uvicorn api:app --port 8000                     # single process, e.g. behind your own supervisor
+#
+#   POST /v1/chat            {"message": "...", "history": [{"role": "user", "content": "..."}], "language": "French", "level": "Beginner"}
+#                            -> {"reply": "...", "degraded": false} ("degraded": true when the model didn't write it),
+#                               or 503 when nothing can answer
+#   POST /v1/chat/stream     same body - server-sent events: data: {"delta": "..."} ... data: [DONE]
+#                            (a non-model reply's event carries "degraded": true)
+#   GET  /v1/content/<language>/<level>/<roadmap|grammar|practice|vocab>
+#   GET  /healthz            process is up          GET /readyz    backend built and able to take traffic
+#   GET  /metrics            Prometheus metrics for the worker that answered
+#
+# Workers share the response cache and the upstream rate limit through SQLite files under .cache/.
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import hmac
+import itertools
+import json
+import os
+import sys
+import threading
+from urllib.parse import parse_qs, unquote
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+from content_pack import LANGUAGES, LEVELS, SECTIONS, get_section, load_content_pack, plain_name
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HISTORY_MESSAGES = 40
+ALLOWED_PRIORITIES = ("interactive", "background")
+
+_LANGUAGE_LABELS = {plain_name(label).lower(): label for label in LANGUAGES}
+_LEVEL_LABELS = {plain_name(label).lower(): label for label in LEVELS}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _State:
+    """
+    Per-worker state, filled in by the lifespan startup
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        self.startup_error: Optional[str] = None
+        self.pack = None
+        self.vocab = None
+        self.token = os.environ.get("FLUENTBOT_API_TOKEN", "")
+
+
+state = _State()
+
+# ---------------------------------------------------------------------------
+# Request / response helpers
+# ---------------------------------------------------------------------------
+
+
+async def read_body(receive) -> bytes:
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ApiError(400, "client disconnected")
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise ApiError(413, f"request body over {MAX_BODY_BYTES} bytes")
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+async def send_json(send, status: int, payload, headers: List[Tuple[bytes, bytes]] = ()):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_text(send, status: int, text: str, content_type: bytes = b"text/plain; charset=utf-8"):
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def resolve_label(name: str, labels: Dict[str, str], kind: str) -> str:
+    # Accept "French", "french" or the sidebar label "🇫🇷 French"
+    label = labels.get(plain_name(name).strip().lower())
+    if label is None:
+        raise ApiError(404, f"unknown {kind} {name!r}")
+    return label
+
+
+def parse_chat_request(body: bytes) -> Dict:
+    """
+    Validate a chat body into the arguments get_chat_response takes
+    """
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise ApiError(400, "body must be JSON")
+    if not isinstance(data, dict):
+        raise ApiError(400, "body must be a JSON object")
+
+    message = data.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise ApiError(400, "message is required")
+
+    history = data.get("history") or []
+    if not isinstance(history, list):
+        raise ApiError(400, "history must be a list")
+    chat_history = []
+    for item in history[-MAX_HISTORY_MESSAGES:]:
+        if not isinstance(item, dict) or item.get("role") not in ("user", "assistant") \
+                or not isinstance(item.get("content"), str):
+            raise ApiError(400, "history items need role 'user' or 'assistant' and string content")
+        chat_history.append({"role": item["role"], "content": item["content"]})
+
+    language_context = ""
+    if data.get("language") and data.get("level"):
+        language = resolve_label(str(data["language"]), _LANGUAGE_LABELS, "language")
+        level = resolve_label(str(data["level"]), _LEVEL_LABELS, "level")
+        # Same prefix the Streamlit app sends, so both front ends share cache entries
+        language_context = f"[Language Learning: {language} - {level}] "
+
+    priority = data.get("priority", "interactive")
+    if priority not in ALLOWED_PRIORITIES:
+        raise ApiError(400, f"priority must be one of {list(ALLOWED_PRIORITIES)}")
+
+    return {"user_input": message, "chat_history": chat_history, "language_context": language_context,
+            "priority": priority}
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+
+async def chat(scope, receive, send):
+    from backend import OFFLINE_HEADER, async_get_chat_response, is_local_reply
+
+    request = parse_chat_request(await read_body(receive))
+    reply = await async_get_chat_response(**request)
+    if reply.startswith(OFFLINE_HEADER):
+        # No answer at all - the offline notice is written for the app's users, not API clients
+        raise ApiError(503, "the chat model is unavailable right now - try again shortly")
+    # degraded: the answer came from the lesson library or lexicon, not the model
+    await send_json(send, 200, {"reply": reply, "degraded": is_local_reply(reply)})
+
+
+async def chat_stream(scope, receive, send):
+    from backend import is_local_reply, stream_chat_response
+
+    request = parse_chat_request(await read_body(receive))
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+    cancelled = threading.Event()
+
+    def _produce():
+        # The streaming client is blocking (requests), so it runs on a worker thread and hands deltas over
+        deltas = stream_chat_response(**request)
+        try:
+            for delta in deltas:
+                if cancelled.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(queue.put(delta), loop).result()
+        finally:
+            deltas.close()
+            asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")],
+    })
+    producer = loop.run_in_executor(None, _produce)
+    try:
+        while True:
+            delta = await queue.get()
+            if delta is None:
+                break
+            # The status is already sent, so a non-model answer (offline notice, lesson library, lexicon) is flagged
+            event = json.dumps({"delta": delta, "degraded": True} if is_local_reply(delta) else {"delta": delta},
+                               ensure_ascii=False)
+            await send({"type": "http.response.body", "body": f"data: {event}\n\n".encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+    finally:
+        # Client went away mid-stream: stop reading upstream and let the thread finish
+        cancelled.set()
+        while not producer.done():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.01)
+        await producer
+
+
+async def content(scope, receive, send, language: str, level: str, section: str):
+    language = resolve_label(unquote(language), _LANGUAGE_LABELS, "language")
+    level = resolve_label(unquote(level), _LEVEL_LABELS, "level")
+    if section not in SECTIONS:
+        raise ApiError(404, f"unknown section {section!r} - use one of {list(SECTIONS)}")
+    if state.vocab is None:
+        # Set once the pack (which may legitimately be missing) and the vocab store are loaded
+        raise ApiError(503, state.startup_error or "starting up")
+
+    if section == "vocab":
+        # Quiz words come from the indexed store: a random sample, not the whole level
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        try:
+            count = min(max(int(query.get("count", ["10"])[0]), 1), 100)
+        except ValueError:
+            raise ApiError(400, "count must be an integer")
+        deck = state.vocab.deck_with_fallback(language, level)
+        words = state.vocab.sample(deck.language, deck.level, count) if deck is not None else []
+        await send_json(send, 200, {"language": plain_name(language), "level": plain_name(level), "section": section,
+                                    "items": words})
+        return
+
+    value = get_section(state.pack, language, level, section)
+    if value is None:
+        raise ApiError(404, f"no {section} content for {plain_name(language)} / {plain_name(level)} yet")
+    await send_json(send, 200, {"language": plain_name(language), "level": plain_name(level), "section": section,
+                                "items": value}, headers=[(b"cache-control", b"public, max-age=3600")])
+
+
+async def healthz(scope, receive, send):
+    await send_json(send, 200, {"status": "ok", "pid": os.getpid()})
+
+
+async def readyz(scope, receive, send):
+    problems = []
+    if state.draining:
+        problems.append("shutting down")
+    elif not state.ready:
+        problems.append(state.startup_error or "starting")
+    else:
+        from backend import get_backend
+
+        backend = get_backend()
+        breakers = backend.resilience.stats()["models"]
+        if breakers and all(model["breaker"] == "open" for model in breakers.values()):
+            problems.append("every model's circuit breaker is open")
+        queue_depth = backend.scheduler.stats()["queue_depth"]
+        if queue_depth > int(os.environ.get("FLUENTBOT_API_MAX_QUEUE", "200")):
+            problems.append(f"rate-limit queue is {queue_depth} deep")
+    await send_json(send, 503 if problems else 200,
+                    {"ready": not problems, "problems": problems, "pid": os.getpid()})
+
+
+async def metrics(scope, receive, send):
+    from metrics import registry
+
+    await send_text(send, 200, registry.render_prometheus(), b"text/plain; version=0.0.4; charset=utf-8")
+
+
+ROUTES = {
+    ("POST", "/v1/chat"): chat,
+    ("POST", "/v1/chat/stream"): chat_stream,
+    ("GET", "/healthz"): healthz,
+    ("GET", "/readyz"): readyz,
+    ("GET", "/metrics"): metrics,
+}
+
+# Probes and scrapes stay open without a token
+PUBLIC_PATHS = ("/healthz", "/readyz", "/metrics")
+
+# ---------------------------------------------------------------------------
+# ASGI entry point
+# ---------------------------------------------------------------------------
+
+
+def _startup():
+    # Heavy, blocking work - run once per worker before it reports ready
+    from backend import get_backend
+    from lesson_index import get_lesson_index
+    from vocab_store import DEFAULT_VOCAB_PATH, VocabStore, build_vocab_store, builtin_entries, pack_entries
+
+    # Lesson content first: it needs no API key, so /v1/content keeps working if the backend can't be built
+    state.pack = load_content_pack()
+    vocab = VocabStore(DEFAULT_VOCAB_PATH)
+    if not vocab.available:
+        # Same fallback as the app: a small store from the pack + starter words (built atomically,
+        # so workers starting together don't trip over each other)
+        path = os.path.join(ROOT, ".cache", "vocab.db")
+        build_vocab_store(itertools.chain(builtin_entries(), pack_entries(state.pack)), path)
+        vocab = VocabStore(path)
+    state.vocab = vocab
+    get_backend()
+    get_lesson_index()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, _startup)
+                state.ready = True
+            except Exception as e:
+                # Stay up so /readyz can say why (a missing API key, usually)
+                state.startup_error = f"{type(e).__name__}: {e}"
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            state.draining = True
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _authorized(scope) -> bool:
+    if not state.token or scope["path"] in PUBLIC_PATHS:
+        return True
+    headers = dict(scope.get("headers") or [])
+    supplied = headers.get(b"authorization", b"")
+    return hmac.compare_digest(supplied, f"Bearer {state.token}".encode("utf-8"))
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"].rstrip("/") or "/"
+    try:
+        if not _authorized(scope):
+            raise ApiError(401, "missing or wrong bearer token")
+        handler = ROUTES.get((method, path))
+        if handler is not None:
+            if path.startswith("/v1/") and not state.ready:
+                raise ApiError(503, state.startup_error or "starting up")
+            await handler(scope, receive, send)
+            return
+
+        parts = path.split("/")
+        if len(parts) == 6 and parts[1] == "v1" and parts[2] == "content":
+            if method != "GET":
+                raise ApiError(405, "use GET")
+            await content(scope, receive, send, *parts[3:])
+            return
+        if any(route_path == path for _, route_path in ROUTES):
+            raise ApiError(405, f"{method} not allowed on {path}")
+        raise ApiError(404, f"no route for {path}")
+    except ApiError as e:
+        await send_json(send, e.status, {"error": e.message})
+
+# ---------------------------------------------------------------------------
+# Multi-worker launcher
+# ---------------------------------------------------------------------------
+
+
+def shared_state_env(cache_dir: str) -> Dict[str, str]:
+    """
+    Settings every worker inherits so they share one response cache and one upstream rate limit
+    """
+    return {
+        "FLUENTBOT_CACHE": os.environ.get("FLUENTBOT_CACHE", "1"),
+        "FLUENTBOT_CACHE_PATH": os.environ.get("FLUENTBOT_CACHE_PATH", os.path.join(cache_dir, "responses.db")),
+        "FLUENTBOT_RATE_LIMIT_PATH": os.environ.get("FLUENTBOT_RATE_LIMIT_PATH", os.path.join(cache_dir, "rate_limit.db")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the FluentBot HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: one per core)")
+    parser.add_argument("--cache-dir", default=os.path.join(ROOT, ".cache"), help="Where the shared SQLite files live")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("The API server needs uvicorn: pip install -r requirements-api.txt", file=sys.stderr)
+        return 1
+
+    os.environ.update(shared_state_env(args.cache_dir))
+    # /metrics is served per worker on the API port - a fixed metrics port would clash between workers
+    os.environ.pop("FLUENTBOT_METRICS_PORT", None)
+
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, app_dir=ROOT,
+                lifespan="on", log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,5 @@
-# Load environment variables FIRST - before any other imports
 import os
 
-# Try to load dotenv with error handling
-try:
-    from dotenv import load_dotenv
-    load_dotenv()  # Load .env file if available
-except ImportError:
-    # If dotenv is not available (like in some cloud environments), that's okay
-    # Environment variables can still be set directly
-    pass
-
 import streamlit as st
 
 st.set_page_config(
@@ -23,26 +13,53 @@ st.set_page_config(
 )
 
 import time
+import itertools
 import random
-from typing import List, Dict
+import re
+import sqlite3
+import threading
+import uuid
+from typing import List, Dict, Optional
+from functools import wraps
 from datetime import datetime
 
-# Check for required API key - check both env vars and Streamlit secrets
-api_key = os.environ.get("OPENROUTER_API_KEY")
-
-# Debug info for deployment troubleshooting
-debug_info = {"env_var_exists": bool(api_key)}
-
-# If not in environment variables, try Streamlit secrets
-if not api_key:
+@st.cache_resource(show_spinner=False)
+def load_config():
+    # Runs once per process instead of on every rerun
+    # Try to load dotenv with error handling
     try:
-        api_key = st.secrets["OPENROUTER_API_KEY"]
-        debug_info["secrets_exists"] = True
-    except Exception as e:
-        debug_info["secrets_exists"] = False
-        debug_info["secrets_error"] = str(e)
+        from dotenv import load_dotenv
+        load_dotenv()  # Load .env file if available
+    except ImportError:
+        # If dotenv is not available (like in some cloud environments), that's okay
+        # Environment variables can still be set directly
+        pass
+    
+    # Check for required API key - check both env vars and Streamlit secrets
+    api_key = os.environ.get("OPENROUTER_API_KEY")
+    
+    # Debug info for deployment troubleshooting
+    debug_info = {"env_var_exists": bool(api_key)}
+    
+    # If not in environment variables, try Streamlit secrets
+    if not api_key:
+        try:
+            api_key = st.secrets["OPENROUTER_API_KEY"]
+            debug_info["secrets_exists"] = True
+        except Exception as e:
+            debug_info["secrets_exists"] = False
+            debug_info["secrets_error"] = str(e)
+    
+    if api_key:
+        # Set the API key in environment for backend to use
+        os.environ["OPENROUTER_API_KEY"] = api_key
+    return api_key, debug_info
+
+api_key, debug_info = load_config()
 
 if not api_key:
+    # Don't cache the failure - pick up a key added to .env / secrets on the next rerun
+    load_config.clear()
     st.error("⚠️ OPENROUTER_API_KEY not found!")
     
     # Show debug info in development
@@ -67,16 +84,236 @@ if not api_key:
     """)
     st.stop()
 
-# Set the API key in environment for backend to use
-os.environ["OPENROUTER_API_KEY"] = api_key
+@st.cache_resource(show_spinner=False)
+def warm_backend():
+    # Import and build the backend (and the lesson index it answers from) once per process, off the
+    # render path - the first page doesn't wait for it, and it is usually ready by the first message
+    def _load():
+        try:
+            import backend
+            backend.get_backend()
+            backend.get_lesson_index()
+            backend.get_lexicon()
+        except Exception:
+            # The chat reports the problem when a message is actually sent
+            pass
+    
+    thread = threading.Thread(target=_load, name="fluentbot-backend-warmup", daemon=True)
+    thread.start()
+    return thread
+
+warm_backend()
+
+from content_pack import (
+    LANGUAGES, LEVELS, format_grammar, format_roadmap, get_section, load_content_pack, plain_name,
+)
+from chat_history import ChatHistory, Message, MessageLike
+from conversation_store import ConversationStore
+from grading import MAX_SCORE, grade_answer
+from learning_events import DEFAULT_LEARNING_PATH, LearningLog, empty_progress
+from lesson_index import get_lesson_index, parse_language_context
+from lexicon import NATIVE, answer_lookup, format_entry, get_lexicon, meaning_keys
+from prefetch import Prefetcher, generate_practice_items
+from profiler import RerunProfiler
+from srs import CardStore, SrsScheduler
+from vocab_store import DEFAULT_VOCAB_PATH, VocabStore, build_vocab_store, builtin_entries, pack_entries
+
+@st.cache_resource(show_spinner=False)
+def get_lesson_pack():
+    # Pre-generated lessons (see generate_content_packs.py) - loaded once per process, no API calls
+    return load_content_pack()
+
+@st.cache_resource(show_spinner=False)
+def get_vocab_store():
+    # The built store (python vocab_store.py) if present, otherwise a small one from the pack + starter words
+    store = VocabStore(DEFAULT_VOCAB_PATH)
+    if store.available:
+        return store
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "vocab.db")
+    build_vocab_store(itertools.chain(builtin_entries(), pack_entries(get_lesson_pack())), path)
+    return VocabStore(path)
+
+# 💾 Chats are saved to disk as they happen; each session keeps only its newest messages in memory
+CHAT_MEMORY_MESSAGES = int(os.environ.get("FLUENTBOT_CHAT_MEMORY", "40"))
+# Hard per-session cap on chat text held in memory (bytes, 0 = no cap)
+CHAT_MEMORY_BYTES = int(os.environ.get("FLUENTBOT_CHAT_MEMORY_BYTES", "262144"))
+
+@st.cache_resource(show_spinner=False)
+def get_conversation_store():
+    # One store per process (SQLite WAL, so several server processes can share the file)
+    path = os.environ.get("FLUENTBOT_CHAT_DB",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "conversations.db"))
+    if path.lower() in ("", "0", "off"):
+        return None
+    try:
+        store = ConversationStore(path, retention_days=float(os.environ.get("FLUENTBOT_CHAT_RETENTION_DAYS", "90")))
+    except (sqlite3.Error, OSError):
+        # Chat still works without history on disk - it just lives in the session like before
+        return None
+    store.start_compaction()
+    return store
+
+@st.cache_resource(show_spinner=False)
+def get_card_store():
+    # 🧠 Spaced-repetition cards per learner, so reviews (and catching up after a break) survive a refresh
+    path = os.environ.get("FLUENTBOT_SRS_DB",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "srs.db"))
+    if path.lower() in ("", "0", "off"):
+        return None
+    try:
+        return CardStore(path)
+    except (sqlite3.Error, OSError):
+        return None
+
+@st.cache_resource(show_spinner=False)
+def get_learning_log():
+    # 📈 Learning events and their running totals - "My Progress" reads the totals, never the whole log
+    path = os.environ.get("FLUENTBOT_LEARNING_DB", DEFAULT_LEARNING_PATH)
+    if path.lower() in ("", "0", "off"):
+        return None
+    try:
+        return LearningLog(path, retention_days=float(os.environ.get("FLUENTBOT_LEARNING_RETENTION_DAYS", "90")))
+    except (sqlite3.Error, OSError):
+        return None
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher():
+    # ⏩ Next practice questions are written in the background so "New Question" never waits on the API
+    depth = int(os.environ.get("FLUENTBOT_PREFETCH_DEPTH", "3"))
+    if depth <= 0:
+        return None
+    prefetcher = Prefetcher(depth=depth, idle_seconds=float(os.environ.get("FLUENTBOT_PREFETCH_IDLE", "300")))
+    from metrics import registry
+    registry.add_collector(prefetcher.gauges)
+    return prefetcher
 
-# Try to import backend
-try:
-    from backend import get_chat_response
-    backend_available = True
-except Exception as e:
-    backend_available = False
-    st.error(f"Backend not available: {str(e)}")
+def get_conversation_id() -> str:
+    # Kept in the URL (?chat=...) so a refresh or a server restart picks the conversation back up
+    params = getattr(st, "query_params", None)
+    if params is not None:
+        chat_id = params.get("chat", "")
+    else:
+        chat_id = (st.experimental_get_query_params().get("chat") or [""])[0]
+    if not re.fullmatch(r"[0-9a-f]{32}", chat_id):
+        chat_id = uuid.uuid4().hex
+        if params is not None:
+            params["chat"] = chat_id
+        else:
+            st.experimental_set_query_params(chat=chat_id)
+    return chat_id
+
+def load_chat_history(conversation_id: str) -> ChatHistory:
+    # Ring buffer of the newest messages; without a store only the byte cap applies, as nothing could be paged back in
+    store = get_conversation_store()
+    history = ChatHistory(max_messages=CHAT_MEMORY_MESSAGES if store is not None else 0,
+                          max_bytes=CHAT_MEMORY_BYTES, label=conversation_id)
+    if store is not None:
+        try:
+            history.extend(store.recent(conversation_id, CHAT_MEMORY_MESSAGES))
+        except sqlite3.Error:
+            pass
+    return history
+
+def remember_message(role: str, content: str):
+    # Append to the store and the in-memory ring buffer (which drops its oldest message when full)
+    message_id = None
+    store = get_conversation_store()
+    if store is not None:
+        try:
+            message_id = store.append(st.session_state.conversation_id, role, content)
+        except sqlite3.Error:
+            pass
+    st.session_state.chat_history.append(role, content, message_id)
+    log_event("message", role)
+
+def log_event(kind: str, item: str = "", level: Optional[str] = None, **fields):
+    # The learner is the conversation in the URL; analytics never get in the way of learning
+    log = get_learning_log()
+    if log is not None:
+        try:
+            log.record(st.session_state.conversation_id, kind, st.session_state.get("current_language", "🇫🇷 French"),
+                       level or st.session_state.get("current_level", "🌱 Beginner"), item, **fields)
+        except sqlite3.Error:
+            pass
+
+def learning_progress() -> Dict:
+    log = get_learning_log()
+    if log is not None:
+        try:
+            return log.progress(st.session_state.conversation_id)
+        except sqlite3.Error:
+            pass
+    return empty_progress()
+
+def chat_counts() -> Dict:
+    # Whole-conversation counts from the store, not just what is in memory
+    history = st.session_state.chat_history
+    store = get_conversation_store()
+    if store is not None:
+        try:
+            return store.counts(st.session_state.conversation_id)
+        except sqlite3.Error:
+            pass
+    return {"messages": len(history), "user_messages": sum(1 for msg in history if msg.role == "user")}
+
+# ⏱️ Opt-in rerun profiling: FLUENTBOT_PROFILE=1 times every session, ?debug=1 in the URL times this one
+# and shows the debug panel at the bottom of the page
+PROFILE_ALL = os.environ.get("FLUENTBOT_PROFILE", "0").lower() not in ("0", "false", "no", "off")
+
+@st.cache_resource(show_spinner=False)
+def get_profiler():
+    profiler = RerunProfiler(
+        window=int(os.environ.get("FLUENTBOT_PROFILE_WINDOW", "500")),
+        profile_dir=os.environ.get("FLUENTBOT_PROFILE_DIR",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "profiles")),
+    )
+    if PROFILE_ALL:
+        from metrics import add_endpoint
+        add_endpoint("/profile", profiler.stats)
+    return profiler
+
+def debug_mode() -> bool:
+    params = getattr(st, "query_params", None)
+    if params is not None:
+        value = params.get("debug", "")
+    else:
+        value = (st.experimental_get_query_params().get("debug") or [""])[0]
+    return value.lower() in ("1", "true", "yes", "on")
+
+def capture_requested() -> bool:
+    # "Profile my next action" is armed by its own rerun and captures the one after it
+    state = st.session_state.get("profile_capture")
+    if state == "armed":
+        st.session_state.profile_capture = "next"
+    elif state == "next":
+        del st.session_state.profile_capture
+        return True
+    return False
+
+def begin_profile(name: str = "rerun"):
+    get_profiler().begin(st.session_state.get("conversation_id", "new"), __file__, PROFILE_ALL or debug_mode(),
+                         capture_requested(), name)
+
+def profiled_fragment(name: str):
+    # A fragment rerunning on its own is timed as a run of its own ("fragment:<name>")
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = get_profiler()
+            if profiler.active():
+                return func(*args, **kwargs)
+            try:
+                begin_profile(f"fragment:{name}")
+                profiler.mark(name)
+                return func(*args, **kwargs)
+            finally:
+                profiler.end()
+        return wrapper
+    return decorate
+
+profiler = get_profiler()
+begin_profile()
+profiler.mark("css")
 
 # Enhanced CSS with dark ChatGPT-inspired theme
 st.markdown("""
@@ -185,10 +422,13 @@ header {visibility: hidden;}
 </style>
 """, unsafe_allow_html=True)
 
+profiler.mark("header")
+
 # Set up initial session state variables
 if "initialized" not in st.session_state:
     st.session_state.initialized = True
-    st.session_state.chat_history = []
+    st.session_state.conversation_id = get_conversation_id()
+    st.session_state.chat_history = load_chat_history(st.session_state.conversation_id)
     st.session_state.use_ai = True
 
 # Main app layout
@@ -199,6 +439,8 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
+profiler.mark("sidebar")
+
 # Sidebar with dark theme
 with st.sidebar:
     # Clean header
@@ -226,13 +468,7 @@ with st.sidebar:
     st.markdown("### 🌍 Choose Your Language")
     
     # Language selection with flags and names
-    languages = [
-        "🇫🇷 French", "🇯🇵 Japanese", "🇩🇪 German", "🇪🇸 Spanish", "🇮🇹 Italian",
-        "🇰🇷 Korean", "🇨🇳 Chinese (Mandarin)", "🇷🇺 Russian", "🇵🇹 Portuguese",
-        "🇳🇱 Dutch", "🇸🇦 Arabic", "🇮🇳 Hindi", "🇸🇪 Swedish", "🇳🇴 Norwegian",
-        "🇫🇮 Finnish", "🇵🇱 Polish", "🇹🇷 Turkish", "🇬🇷 Greek", "🇮🇱 Hebrew",
-        "🇻🇳 Vietnamese", "🇹🇭 Thai"
-    ]
+    languages = LANGUAGES
     
     selected_language = st.selectbox(
         "Select Language:",
@@ -245,7 +481,7 @@ with st.sidebar:
     st.session_state.current_language = selected_language
     
     # Level selection
-    levels = ["🌱 Beginner", "📚 Elementary", "🎯 Intermediate", "🚀 Advanced"]
+    levels = LEVELS
     selected_level = st.selectbox(
         "Your Level:",
         levels,
@@ -276,14 +512,27 @@ with st.sidebar:
         if st.button("📖 Grammar Lesson", use_container_width=True, key="sidebar_grammar"):
             st.session_state.show_grammar = True
 
+profiler.mark("progress")
 # Handle Progress display
 if st.session_state.get("show_progress"):
     current_lang = st.session_state.get("current_language", "None selected")
     current_level = st.session_state.get("current_level", "None selected")
     
-    # Calculate some basic stats
-    total_messages = len(st.session_state.chat_history)
-    user_messages = len([msg for msg in st.session_state.chat_history if msg["role"] == "user"])
+    # Running totals only - the same cost however long the history gets
+    counts = chat_counts()
+    total_messages = counts["messages"]
+    user_messages = counts["user_messages"]
+    progress = learning_progress()
+    accuracy = f"{progress['quiz_accuracy']:.0%}" if progress["quiz_accuracy"] is not None else "-"
+    by_level = "\n".join(
+        f"    • {row['language']} {row['level']}: "
+        + (f"{row['quiz_accuracy']:.0%} of {row['quiz_answers']} quiz answers" if row["quiz_answers"] else "no quiz yet")
+        + (f", practice {row['practice_mean_score']:.1f}/{MAX_SCORE}" if row["practice_mean_score"] is not None else "")
+        for row in progress["levels"]
+    ) or "    • Take a quiz to see your accuracy here"
+    study_time = ", ".join(
+        f"{row['language']} {row['study_seconds'] / 60:.0f} min" for row in progress["languages"]
+    ) or "-"
     
     st.info(f"""
     **📊 Your FluentBot Progress Dashboard**
@@ -298,6 +547,16 @@ if st.session_state.get("show_progress"):
     • Your Questions: {user_messages}
     • AI Responses: {total_messages - user_messages}
     
+    **🔥 Study Stats:**
+    • Daily Streak: {progress['current_streak']} day{'s' if progress['current_streak'] != 1 else ''} (best {progress['longest_streak']})
+    • Words Mastered: {progress['words_mastered']}
+    • Quiz Answers: {progress['quiz_answers']} ({accuracy} correct)
+    • Practice Answers: {progress['practice_submissions']} · Lessons Viewed: {progress['lessons_viewed']}
+    • Time per Language: {study_time}
+    
+    **🎯 Accuracy by Level:**
+{by_level}
+    
     **🎯 Today's Goals:**
     • ✅ Selected a language to learn
     • ⏳ Complete 1 vocabulary quiz
@@ -322,6 +581,7 @@ if st.session_state.get("show_progress"):
             st.session_state.show_daily_practice = True
     st.session_state.show_progress = False
 
+profiler.mark("learning_guide")
 # Handle Learning Guide display
 if st.session_state.get("show_learning_guide"):
     current_lang = st.session_state.get("current_language", "🇫🇷 French")
@@ -364,123 +624,226 @@ if st.session_state.get("show_learning_guide"):
     
     st.session_state.show_learning_guide = False
 
+profiler.mark("roadmap")
 # 🌍 LANGUAGE LEARNING FEATURE HANDLERS
 if st.session_state.get("show_roadmap"):
     language = st.session_state.get("current_language", "🇫🇷 French")
     level = st.session_state.get("current_level", "🌱 Beginner")
     
-    st.success(f"""
-    **📅 30-Day {language} Roadmap - {level}**
-    
-    **Week 1: Foundation**
-    • Days 1-3: Basic greetings and introductions
-    • Days 4-5: Numbers 1-100 and time
-    • Days 6-7: Family members and personal info
-    
-    **Week 2: Daily Life**
-    • Days 8-10: Food and drinks vocabulary
-    • Days 11-12: Present tense verbs
-    • Days 13-14: Shopping and prices
-    
-    **Week 3: Communication**
-    • Days 15-17: Directions and locations
-    • Days 18-19: Past tense introduction
-    • Days 20-21: Describing people and things
-    
-    **Week 4: Mastery**
-    • Days 22-24: Future tense and plans
-    • Days 25-27: Cultural topics and traditions
-    • Days 28-30: Review and conversation practice
-    
-    🎯 **Daily Goal**: 30 minutes of practice
-    📚 **Resources**: FluentBot AI assistance, vocabulary quizzes, daily practice
-    """)
+    roadmap_weeks = get_section(get_lesson_pack(), language, level, "roadmap")
+    if roadmap_weeks:
+        st.success(format_roadmap(roadmap_weeks, language, level))
+    else:
+        st.success(f"""
+        **📅 30-Day {language} Roadmap - {level}**
+    
+        **Week 1: Foundation**
+        • Days 1-3: Basic greetings and introductions
+        • Days 4-5: Numbers 1-100 and time
+        • Days 6-7: Family members and personal info
+    
+        **Week 2: Daily Life**
+        • Days 8-10: Food and drinks vocabulary
+        • Days 11-12: Present tense verbs
+        • Days 13-14: Shopping and prices
+    
+        **Week 3: Communication**
+        • Days 15-17: Directions and locations
+        • Days 18-19: Past tense introduction
+        • Days 20-21: Describing people and things
+    
+        **Week 4: Mastery**
+        • Days 22-24: Future tense and plans
+        • Days 25-27: Cultural topics and traditions
+        • Days 28-30: Review and conversation practice
+    
+        🎯 **Daily Goal**: 30 minutes of practice
+        📚 **Resources**: FluentBot AI assistance, vocabulary quizzes, daily practice
+        """)
+    log_event("lesson", "roadmap")
     st.session_state.show_roadmap = False
 
+def quiz_scheduler(deck) -> SrsScheduler:
+    # One spaced-repetition scheduler per language / level for this learner, loaded from disk once per session
+    schedulers = st.session_state.setdefault("srs_schedulers", {})
+    key = (deck.language, deck.level)
+    if key not in schedulers:
+        schedulers[key] = SrsScheduler(load_cards(deck))
+    return schedulers[key]
+
+def load_cards(deck) -> List:
+    card_store = get_card_store()
+    if card_store is None:
+        return []
+    try:
+        rows = card_store.load(st.session_state.conversation_id, deck.language, deck.level)
+    except sqlite3.Error:
+        return []
+    store = get_vocab_store()
+    entries = store.get_many(card.card_id for _, card in rows)
+    cards, moved = [], []
+    for word, card in rows:
+        entry = entries.get(card.card_id)
+        if entry is None or entry["word"] != word:
+            # The vocab store was rebuilt since - find the word's new id (and save it, so ids on disk match)
+            matches = [m for m in store.lookup(deck.language, word) if m["level"] == deck.level]
+            if not matches:
+                continue
+            card.card_id = matches[0]["id"]
+            moved.append((word, card))
+        cards.append(card)
+    if moved:
+        save_cards(deck, moved)
+    return cards
+
+def due_cards(deck, now: float) -> List:
+    # (word, Card) pairs as saved, for the learner's cards due by `now`
+    card_store = get_card_store()
+    if card_store is None:
+        return []
+    try:
+        return card_store.load_due(st.session_state.conversation_id, deck.language, deck.level, now)
+    except sqlite3.Error:
+        return []
+
+def save_cards(deck, cards):
+    # cards: (word, Card) pairs
+    card_store = get_card_store()
+    if card_store is not None:
+        try:
+            card_store.save(st.session_state.conversation_id, deck.language, deck.level, cards)
+        except sqlite3.Error:
+            pass
+
+def next_quiz_word(store, deck, scheduler) -> Dict:
+    """
+    Due reviews first, then a word the learner hasn't met yet, else review ahead
+    """
+    card = scheduler.next_due()
+    if card is None:
+        for _ in range(min(deck.count, 50)):
+            word_id = deck.next_id()
+            if word_id not in scheduler:
+                return store.get(word_id)
+        card = scheduler.next_upcoming()
+    return store.get(card.card_id) if card is not None else store.draw(deck)
+
+def record_vocab_review(grade: int, outcome: str):
+    st.session_state.show_vocab_quiz = True
+    word = st.session_state.current_vocab_word
+    # Only the first answer to a word counts - pressing Check twice doesn't review it twice
+    if st.session_state.get("vocab_reviewed_id") != word["id"]:
+        deck = st.session_state.vocab_deck
+        card = quiz_scheduler(deck).review(word["id"], grade)
+        save_cards(deck, [(word["word"], card)])
+        st.session_state.vocab_reviewed_id = word["id"]
+        st.session_state.vocab_feedback = (outcome, card.interval_days)
+        log_event("quiz", word["word"], level=deck.level, correct=grade >= 3,
+                  interval_days=card.interval_days)
+
+def check_vocab_answer():
+    # Whole meanings only ("Hello/Good morning" takes "hello" or "good morning", not "h" or "good")
+    meanings = set(meaning_keys(st.session_state.current_vocab_word["translation"]))
+    correct = any(key in meanings for key in meaning_keys(st.session_state.get("vocab_answer", "")))
+    record_vocab_review(4 if correct else 1, "correct" if correct else "wrong")
+
+def reveal_vocab_answer():
+    # Looking at the answer counts as not remembering it
+    record_vocab_review(0, "revealed")
+
+def keep_vocab_quiz_open():
+    st.session_state.show_vocab_quiz = True
+
+def next_vocab_word():
+    st.session_state.show_vocab_quiz = True
+    st.session_state.pop("current_vocab_word", None)
+    st.session_state.vocab_feedback = None
+    st.session_state.vocab_answer = ""
+
+profiler.mark("vocab_quiz")
 if st.session_state.get("show_vocab_quiz"):
     language = st.session_state.get("current_language", "🇫🇷 French")
     level = st.session_state.get("current_level", "🌱 Beginner")
     
-    # Vocabulary sets based on language and level
-    vocab_sets = {
-        "🇫🇷 French": {
-            "🌱 Beginner": [
-                {"word": "Bonjour", "translation": "Hello/Good morning", "pronunciation": "bon-ZHOOR"},
-                {"word": "Merci", "translation": "Thank you", "pronunciation": "mer-SEE"},
-                {"word": "Au revoir", "translation": "Goodbye", "pronunciation": "oh ruh-VWAHR"},
-                {"word": "S'il vous plaît", "translation": "Please", "pronunciation": "see voo PLEH"},
-                {"word": "Excusez-moi", "translation": "Excuse me", "pronunciation": "ex-kew-ZAY mwah"},
-                {"word": "Je m'appelle", "translation": "My name is", "pronunciation": "zhuh mah-PELL"},
-                {"word": "Comment allez-vous?", "translation": "How are you?", "pronunciation": "koh-mahn tah-lay VOO"},
-                {"word": "Oui", "translation": "Yes", "pronunciation": "WEE"},
-                {"word": "Non", "translation": "No", "pronunciation": "nohn"},
-                {"word": "Pardon", "translation": "Sorry/Pardon", "pronunciation": "par-DOHN"}
-            ]
-        },
-        "🇪🇸 Spanish": {
-            "🌱 Beginner": [
-                {"word": "Hola", "translation": "Hello", "pronunciation": "OH-lah"},
-                {"word": "Gracias", "translation": "Thank you", "pronunciation": "GRAH-see-ahs"},
-                {"word": "Adiós", "translation": "Goodbye", "pronunciation": "ah-DYOHS"},
-                {"word": "Por favor", "translation": "Please", "pronunciation": "por fah-VOR"},
-                {"word": "Perdón", "translation": "Excuse me/Sorry", "pronunciation": "per-DOHN"}
-            ]
-        }
-    }
-    
-    # Get vocabulary for current language/level
-    current_vocab = vocab_sets.get(language, {}).get(level, vocab_sets["🇫🇷 French"]["🌱 Beginner"])
-    
-    # Select a random word if not already selected
-    if "current_vocab_word" not in st.session_state:
-        st.session_state.current_vocab_word = random.choice(current_vocab)
-    
-    current_word = st.session_state.current_vocab_word
-    
-    st.markdown(f"""
-    **🧠 Vocabulary Quiz - {language} ({level})**
-    
-    **Word:** `{current_word['word']}`
-    
-    **Pronunciation:** *{current_word['pronunciation']}*
-    
-    What does this word mean in English?
-    """)
+    # Words come from the indexed store one at a time; each session keeps only a small shuffled deck
+    store = get_vocab_store()
+    if st.session_state.get("vocab_deck_for") != (language, level):
+        st.session_state.vocab_deck = store.deck_with_fallback(language, level)
+        st.session_state.vocab_deck_for = (language, level)
+        st.session_state.pop("current_vocab_word", None)
+    deck = st.session_state.vocab_deck
     
-    # Interactive Answer Section
-    user_answer = st.text_input(
-        "Your answer:",
-        placeholder="Type the English translation here...",
-        key="vocab_answer"
-    )
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        if st.button("✅ Check Answer", use_container_width=True, key="vocab_check"):
-            if user_answer.strip().lower() in current_word['translation'].lower():
-                st.success(f"🎉 Correct! '{current_word['word']}' means '{current_word['translation']}'")
+    if deck is None:
+        st.info(f"📭 No vocabulary for {language} yet - run `python generate_content_packs.py --sections vocab` to add some.")
+    else:
+        # Spaced repetition: due reviews come back first, new words are drawn without repeats
+        scheduler = quiz_scheduler(deck)
+        now = time.time()
+        if scheduler.catch_up(now):  # back from a break? spread the backlog over the next week
+            # Only cards that were overdue moved - one query finds them (and their words) on disk
+            save_cards(deck, [(word, scheduler.cards[card.card_id]) for word, card in due_cards(deck, now)
+                              if card.card_id in scheduler.cards])
+        if "current_vocab_word" not in st.session_state:
+            st.session_state.current_vocab_word = next_quiz_word(store, deck, scheduler)
+            st.session_state.vocab_feedback = None
+        
+        current_word = st.session_state.current_vocab_word
+        if deck.level != plain_name(level):
+            st.caption(f"No {plain_name(level)} words yet - quizzing {deck.level} words instead.")
+        
+        card = scheduler.cards.get(current_word["id"])
+        accuracy = f" · {scheduler.correct / scheduler.reviews:.0%} correct" if scheduler.reviews else ""
+        st.caption(f"{'🔁 Review' if card is not None and card.reps else '🆕 New word'} · "
+                   f"{len(scheduler)} word{'s' if len(scheduler) != 1 else ''} learning{accuracy}")
+        
+        st.markdown(f"""
+        **🧠 Vocabulary Quiz - {language} ({level})**
+        
+        **Word:** `{current_word['word']}`
+        
+        **Pronunciation:** *{current_word['pronunciation']}*
+        
+        What does this word mean in English?
+        """)
+        
+        # Interactive Answer Section
+        user_answer = st.text_input(
+            "Your answer:",
+            placeholder="Type the English translation here...",
+            key="vocab_answer",
+            on_change=keep_vocab_quiz_open
+        )
+        
+        col1, col2, col3 = st.columns(3)
+        
+        # Callbacks record the answer before the rerun, so the quiz stays open with its feedback
+        with col1:
+            st.button("✅ Check Answer", use_container_width=True, key="vocab_check", on_click=check_vocab_answer)
+        
+        with col2:
+            st.button("🔄 New Word", use_container_width=True, key="vocab_new", on_click=next_vocab_word)
+        
+        with col3:
+            st.button("💡 Show Answer", use_container_width=True, key="vocab_show", on_click=reveal_vocab_answer)
+        
+        feedback = st.session_state.get("vocab_feedback")
+        if feedback:
+            outcome, interval_days = feedback
+            next_review = f"next review in {interval_days:g} day{'s' if interval_days != 1 else ''}" \
+                if interval_days else "it will come back in a few minutes"
+            if outcome == "correct":
+                st.success(f"🎉 Correct! '{current_word['word']}' means '{current_word['translation']}' - {next_review}")
                 st.balloons()
+            elif outcome == "wrong":
+                st.error(f"❌ Not quite. '{current_word['word']}' means '{current_word['translation']}' - {next_review}")
             else:
-                st.error(f"❌ Not quite. '{current_word['word']}' means '{current_word['translation']}'")
-    
-    with col2:
-        if st.button("🔄 New Word", use_container_width=True, key="vocab_new"):
-            st.session_state.current_vocab_word = random.choice(current_vocab)
-            st.rerun()
-    
-    with col3:
-        if st.button("💡 Show Answer", use_container_width=True, key="vocab_show"):
-            st.info(f"**Answer:** {current_word['translation']}")
+                st.info(f"**Answer:** {current_word['translation']} - {next_review}")
     
     st.session_state.show_vocab_quiz = False
 
-if st.session_state.get("show_daily_practice"):
-    language = st.session_state.get("current_language", "🇫🇷 French")
-    level = st.session_state.get("current_level", "🌱 Beginner")
-    
+def practice_questions_for(language: str, level: str) -> List[str]:
     # Daily practice questions based on language and level
-    practice_questions = [
+    return get_section(get_lesson_pack(), language, level, "practice") or [
         f"Write a simple introduction in {language.split()[1]}",
         f"Describe your daily routine using {language.split()[1]} vocabulary",
         f"Create a dialogue between two people meeting for the first time",
@@ -492,10 +855,53 @@ if st.session_state.get("show_daily_practice"):
         f"Describe the weather in different seasons",
         f"Tell a story about your last vacation"
     ]
+
+def practice_producer(language: str, level: str):
+    return lambda count: generate_practice_items(language, level, count)
+
+def next_practice_question():
+    # A prefetched AI question (with a model answer) if one is ready, otherwise a built-in one - never blocks
+    st.session_state.show_daily_practice = True
+    st.session_state.practice_submitted = False
+    language = st.session_state.get("current_language", "🇫🇷 French")
+    level = st.session_state.get("current_level", "🌱 Beginner")
+    prefetcher = get_prefetcher()
+    item = None
+    if prefetcher is not None:
+        item = prefetcher.take(st.session_state.conversation_id, "practice", (language, level),
+                               practice_producer(language, level))
+    if item is None:
+        item = {"question": random.choice(practice_questions_for(language, level)), "reference_answer": ""}
+    st.session_state.daily_question = item["question"]
+    st.session_state.daily_reference = item["reference_answer"]
+    st.session_state.daily_question_for = (language, level)
+
+def submit_practice_answer():
+    st.session_state.show_daily_practice = True
+    st.session_state.practice_submitted = True
+    # Submitting again retries a grade that failed
+    st.session_state.pop("practice_grade_failed", None)
+
+def keep_practice_open():
+    # Editing the answer hides the old result until it's submitted again
+    st.session_state.show_daily_practice = True
+    st.session_state.practice_submitted = False
+
+profiler.mark("daily_practice")
+if st.session_state.get("show_daily_practice"):
+    language = st.session_state.get("current_language", "🇫🇷 French")
+    level = st.session_state.get("current_level", "🌱 Beginner")
     
-    # Select today's question
-    if "daily_question" not in st.session_state:
-        st.session_state.daily_question = random.choice(practice_questions)
+    # Select today's question (and start writing the next ones while this one is answered)
+    if st.session_state.get("daily_question_for") != (language, level):
+        st.session_state.daily_question = random.choice(practice_questions_for(language, level))
+        st.session_state.daily_reference = ""
+        st.session_state.daily_question_for = (language, level)
+        st.session_state.practice_submitted = False
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        prefetcher.warm(st.session_state.conversation_id, "practice", (language, level),
+                        practice_producer(language, level))
     
     today_question = st.session_state.daily_question
     
@@ -519,93 +925,233 @@ if st.session_state.get("show_daily_practice"):
         "Write your answer here:",
         height=100,
         placeholder="Type your response here...",
-        key="practice_answer"
+        key="practice_answer",
+        on_change=keep_practice_open
     )
     
     col1, col2 = st.columns(2)
+    # Callbacks run before the rerun, so the panel stays open with the result
     with col1:
-        if st.button("📨 Submit Answer", use_container_width=True, key="practice_submit"):
-            if user_practice_answer.strip():
-                st.success("🎉 Great job on completing today's practice!")
-                st.info(f"""
-                **Your Answer:**
-                {user_practice_answer}
-                
-                **Next Steps:**
-                • Review your answer with a native speaker if possible
-                • Look up any words you weren't sure about
-                • Practice speaking your answer out loud
-                • Come back tomorrow for a new challenge!
-                """)
-                st.balloons()
+        st.button("📨 Submit Answer", use_container_width=True, key="practice_submit", on_click=submit_practice_answer)
     
     with col2:
-        if st.button("🔄 New Question", use_container_width=True, key="practice_new"):
-            st.session_state.daily_question = random.choice(practice_questions)
-            st.rerun()
+        st.button("🔄 New Question", use_container_width=True, key="practice_new", on_click=next_practice_question)
+    
+    if st.session_state.get("practice_submitted") and user_practice_answer.strip():
+        # Graded once per (question, answer) - reruns reuse the result. A failed grade isn't
+        # recorded or logged, and waits for the learner to ask again rather than retrying every rerun
+        grade_key = (today_question, user_practice_answer)
+        if st.session_state.get("practice_grade_for") != grade_key \
+                and st.session_state.get("practice_grade_failed") != grade_key:
+            grade = None
+            with st.spinner("📝 Grading your answer..."), profiler.section("backend:grade"):
+                try:
+                    grade = grade_answer(language, level, today_question, user_practice_answer,
+                                         st.session_state.get("daily_reference", ""))
+                except ValueError:
+                    pass
+            if grade is None:
+                st.session_state.practice_grade_failed = grade_key
+            else:
+                st.session_state.practice_grade = grade
+                st.session_state.practice_grade_for = grade_key
+                log_event("practice", today_question, score=grade.score)
+        grade = st.session_state.practice_grade if st.session_state.get("practice_grade_for") == grade_key else None
+        
+        st.success("🎉 Great job on completing today's practice!")
+        if grade is not None:
+            st.markdown(f"**🏅 Score: {grade.score}/{MAX_SCORE}** - {grade.feedback}")
+            if grade.corrections:
+                st.markdown("**✏️ Corrections:**\n" + "\n".join(
+                    f"- ~~{c['original']}~~ → **{c['correction']}** - {c['explanation']}" for c in grade.corrections))
+            if grade.corrected_answer:
+                st.markdown(f"**✅ Corrected answer:** {grade.corrected_answer}")
+        else:
+            st.warning("⚠️ Couldn't grade your answer right now - here it is to review yourself.")
+            st.button("🔁 Grade again", key="practice_regrade", on_click=submit_practice_answer)
+        st.info(f"""
+        **Your Answer:**
+        {user_practice_answer}
+        
+        **Next Steps:**
+        • Review your answer with a native speaker if possible
+        • Look up any words you weren't sure about
+        • Practice speaking your answer out loud
+        • Come back tomorrow for a new challenge!
+        """)
+        if st.session_state.get("daily_reference"):
+            st.markdown(f"**📘 Model answer:** {st.session_state.daily_reference}")
+        if grade_key != st.session_state.get("practice_celebrated"):
+            st.session_state.practice_celebrated = grade_key
+            st.balloons()
     
     st.session_state.show_daily_practice = False
 
+profiler.mark("grammar")
 if st.session_state.get("show_grammar"):
     language = st.session_state.get("current_language", "🇫🇷 French")
     level = st.session_state.get("current_level", "🌱 Beginner")
     
-    st.info(f"""
-    **📖 Grammar Lesson - {language} ({level})**
+    grammar_lesson = get_section(get_lesson_pack(), language, level, "grammar")
+    if grammar_lesson:
+        st.info(format_grammar(grammar_lesson, language, level))
+    else:
+        st.info(f"""
+        **📖 Grammar Lesson - {language} ({level})**
     
-    **Today's Topic: Present Tense Verbs**
+        **Today's Topic: Present Tense Verbs**
     
-    **French Example:**
-    • Je parle (I speak) - zhuh PARL
-    • Tu parles (You speak) - too PARL
-    • Il/Elle parle (He/She speaks) - eel/ell PARL
+        **French Example:**
+        • Je parle (I speak) - zhuh PARL
+        • Tu parles (You speak) - too PARL
+        • Il/Elle parle (He/She speaks) - eel/ell PARL
     
-    **Pattern:** Most -er verbs follow this pattern
+        **Pattern:** Most -er verbs follow this pattern
     
-    **Practice:** Try conjugating "manger" (to eat)
-    **Answer:** Je mange, Tu manges, Il/Elle mange
+        **Practice:** Try conjugating "manger" (to eat)
+        **Answer:** Je mange, Tu manges, Il/Elle mange
     
-    🎯 **Tip**: Practice with regular verbs first, then learn irregular ones
-    """)
+        🎯 **Tip**: Practice with regular verbs first, then learn irregular ones
+        """)
+    log_event("lesson", "grammar")
     st.session_state.show_grammar = False
 
 # Main chat interface
 st.markdown("### 💬 Chat with FluentBot")
 
-# Display chat history in a container
-with st.container():
-    if st.session_state.chat_history:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                st.markdown(f"""
-                <div class="user-message">
-                    👤 {message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div class="assistant-message">
-                    🤖 {message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-    else:
-        st.markdown("""
-        <div class="assistant-message">
-            🤖 Hello! I'm FluentBot, your language learning companion. Select a language from the sidebar and let's start your learning journey! Ask me anything about grammar, vocabulary, or practice conversations.
-        </div>
-        """, unsafe_allow_html=True)
-
-# Chat input
-user_message = st.text_input(
-    "Type your message here...",
-    placeholder="Ask me about grammar, vocabulary, or start a conversation practice!",
-    key="user_input"
-)
+# Messages shown at once - older ones load a page at a time (from the store once they've left memory)
+CHAT_PAGE_SIZE = int(os.environ.get("FLUENTBOT_CHAT_PAGE_SIZE", "20"))
+
+def message_html(role: str, content: str) -> str:
+    css_class, icon = ("user-message", "👤") if role == "user" else ("assistant-message", "🤖")
+    return f"""
+    <div class="{css_class}">
+        {icon} {content}
+    </div>
+    """
+
+def history_html(message: MessageLike) -> str:
+    # Each history message's HTML is built once, not on every rerun, and kept on the message
+    # so it leaves memory with the session's history
+    if isinstance(message, Message):
+        if message.html is None:
+            message.html = message_html(message.role, message.content)
+        return message.html
+    return message_html(message["role"], message["content"])
+
+# 🧩 A fragment reruns on its own, so sidebar clicks don't redraw the chat and chat turns don't redraw
+# the page (Streamlit >= 1.37; older versions without fragments just rerun everything)
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
 
-if st.button("Send 📤", use_container_width=True, key="chat_send") or user_message:
-    if user_message.strip():
+def chat_fragment(func):
+    return _fragment(func) if _fragment is not None else func
+
+def chat_form():
+    # border=False keeps the old look where st.form supports it (Streamlit >= 1.29)
+    try:
+        return st.form("chat_form", clear_on_submit=True, border=False)
+    except TypeError:
+        return st.form("chat_form", clear_on_submit=True)
+
+def offline_answer(user_message: str, language_context: str):
+    # 📚 Lexicon word lookups, then the lesson library - None when neither has an answer
+    language, level = parse_language_context(language_context)
+    lexicon = get_lexicon()
+    answer = answer_lookup(lexicon, user_message, language) if lexicon is not None else None
+    return answer or get_lesson_index().answer(user_message, language, level, min_coverage=0.5)
+
+def pick_lookup_word(word: str):
+    st.session_state.lookup_term = word
+
+def word_lookup():
+    # 🔤 Exact matches and completions from the memory-mapped lexicon (shared by every session)
+    language = st.session_state.get("current_language", "🇫🇷 French")
+    with st.expander("🔤 Word Lookup"):
+        term = st.text_input(f"An English word or a {plain_name(language)} word", key="lookup_term",
+                             placeholder="cat, bonjour...")
+        if not term.strip():
+            return
+        lexicon = get_lexicon()
+        if lexicon is None:
+            st.caption("Word lookup isn't available right now.")
+            return
+        exact = lexicon.lookup(language, term) + lexicon.lookup(language, term, NATIVE)
+        for entry in exact[:3]:
+            st.markdown(format_entry(entry))
+        if not exact:
+            st.caption(f"No exact match in {plain_name(language)}.")
+        suggestions = []
+        for entry in lexicon.complete(language, term, k=6) + lexicon.complete(language, term, NATIVE, k=6):
+            if entry not in exact and entry not in suggestions:
+                suggestions.append(entry)
+        if suggestions:
+            st.caption("Did you mean:")
+            columns = st.columns(3)
+            for index, entry in enumerate(suggestions[:6]):
+                columns[index % 3].button(f"{entry['word']} - {entry['translation']}", key=f"lookup_suggestion_{index}",
+                                          on_click=pick_lookup_word, args=(entry["word"],), use_container_width=True)
+
+def show_older_messages():
+    st.session_state.chat_visible += CHAT_PAGE_SIZE
+
+def older_messages(history: ChatHistory, count: int) -> List[Dict]:
+    # Read back from the store for this render only - scrolled-back pages aren't kept in the session
+    store = get_conversation_store()
+    if store is None or count <= 0 or not history or history[0].id is None:
+        return []
+    try:
+        return store.before(st.session_state.conversation_id, history[0].id, count)
+    except sqlite3.Error:
+        return []
+
+def rerun_chat():
+    try:
+        st.rerun(scope="fragment")
+    except Exception:
+        # Older Streamlit, or this run was a full-page rerun rather than a fragment rerun
+        st.rerun()
+
+@chat_fragment
+@profiled_fragment("chat")
+def chat_panel():
+    history = st.session_state.chat_history
+    visible = st.session_state.setdefault("chat_visible", CHAT_PAGE_SIZE)
+    
+    # Display chat history in a container
+    with st.container():
+        if history:
+            wanted = visible - len(history)
+            older = older_messages(history, wanted)
+            if wanted > len(older):
+                hidden = 0  # everything there is, in memory or stored, is on screen
+            else:
+                hidden = max(max(chat_counts()["messages"], len(history)) - visible, 0)
+            if hidden:
+                st.button(f"⬆️ Show older messages ({hidden} hidden)", key="chat_show_older",
+                          on_click=show_older_messages)
+            for message in itertools.chain(older, history[max(len(history) - visible, 0):]):
+                st.markdown(history_html(message), unsafe_allow_html=True)
+        else:
+            st.markdown("""
+            <div class="assistant-message">
+                🤖 Hello! I'm FluentBot, your language learning companion. Select a language from the sidebar and let's start your learning journey! Ask me anything about grammar, vocabulary, or practice conversations.
+            </div>
+            """, unsafe_allow_html=True)
+    
+    word_lookup()
+    
+    # Chat input - the form clears the box after sending and submits on Enter
+    with chat_form():
+        user_message = st.text_input(
+            "Type your message here...",
+            placeholder="Ask me about grammar, vocabulary, or start a conversation practice!",
+            key="user_input"
+        )
+        send = st.form_submit_button("Send 📤", use_container_width=True)
+    
+    if send and user_message.strip():
         # Add user message to chat history
-        st.session_state.chat_history.append({"role": "user", "content": user_message})
+        remember_message("user", user_message)
         
         # Get response based on current language learning context
         language_context = ""
@@ -614,15 +1160,42 @@ if st.button("Send 📤", use_container_width=True, key="chat_send") or user_mes
             level = st.session_state.current_level
             language_context = f"[Language Learning: {lang} - {level}] "
         
+        # Try to import backend (already loaded by warm_backend in the usual case)
+        try:
+            from backend import stream_chat_response
+            backend_available = True
+        except Exception as e:
+            backend_available = False
+            st.error(f"Backend not available: {str(e)}")
+        
         # Get response - try backend first, fallback if issues
         if backend_available:
             try:
-                with st.spinner("🤔 Thinking..."):
-                    response = get_chat_response(user_message, st.session_state.chat_history[:-1], language_context)
+                # Show the learner's message right away, then stream the reply token by token
+                st.markdown(message_html("user", user_message), unsafe_allow_html=True)
+                
+                reply_placeholder = st.empty()
+                reply_placeholder.markdown(message_html("assistant", "🤔 Thinking..."), unsafe_allow_html=True)
+                
+                response = ""
+                with profiler.section("backend:chat_stream"):
+                    for delta in stream_chat_response(user_message, history[:-1], language_context):
+                        response += delta
+                        # Partial replies change every token - shown with a cursor until the reply is complete
+                        reply_placeholder.markdown(f"""
+                        <div class="assistant-message">
+                            🤖 {response}▌
+                        </div>
+                        """, unsafe_allow_html=True)
+                response = response.strip()
             except Exception as e:
                 st.error(f"Error: {str(e)}")
-                response = "I apologize, but I'm having trouble connecting to the AI service. Please check your internet connection and try again."
+                response = offline_answer(user_message, language_context) or \
+                    "I apologize, but I'm having trouble connecting to the AI service. Please check your internet connection and try again."
         else:
+            # 📚 Answer from the lexicon or lesson library when they have something; the help text below otherwise
+            response = offline_answer(user_message, language_context)
+        if response is None:
             response = f"""🤖 **FluentBot - {language_context if language_context else 'General Chat'}**
 
 I'm here to help you master languages! Here's what I can do:
@@ -644,11 +1217,13 @@ Try asking me: "How do I say 'How are you?' in French?" or "Explain Spanish verb
 """
         
         # Add assistant response to chat history
-        st.session_state.chat_history.append({"role": "assistant", "content": response})
-        
-        # Clear the input box
-        st.session_state.user_input = ""
-        st.rerun()
+        remember_message("assistant", response)
+        rerun_chat()
+
+profiler.mark("chat")
+chat_panel()
+
+profiler.mark("footer")
 
 # Footer
 st.markdown("---")
@@ -658,3 +1233,37 @@ st.markdown("""
     <p>Master new languages with personalized AI assistance • 20+ Languages • Progressive Learning</p>
 </div>
 """, unsafe_allow_html=True)
+
+def arm_profile_capture():
+    st.session_state.profile_capture = "armed"
+
+def debug_panel():
+    # 🛠️ Only with ?debug=1 - where this session's last rerun spent its time, and percentiles across sessions
+    with st.expander("🛠️ Debug: rerun profile"):
+        last = profiler.last(st.session_state.conversation_id)
+        if last is not None:
+            st.markdown(f"**Last {last['name']}:** {last['total'] * 1000:.1f} ms")
+            st.table([{"section": name, "ms": round(seconds * 1000, 2)} for name, seconds in last["sections"].items()])
+        stats = profiler.stats()
+        if stats["sections"]:
+            st.markdown(f"**Rolling percentiles** (last {stats['window']} timings of each section)")
+            st.table([{"section": name, **row} for name, row in stats["sections"].items()])
+        
+        # cProfile + stack samples of one rerun, for pstats / snakeviz and flamegraph.pl / speedscope
+        st.button("🔬 Profile my next action", key="debug_capture", on_click=arm_profile_capture)
+        dumps = [dump for dump in stats["dumps"] if dump["session"] == st.session_state.conversation_id]
+        if dumps:
+            dump = dumps[-1]
+            st.caption(f"Captured {dump['name']} ({dump['seconds'] * 1000:.0f} ms, {dump['samples']} stack samples)")
+            st.code(f"python -m pstats {dump['prof']}\nflamegraph.pl {dump['folded']} > rerun.svg", language="bash")
+            for column, path in zip(st.columns(2), (dump["prof"], dump["folded"])):
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        column.download_button(f"⬇️ {os.path.basename(path)}", f.read(),
+                                               file_name=os.path.basename(path), key=f"debug_download_{path}",
+                                               use_container_width=True)
+
+if debug_mode():
+    profiler.mark("debug_panel")
+    debug_panel()
+profiler.end()
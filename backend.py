@@ -1,10 +1,223 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterator, Sequence, Tuple
+from contextlib import contextmanager, ExitStack
+from dataclasses import dataclass
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
+import functools
+import itertools
 import json
 import os
+import threading
+import time
+import weakref
+
+from chat_history import MessageLike, encode_message, memory_gauges, memory_report
+from context_window import ContextWindow, build_context
+from lesson_index import get_lesson_index, parse_language_context
+from lexicon import answer_lookup, get_lexicon
+from metrics import (CallRecord, JsonLinesHook, TIMED_POOL_CLASSES, add_endpoint, add_hook, connect_timer,
+                     registry, reset_connect_timer, start_metrics_server, track_call)
+from rate_limiter import PriorityScheduler, RateLimiter, RequestCoalescer, SharedRateLimiter
+from resilience import ResilientCaller, RetryPolicy
+from response_cache import ResponseCache, make_cache_key
+from router import ModelRouter, Route
+
+def _import_httpx():
+    # httpx powers the asyncio API - imported on first use, so the synchronous chat neither needs it nor waits for it
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("The async API needs httpx - run `pip install httpx`") from None
+    return httpx
+
+
+class PooledTransport:
+    """
+    Thread-safe keep-alive HTTP transport shared by every Streamlit session
+    """
+
+    def __init__(self, pool_size: int = 10):
+        self.pool_size = pool_size
+
+        # One session + adapter means TCP/TLS connections are reused between chat turns
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        # Timed connection classes report TCP/TLS connect time to the per-call metrics
+        self.adapter.poolmanager.pool_classes_by_scheme = TIMED_POOL_CLASSES
+
+        # Slots mirror the pool size so we can count callers waiting for a free connection
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._prewarmed = 0
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            started = time.perf_counter()
+            self._slots.acquire()
+            with self._lock:
+                self._waits += 1
+                self._wait_seconds += time.perf_counter() - started
+
+        with self._lock:
+            self._requests += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        POST through the shared pool, waiting for a free connection if all are busy
+        """
+        self._acquire()
+        try:
+            return self.session.post(url, **kwargs)
+        finally:
+            self._release()
+
+    @contextmanager
+    def stream(self, url: str, **kwargs):
+        """
+        Streaming POST - the connection stays checked out until the body is consumed
+        """
+        self._acquire()
+        try:
+            response = self.session.post(url, stream=True, **kwargs)
+            try:
+                yield response
+            finally:
+                response.close()
+        finally:
+            self._release()
+
+    def prewarm(self, url: str, count: int, background: bool = True):
+        """
+        Open `count` connections to the host of `url` ahead of the first chat turn
+        """
+        count = min(count, self.pool_size)
+        if count <= 0:
+            return
+
+        def _connect():
+            conns = []
+            try:
+                pool = self._pool_for(url)
+                for _ in range(count):
+                    conn = pool._get_conn()
+                    conns.append(conn)
+                    conn.connect()
+                    with self._lock:
+                        self._prewarmed += 1
+            except Exception:
+                # Pre-connecting is best effort - the first real request will connect instead
+                pass
+            finally:
+                for conn in conns:
+                    pool._put_conn(conn)
+
+        if background:
+            threading.Thread(target=_connect, name="fluentbot-prewarm", daemon=True).start()
+        else:
+            _connect()
+
+    def _pool_for(self, url: str):
+        # Ask the adapter for the pool real requests will use (pool keys include TLS settings)
+        request = requests.Request("POST", url).prepare()
+        if hasattr(self.adapter, "get_connection_with_tls_context"):
+            settings = self.session.merge_environment_settings(url, {}, None, None, None)
+            return self.adapter.get_connection_with_tls_context(
+                request, settings["verify"], settings["proxies"], settings["cert"]
+            )
+        return self.adapter.get_connection(url)
+
+    def stats(self) -> Dict:
+        """
+        Pool statistics: connections opened, reuse ratio and waits for a free connection
+        """
+        pools = self.adapter.poolmanager.pools
+        with self._lock:
+            connections_opened = 0
+            pool_requests = 0
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections_opened += pool.num_connections
+                    pool_requests += pool.num_requests
+
+            # Every request that did not need a new socket reused a kept-alive one
+            new_for_requests = max(connections_opened - self._prewarmed, 0)
+            reused = max(pool_requests - new_for_requests, 0)
+
+            return {
+                "pool_size": self.pool_size,
+                "requests": self._requests,
+                "connections_opened": connections_opened,
+                "prewarmed_connections": self._prewarmed,
+                "reuse_ratio": round(reused / pool_requests, 4) if pool_requests else 0.0,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "waits_for_connection": self._waits,
+                "total_wait_seconds": round(self._wait_seconds, 4),
+            }
+
+    def close(self):
+        self.session.close()
+
+
+# Providers that only reuse a prompt prefix when it is explicitly marked with cache_control
+EXPLICIT_PROMPT_CACHE_PREFIXES = ("anthropic/", "google/gemini")
+
+
+class RequestTemplate:
+    """
+    Pre-encoded JSON body prefix: model parameters plus the constant system message.
+    Each call only serializes the dynamic tail (summary, history, new message).
+    """
+
+    def __init__(self, model: str, system_prompt: str, max_tokens: int = 1000, temperature: float = 0.7,
+                 top_p: float = 0.9, prompt_cache: bool = False):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.prompt_cache = prompt_cache
+
+        if prompt_cache:
+            # Mark the stable prefix so the provider can skip re-processing it
+            system_content = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+        else:
+            system_content = system_prompt
+
+        params = json.dumps(
+            {"model": model, "max_tokens": max_tokens, "temperature": temperature, "top_p": top_p},
+            ensure_ascii=False, separators=(",", ":"),
+        )
+        system_message = json.dumps({"role": "system", "content": system_content}, ensure_ascii=False, separators=(",", ":"))
+        # '{"model":...,"top_p":0.9,"messages":[{system}'
+        self.prefix = (params[:-1] + ',"messages":[' + system_message).encode("utf-8")
+
+    def encode(self, tail_messages: List[MessageLike], stream: bool = False) -> bytes:
+        """
+        Full request body for the given non-system-prompt messages
+        """
+        # Messages are encoded straight from their slots - no per-request dict copies
+        tail = ",".join(map(encode_message, tail_messages))
+        suffix = '],"stream":true}' if stream else "]}"
+        return self.prefix + (("," + tail) if tail else "").encode("utf-8") + suffix.encode("utf-8")
+
 
 class FluentBotBackend:
-    def __init__(self):
+    def __init__(self, pool_size: Optional[int] = None, prewarm: Optional[int] = None,
+                 cache: Optional[ResponseCache] = None):
         # Only need OpenRouter API key - simpler and better!
         self.openrouter_key = os.environ.get("OPENROUTER_API_KEY")
         
@@ -12,8 +225,101 @@ class FluentBotBackend:
             raise ValueError("OPENROUTER_API_KEY environment variable is required!")
         
         # OpenRouter gives us access to multiple AI models through one API
-        self.openrouter_url = "https://openrouter.ai/api/v1/chat/completions"
-        
+        # (FLUENTBOT_API_URL points at a local stand-in such as mock_openrouter.py for load tests)
+        self.openrouter_url = os.environ.get("FLUENTBOT_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+        self.model = "openai/gpt-3.5-turbo"  # Fast and reliable
+
+        # Ordered fallback chain - the first model is the primary
+        chain = os.environ.get("FLUENTBOT_MODELS", "")
+        self.models = [m.strip() for m in chain.split(",") if m.strip()] or [
+            self.model, "openai/gpt-4o-mini", "meta-llama/llama-3.1-8b-instruct"
+        ]
+        self.model = self.models[0]
+
+        # Each message is classified locally (lookup, grammar, conversation, correction) and sent with its
+        # own model order, reply length and context depth; the order follows observed latency and errors
+        self.router = ModelRouter(
+            self.models, enabled=os.environ.get("FLUENTBOT_ROUTER", "on").lower() not in ("0", "false", "no", "off"),
+        )
+
+        # Retries with jittered backoff inside one deadline, per-model circuit breakers, optional hedging
+        self.resilience = ResilientCaller(
+            self.models,
+            deadline_seconds=float(os.environ.get("FLUENTBOT_DEADLINE", "30")),
+            retry=RetryPolicy(max_attempts=int(os.environ.get("FLUENTBOT_MAX_ATTEMPTS", "4"))),
+            hedge=os.environ.get("FLUENTBOT_HEDGE", "").lower() in ("1", "true", "yes", "on"),
+        )
+
+        # One limiter for every session in this process: requests/sec + tokens/min, served by priority.
+        # With FLUENTBOT_RATE_LIMIT_PATH the budget is kept in SQLite and shared by every worker process.
+        limits = {
+            "requests_per_second": float(os.environ.get("FLUENTBOT_RPS", "10")),
+            "tokens_per_minute": float(os.environ.get("FLUENTBOT_TPM", "0")),
+        }
+        rate_limit_path = os.environ.get("FLUENTBOT_RATE_LIMIT_PATH")
+        self.scheduler = PriorityScheduler(
+            SharedRateLimiter(rate_limit_path, **limits) if rate_limit_path else RateLimiter(**limits)
+        )
+        # Identical questions already in flight share one upstream call
+        self.coalescer = RequestCoalescer()
+
+        # Headers never change between calls, so build them once
+        self.headers = {
+            "Authorization": f"Bearer {self.openrouter_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://fluentbot-ai.streamlit.app",
+            "X-Title": "FluentBot"
+        }
+
+        # "auto" marks the system prompt cacheable only for providers that need explicit cache_control
+        self.prompt_cache = os.environ.get("FLUENTBOT_PROMPT_CACHE", "auto").lower()
+        self._templates = {}
+
+        # Shared keep-alive connection pool - size it to the number of concurrent sessions
+        if pool_size is None:
+            pool_size = int(os.environ.get("FLUENTBOT_POOL_SIZE", "10"))
+        if prewarm is None:
+            prewarm = int(os.environ.get("FLUENTBOT_PREWARM", "0"))
+
+        self.transport = PooledTransport(pool_size=pool_size)
+        if prewarm:
+            self.transport.prewarm(self.openrouter_url, prewarm)
+
+        # Async clients are bound to an event loop, so keep one per running loop
+        self._async_clients = weakref.WeakKeyDictionary()
+
+        # Opt-in response cache for repeated learner questions
+        if cache is None and os.environ.get("FLUENTBOT_CACHE", "").lower() in ("1", "true", "yes", "on"):
+            cache = ResponseCache(
+                max_entries=int(os.environ.get("FLUENTBOT_CACHE_SIZE", "1024")),
+                ttl_seconds=float(os.environ.get("FLUENTBOT_CACHE_TTL", "86400")),
+                path=os.environ.get("FLUENTBOT_CACHE_PATH") or None,
+            )
+        self.cache = cache
+
+        # FluentBot's own lessons (vocabulary, grammar, roadmaps, FAQ) answer confident lookups without an API call,
+        # and stand in for the API when it is down or the queue is deeper than FLUENTBOT_SHED_QUEUE
+        self.local_answers = os.environ.get("FLUENTBOT_LOCAL_ANSWERS", "on").lower() not in ("0", "false", "no", "off")
+        self.shed_queue_depth = int(os.environ.get("FLUENTBOT_SHED_QUEUE", "50"))
+
+        # History is fitted into a token budget instead of a fixed number of messages
+        self.context_budget = int(os.environ.get("FLUENTBOT_CONTEXT_TOKENS", "3000"))
+        self._context_lock = threading.Lock()
+        self._context_stats = {"requests": 0, "prompt_tokens": 0, "last_prompt_tokens": 0,
+                               "summarized_turns": 0, "dropped_turns": 0}
+
+        # Per-call timing / token records: JSON-lines log and a Prometheus scrape endpoint, both opt-in
+        if os.environ.get("FLUENTBOT_METRICS_LOG"):
+            add_hook(JsonLinesHook(os.environ["FLUENTBOT_METRICS_LOG"]))
+        self.metrics_server = None
+        metrics_port = int(os.environ.get("FLUENTBOT_METRICS_PORT", "0"))
+        if metrics_port:
+            try:
+                self.metrics_server = start_metrics_server(metrics_port)
+            except OSError:
+                # Another Streamlit process already serves this port
+                pass
+
         # Enhanced system prompt for FluentBot - Language Learning Focus
         self.system_prompt = """You are FluentBot, an advanced AI language learning companion designed to help users master new languages effectively. Your personality is:
 
@@ -51,65 +357,321 @@ class FluentBotBackend:
 
 Always remember: Your goal is to empower language learners to become confident communicators while providing the cultural context and practical skills they need to succeed. Focus on building fluency through meaningful interaction and authentic language use."""
 
-# Create global backend instance
-backend = FluentBotBackend()
+    def record_context(self, window: ContextWindow):
+        """
+        Count the estimated prompt tokens each request sends
+        """
+        with self._context_lock:
+            self._context_stats["requests"] += 1
+            self._context_stats["prompt_tokens"] += window.prompt_tokens
+            self._context_stats["last_prompt_tokens"] = window.prompt_tokens
+            self._context_stats["summarized_turns"] += window.summarized_turns
+            self._context_stats["dropped_turns"] += window.dropped_turns
+
+    def context_stats(self) -> Dict:
+        with self._context_lock:
+            stats = dict(self._context_stats)
+        stats["budget_tokens"] = self.context_budget
+        stats["avg_prompt_tokens"] = round(stats["prompt_tokens"] / stats["requests"], 1) if stats["requests"] else 0.0
+        return stats
 
-def get_chat_response(user_input: str, chat_history: List[Dict] = None, language_context: str = "") -> str:
+    def request_template(self, model: Optional[str] = None, route: Optional[Route] = None) -> RequestTemplate:
+        """
+        Pre-encoded request prefix for `model` on `route` (built on first use)
+        """
+        model = model or self.model
+        key = (model, route.intent if route is not None else None)
+        template = self._templates.get(key)
+        if template is None:
+            if self.prompt_cache == "auto":
+                prompt_cache = model.startswith(EXPLICIT_PROMPT_CACHE_PREFIXES)
+            else:
+                prompt_cache = self.prompt_cache in ("1", "true", "yes", "on")
+            if route is not None:
+                template = RequestTemplate(model, route.system_prompt or self.system_prompt,
+                                           max_tokens=route.max_tokens, prompt_cache=prompt_cache)
+            else:
+                template = RequestTemplate(model, self.system_prompt, prompt_cache=prompt_cache)
+            self._templates[key] = template
+        return template
+
+    def async_client(self, max_connections: Optional[int] = None) -> "httpx.AsyncClient":
+        """
+        Keep-alive async client for the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = new_async_client(max_connections or self.transport.pool_size)
+            self._async_clients[loop] = client
+        return client
+
+def new_async_client(max_connections: int) -> "httpx.AsyncClient":
     """
-    Simple and reliable chat using only OpenRouter API
+    Fresh async client with a connection pool of `max_connections`
     """
-    if chat_history is None:
-        chat_history = []
+    httpx = _import_httpx()
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(limits=limits, timeout=30)
+
+# Global backend instance - built on first use so importing this module stays cheap
+_backend: Optional[FluentBotBackend] = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> FluentBotBackend:
+    """
+    The shared FluentBotBackend, created on first call
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = FluentBotBackend()
+    return _backend
+
+def __getattr__(name: str):
+    # `from backend import backend` / `backend.backend` still work, they just build it lazily
+    if name == "backend":
+        return get_backend()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _gauges() -> Dict[str, float]:
+    if _backend is None:
+        return {}
+    backend = _backend
+    pool = backend.transport.stats()
+    scheduler = backend.scheduler.stats()
+    gauges = {
+        "fluentbot_pool_in_flight": pool["in_flight"],
+        "fluentbot_pool_connections_opened": pool["connections_opened"],
+        "fluentbot_pool_reuse_ratio": pool["reuse_ratio"],
+        "fluentbot_queue_depth": scheduler["queue_depth"],
+        "fluentbot_context_avg_prompt_tokens": backend.context_stats()["avg_prompt_tokens"],
+    }
+    if backend.cache is not None:
+        cache = backend.cache.stats()
+        gauges["fluentbot_cache_hits"] = cache["hits"]
+        gauges["fluentbot_cache_misses"] = cache["misses"]
+    return gauges
+
+registry.add_collector(_gauges)
+registry.add_collector(memory_gauges)
+# Which sessions hold the most chat history in this process (largest first)
+add_endpoint("/sessions", memory_report)
+# Current model order per intent and the latency / error averages behind it
+add_endpoint("/router", lambda: _backend.router.stats() if _backend is not None else {})
+
+def get_pool_stats() -> Dict:
+    """
+    Connection pool statistics for the shared backend transport
+    """
+    return get_backend().transport.stats()
+
+def _route(user_input: str, record: Optional[CallRecord] = None) -> Route:
+    """
+    Classify the learner's message and pick its model order, reply cap and context depth
+    """
+    route = get_backend().router.route(user_input)
+    if record is not None:
+        record.intent = route.intent
+    return route
+
+LIBRARY_NOTE = "📚 *From FluentBot's lesson library*"
+BUSY_NOTE = "📚 *FluentBot is very busy right now, so this answer comes from the lesson library.*"
+
+def _local_reply(user_input: str, language_context: str, route: Route, priority: str) -> Optional[str]:
+    """
+    First-tier answer from the lesson index, or None to send the request upstream
+    """
+    backend = get_backend()
+    if priority != "interactive":
+        return None
+    language, level = parse_language_context(language_context)
+    if backend.local_answers and route.intent == "lookup":
+        # "How do I say X in Y" - straight from the lexicon when it knows the word
+        lexicon = get_lexicon()
+        answer = answer_lookup(lexicon, user_input, language) if lexicon is not None else None
+        if answer is not None:
+            return f"{answer}\n\n{LIBRARY_NOTE}"
+    if backend.local_answers and route.intent not in ("conversation", "correction"):
+        # Only exact-coverage matches: a word the learner asked for, or one of the FAQ questions
+        kinds = ("vocab", "faq") if route.intent == "lookup" else ("faq",)
+        answer = get_lesson_index().answer(user_input, language, level, kinds=kinds)
+        if answer is not None:
+            return f"{answer}\n\n{LIBRARY_NOTE}"
+    if backend.shed_queue_depth and backend.scheduler.depth() >= backend.shed_queue_depth:
+        # Shedding load: a looser match now beats a long wait in the queue
+        answer = get_lesson_index().answer(user_input, language, level, min_coverage=0.5)
+        if answer is not None:
+            return f"{answer}\n\n{BUSY_NOTE}"
+    return None
+
+def _build_request(user_input: str, chat_history: List[Dict], language_context: str,
+                   route: Optional[Route] = None) -> ContextWindow:
+    """
+    Build the context window (messages + token estimate) for one chat turn
+    """
+    backend = get_backend()
+    # Add language learning context to the prompt
+    context_prompt = f"{language_context}{user_input}" if language_context else user_input
     
-    try:
-        # Add language learning context to the prompt
-        context_prompt = f"{language_context}{user_input}" if language_context else user_input
-        
-        # Prepare conversation with system prompt
-        messages = [{"role": "system", "content": backend.system_prompt}]
-        
-        # Add conversation history (last 10 messages for context)
-        for msg in chat_history[-10:]:
-            messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
-        
-        # Add current user message
-        messages.append({"role": "user", "content": context_prompt})
-        
-        # OpenRouter API call
-        headers = {
-            "Authorization": f"Bearer {backend.openrouter_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://fluentbot-ai.streamlit.app",
-            "X-Title": "FluentBot"
-        }
-        
-        payload = {
-            "model": "openai/gpt-3.5-turbo",  # Fast and reliable
-            "messages": messages,
-            "max_tokens": 1000,
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
-        
-        response = requests.post(backend.openrouter_url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result['choices'][0]['message']['content'].strip()
-        
-    except Exception as e:
-        # Simple fallback if API fails
-        return f"""🤖 **FluentBot is temporarily offline**
+    system_prompt, budget = backend.system_prompt, backend.context_budget
+    if route is not None:
+        system_prompt = route.system_prompt or system_prompt
+        budget = route.context_tokens or budget
+        if route.history_turns is not None:
+            # Lookups need no history at all; grammar and corrections only the last few turns
+            chat_history = chat_history[-route.history_turns:] if route.history_turns else []
+    
+    # Fit system prompt, history (recent turns verbatim, older ones summarized) and the new message into the budget
+    window = build_context(system_prompt, chat_history, context_prompt, budget)
+    backend.record_context(window)
+    return window
+
+def _encode_body(window: ContextWindow, model: str, route: Optional[Route] = None, stream: bool = False) -> bytes:
+    # Headers and the system-prompt prefix are pre-encoded - only the tail is serialized here
+    return get_backend().request_template(model, route).encode(window.messages[1:], stream=stream)
+
+def _request_key(window: ContextWindow, user_input: str, language_context: str) -> str:
+    """
+    Identity of a request - used for the response cache and for coalescing duplicates
+    """
+    backend = get_backend()
+    # messages = [system, (summary), *recent history, current user turn]
+    history = window.messages[1:-1]
+    return make_cache_key(backend.model, window.messages[0].content, history, language_context, user_input)
+
+def _admit(window: ContextWindow, model: str, route: Optional[Route], priority: str, timeout: float,
+           record: Optional[CallRecord] = None) -> float:
+    """
+    Wait for the shared rate limiter; returns the time left for the request itself
+    """
+    backend = get_backend()
+    # Providers count max_tokens against tokens/minute limits, so we do too
+    tokens = window.prompt_tokens + backend.request_template(model, route).max_tokens
+    waited = backend.scheduler.acquire(priority, tokens=tokens, timeout=timeout)
+    if record is not None:
+        record.attempts += 1
+        record.queue_seconds += waited
+    return max(timeout - waited, 0.1)
+
+async def _admit_async(window: ContextWindow, model: str, route: Optional[Route], priority: str, timeout: float,
+                       record: Optional[CallRecord] = None) -> float:
+    backend = get_backend()
+    tokens = window.prompt_tokens + backend.request_template(model, route).max_tokens
+    started = time.monotonic()
+    deadline = started + timeout
+    while True:
+        delay = backend.scheduler.try_acquire(priority, tokens=tokens, queued_since=started)
+        if delay <= 0:
+            if record is not None:
+                record.attempts += 1
+                record.queue_seconds += time.monotonic() - started
+            return max(deadline - time.monotonic(), 0.1)
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError("rate limiter queue did not admit the request before the deadline")
+        await asyncio.sleep(max(delay, 0.01))
+
+def get_context_stats() -> Dict:
+    """
+    Estimated prompt tokens sent per request and how much history was summarized
+    """
+    return get_backend().context_stats()
+
+def get_resilience_stats() -> Dict:
+    """
+    Retry / fallback / hedge counters and circuit breaker state per model
+    """
+    return get_backend().resilience.stats()
+
+def get_router_stats() -> Dict:
+    """
+    Requests per intent, each route's current model order and per-model moving averages
+    """
+    return get_backend().router.stats()
+
+def get_scheduler_stats() -> Dict:
+    """
+    Queue depth, wait times per priority and coalesced duplicate requests
+    """
+    backend = get_backend()
+    stats = backend.scheduler.stats()
+    stats["coalescing"] = backend.coalescer.stats()
+    return stats
+
+def get_cache_stats() -> Optional[Dict]:
+    """
+    Hit / miss / eviction counters for the response cache (None when it is disabled)
+    """
+    backend = get_backend()
+    return backend.cache.stats() if backend.cache is not None else None
+
+def get_metrics_text() -> str:
+    """
+    Per-call latency / token / error metrics in Prometheus text format
+    """
+    return registry.render_prometheus()
+
+@dataclass
+class _Completion:
+    """
+    A finished (non-streaming) attempt plus what it measured
+    """
+    content: str
+    model: str
+    usage: Optional[Dict] = None
+    ttfb_seconds: Optional[float] = None
+    connect_seconds: float = 0.0
+    new_connections: int = 0
+    
+    def apply_to(self, record: CallRecord):
+        record.model = self.model
+        record.ttfb_seconds = self.ttfb_seconds
+        record.connect_seconds = self.connect_seconds
+        record.new_connections = self.new_connections
+        record.record_usage(self.usage)
+
+OFFLINE_HEADER = "🤖 **FluentBot is temporarily offline**"
+
+def is_offline_message(text: str) -> bool:
+    """
+    True when a reply is the offline fallback rather than a real answer
+    """
+    return OFFLINE_HEADER in text
+
+def is_local_reply(text: str) -> bool:
+    """
+    True when a reply didn't come from the model: a lesson-library or lexicon answer
+    (including the one served while shedding load) or the offline fallback
+    """
+    return text.endswith((LIBRARY_NOTE, BUSY_NOTE)) or is_offline_message(text)
+
+def _degraded_reply(user_input: str, language_context: str, priority: str, error: Exception) -> str:
+    """
+    The closest lesson-library answer when the API call failed, otherwise the offline message
+    """
+    answer = None
+    if priority == "interactive":
+        try:
+            answer = get_lesson_index().answer(user_input, *parse_language_context(language_context), min_coverage=0.5)
+        except Exception:
+            pass
+    if answer is None:
+        return _offline_message(error)
+    return f"{answer}\n\n---\n{OFFLINE_HEADER} - this answer comes from the lesson library. Full answers will be back shortly."
+
+def _offline_message(error: Exception) -> str:
+    """
+    Friendly fallback shown in the chat when the API call fails
+    """
+    return f"""{OFFLINE_HEADER}
 
 Please check:
 ✅ Your internet connection
 ✅ Your OPENROUTER_API_KEY in the .env file
 ✅ OpenRouter service status at https://openrouter.ai/
 
-**Error details:** {str(e)}
+**Error details:** {str(error)}
 
 **To fix:**
 1. Open your `.env` file
@@ -118,3 +680,358 @@ Please check:
 4. Restart FluentBot
 
 I'll be back online once your API key is working! 🚀"""
+
+def get_chat_response(user_input: str, chat_history: List[Dict] = None, language_context: str = "",
+                      priority: str = "interactive") -> str:
+    """
+    Simple and reliable chat using only OpenRouter API
+    """
+    if chat_history is None:
+        chat_history = []
+    
+    with track_call("chat", priority) as record:
+        try:
+            backend = get_backend()
+            route = _route(user_input, record)
+            local = _local_reply(user_input, language_context, route, priority)
+            if local is not None:
+                record.cache_status, record.model = "local", "local"
+                return local
+            
+            window = _build_request(user_input, chat_history, language_context, route)
+            record.estimated_prompt_tokens = window.prompt_tokens
+            request_key = _request_key(window, user_input, language_context)
+            
+            if backend.cache is not None:
+                cached = backend.cache.get(request_key)
+                if cached is not None:
+                    record.cache_status, record.model = "hit", backend.model
+                    return cached
+            
+            def _attempt(model: str, timeout: float) -> _Completion:
+                reset_connect_timer()
+                response = backend.transport.post(backend.openrouter_url, headers=backend.headers,
+                                                  data=_encode_body(window, model, route), timeout=min(timeout, 30))
+                response.raise_for_status()
+                
+                result = response.json()
+                connect_seconds, new_connections = connect_timer()
+                return _Completion(
+                    content=result['choices'][0]['message']['content'].strip(),
+                    model=result.get("model") or model,
+                    usage=result.get("usage"),
+                    ttfb_seconds=response.elapsed.total_seconds(),
+                    connect_seconds=connect_seconds,
+                    new_connections=new_connections,
+                )
+            
+            def _fetch() -> _Completion:
+                # Retries, model fallbacks and (optional) hedging all happen inside the deadline
+                record.cache_status = "miss" if backend.cache is not None else "off"
+                completion = backend.resilience.call(
+                    _attempt, models=route.models, deadline_seconds=route.deadline_seconds,
+                    admit=lambda model, timeout: _admit(window, model, route, priority, timeout, record),
+                    on_attempt=functools.partial(backend.router.observe, route.intent),
+                )
+                completion.apply_to(record)
+                if backend.cache is not None:
+                    backend.cache.set(request_key, completion.content)
+                return completion
+            
+            # Followers of an identical in-flight request keep the "coalesced" status
+            record.cache_status = "coalesced"
+            completion = backend.coalescer.run(request_key, _fetch)
+            record.model = completion.model
+            return completion.content
+            
+        except Exception as e:
+            # Fall back to the lesson library, or the offline message, if the API fails
+            record.fail(e)
+            return _degraded_reply(user_input, language_context, priority, e)
+
+def _iter_sse_deltas(response: requests.Response, usage: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Yield content deltas from an OpenRouter `stream: true` server-sent event body.
+    The final `usage` block (token counts), when sent, is copied into `usage`.
+    """
+    # chunk_size=None hands us bytes as soon as they arrive instead of buffering
+    done = False
+    for raw_line in response.iter_lines(chunk_size=None):
+        if not raw_line or done:
+            continue
+        line = raw_line.decode("utf-8")
+        
+        # Lines starting with ":" are keep-alive comments (e.g. ": OPENROUTER PROCESSING")
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            # Read on to the end of the body - a half-read response is closed instead of going back to the pool
+            done = True
+            continue
+        
+        event = json.loads(data)
+        if "error" in event:
+            raise RuntimeError(event["error"].get("message", event["error"]))
+        if usage is not None and event.get("usage"):
+            usage.update(event["usage"])
+        
+        for choice in event.get("choices", []):
+            delta = choice.get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+class _OpenStream:
+    """
+    A streaming response that has already produced its first delta
+    """
+    
+    def __init__(self, stack: ExitStack, first_delta: str, deltas: Iterator[str], model: str = "",
+                 usage: Optional[Dict] = None):
+        self._stack = stack
+        self.first_delta = first_delta
+        self.deltas = deltas
+        self.model = model
+        self.usage = usage if usage is not None else {}
+        self.ttfb_seconds = None
+        self.first_token_seconds = None
+        self.connect_seconds = 0.0
+        self.new_connections = 0
+    
+    def apply_to(self, record: CallRecord):
+        record.model = self.model
+        record.ttfb_seconds = self.ttfb_seconds
+        record.first_token_seconds = self.first_token_seconds
+        record.connect_seconds = self.connect_seconds
+        record.new_connections = self.new_connections
+    
+    def close(self):
+        self._stack.close()
+
+def _open_stream(window: ContextWindow, model: str, timeout: float, route: Optional[Route] = None) -> _OpenStream:
+    """
+    Start a streaming completion and wait for its first delta (time to first token)
+    """
+    backend = get_backend()
+    stack = ExitStack()
+    try:
+        reset_connect_timer()
+        started = time.perf_counter()
+        response = stack.enter_context(backend.transport.stream(
+            backend.openrouter_url, headers=backend.headers,
+            data=_encode_body(window, model, route, stream=True), timeout=min(timeout, 30),
+        ))
+        response.raise_for_status()
+        usage = {}
+        deltas = _iter_sse_deltas(response, usage)
+        first_delta = next(deltas, "")
+        
+        opened = _OpenStream(stack, first_delta, deltas, model, usage)
+        opened.ttfb_seconds = response.elapsed.total_seconds()
+        opened.first_token_seconds = time.perf_counter() - started
+        opened.connect_seconds, opened.new_connections = connect_timer()
+        return opened
+    except Exception:
+        stack.close()
+        raise
+
+def stream_chat_response(user_input: str, chat_history: List[Dict] = None, language_context: str = "",
+                         priority: str = "interactive") -> Iterator[str]:
+    """
+    Streaming variant of get_chat_response - yields text deltas as they are generated
+    """
+    if chat_history is None:
+        chat_history = []
+    
+    received_text = False
+    with track_call("stream", priority) as record:
+        try:
+            backend = get_backend()
+            route = _route(user_input, record)
+            local = _local_reply(user_input, language_context, route, priority)
+            if local is not None:
+                record.cache_status, record.model = "local", "local"
+                yield local
+                return
+            
+            window = _build_request(user_input, chat_history, language_context, route)
+            record.estimated_prompt_tokens = window.prompt_tokens
+            
+            request_key = _request_key(window, user_input, language_context)
+            if backend.cache is not None:
+                cached = backend.cache.get(request_key)
+                if cached is not None:
+                    record.cache_status, record.model = "hit", backend.model
+                    yield cached
+                    return
+                record.cache_status = "miss"
+            
+            # Fallbacks and hedging apply until the first token arrives; a hedged loser is closed
+            opened = backend.resilience.call(
+                lambda model, timeout: _open_stream(window, model, timeout, route),
+                models=route.models, deadline_seconds=route.deadline_seconds,
+                discard=lambda loser: loser.close(),
+                admit=lambda model, timeout: _admit(window, model, route, priority, timeout, record),
+                on_attempt=functools.partial(backend.router.observe, route.intent),
+            )
+            opened.apply_to(record)
+            
+            parts = []
+            try:
+                for delta in itertools.chain([opened.first_delta], opened.deltas):
+                    if not delta:
+                        continue
+                    received_text = True
+                    parts.append(delta)
+                    yield delta
+            finally:
+                opened.close()
+                record.record_usage(opened.usage)
+            
+            # Only complete replies are cached - a broken stream falls through to the except below
+            if backend.cache is not None and parts:
+                backend.cache.set(request_key, "".join(parts).strip())
+        
+        except Exception as e:
+            # Same fallback as the blocking call, kept apart from any text already shown
+            record.fail(e)
+            if received_text:
+                yield "\n\n" + _offline_message(e)
+            else:
+                yield _degraded_reply(user_input, language_context, priority, e)
+
+def _connect_trace(connect: Dict):
+    """
+    httpx trace hook that adds TCP + TLS setup time to `connect`
+    """
+    started = {}
+    
+    async def trace(event: str, info: Dict):
+        step, _, phase = event.rpartition(".")
+        if step not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if phase == "started":
+            started[step] = time.perf_counter()
+        elif phase == "complete" and step in started:
+            connect["seconds"] += time.perf_counter() - started.pop(step)
+            if step == "connection.connect_tcp":
+                connect["count"] += 1
+    
+    return trace
+
+async def _async_complete(client: "httpx.AsyncClient", user_input: str, chat_history: List[Dict], language_context: str,
+                          priority: str = "interactive") -> str:
+    """
+    One async chat completion - raises on any failure
+    """
+    with track_call("async", priority) as record:
+        try:
+            backend = get_backend()
+            route = _route(user_input, record)
+            local = _local_reply(user_input, language_context, route, priority)
+            if local is not None:
+                record.cache_status, record.model = "local", "local"
+                return local
+            
+            window = _build_request(user_input, chat_history, language_context, route)
+            record.estimated_prompt_tokens = window.prompt_tokens
+            
+            request_key = _request_key(window, user_input, language_context)
+            if backend.cache is not None:
+                cached = backend.cache.get(request_key)
+                if cached is not None:
+                    record.cache_status, record.model = "hit", backend.model
+                    return cached
+                record.cache_status = "miss"
+            
+            async def _attempt(model: str, timeout: float) -> _Completion:
+                connect = {"seconds": 0.0, "count": 0}
+                response = await client.post(backend.openrouter_url, headers=backend.headers,
+                                             content=_encode_body(window, model, route), timeout=min(timeout, 30),
+                                             extensions={"trace": _connect_trace(connect)})
+                response.raise_for_status()
+                
+                result = response.json()
+                return _Completion(
+                    content=result['choices'][0]['message']['content'].strip(),
+                    model=result.get("model") or model,
+                    usage=result.get("usage"),
+                    ttfb_seconds=response.elapsed.total_seconds(),
+                    connect_seconds=connect["seconds"],
+                    new_connections=connect["count"],
+                )
+            
+            completion = await backend.resilience.call_async(
+                _attempt, models=route.models, deadline_seconds=route.deadline_seconds,
+                admit=lambda model, timeout: _admit_async(window, model, route, priority, timeout, record),
+                on_attempt=functools.partial(backend.router.observe, route.intent),
+            )
+            completion.apply_to(record)
+        except Exception as e:
+            record.fail(e)
+            raise
+    
+    if backend.cache is not None:
+        backend.cache.set(request_key, completion.content)
+    return completion.content
+
+async def async_get_chat_response(user_input: str, chat_history: List[Dict] = None, language_context: str = "",
+                                  priority: str = "interactive") -> str:
+    """
+    Async counterpart of get_chat_response for use inside an event loop
+    """
+    if chat_history is None:
+        chat_history = []
+    
+    try:
+        return await _async_complete(get_backend().async_client(), user_input, chat_history, language_context, priority)
+    except Exception as e:
+        return _degraded_reply(user_input, language_context, priority, e)
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of one batch job - exactly one of response / error is set
+    """
+    index: int
+    response: Optional[str] = None
+    error: Optional[Exception] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+ChatJob = Tuple  # (user_input, chat_history, language_context) - the last two are optional
+
+async def batch_get_chat_responses(jobs: Sequence[ChatJob], concurrency: int = 8, priority: str = "batch") -> List[BatchResult]:
+    """
+    Run many chat jobs concurrently, at most `concurrency` in flight at once.
+    Results come back in job order with per-job errors instead of the offline text.
+    Jobs queue behind interactive chat turns in the shared rate limiter.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def _run(index: int, job: ChatJob, client) -> BatchResult:
+        user_input = job[0]
+        chat_history = job[1] if len(job) > 1 and job[1] else []
+        language_context = job[2] if len(job) > 2 and job[2] else ""
+        
+        async with semaphore:
+            try:
+                response = await _async_complete(client, user_input, chat_history, language_context, priority)
+                return BatchResult(index=index, response=response)
+            except Exception as e:
+                return BatchResult(index=index, error=e)
+    
+    # A dedicated client sized to the concurrency limit, closed when the batch is done
+    async with new_async_client(concurrency) as client:
+        return await asyncio.gather(*(_run(i, job, client) for i, job in enumerate(jobs)))
+
+def run_batch_chat(jobs: Sequence[ChatJob], concurrency: int = 8, priority: str = "batch") -> List[BatchResult]:
+    """
+    Blocking wrapper around batch_get_chat_responses for scripts and background jobs
+    """
+    return asyncio.run(batch_get_chat_responses(jobs, concurrency, priority))
@@ -0,0 +1,125 @@
+# Microbenchmark: per-call request serialization, rebuilt-from-scratch vs pre-encoded template
+#
+#   python bench_serialization.py                       # offline, no API key needed
+#   python bench_serialization.py --live 10 --model anthropic/claude-3-haiku
+#                                                       # also compare provider latency with / without cache_control
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+
+def legacy_body(system_prompt: str, key: str, history, user_message: str):
+    """
+    What every call used to do: fresh headers, copied messages and a full json.dumps
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    for msg in history:
+        messages.append({"role": msg["role"], "content": msg["content"]})
+    messages.append({"role": "user", "content": user_message})
+    headers = {
+        "Authorization": f"Bearer {key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://fluentbot-ai.streamlit.app",
+        "X-Title": "FluentBot"
+    }
+    payload = {
+        "model": "openai/gpt-3.5-turbo",
+        "messages": messages,
+        "max_tokens": 1000,
+        "temperature": 0.7,
+        "top_p": 0.9
+    }
+    # requests serializes json= bodies like this
+    return headers, json.dumps(payload, allow_nan=False).encode("utf-8")
+
+
+def sample_history(turns: int):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"How do I say 'good morning number {i}' in Japanese?"})
+        history.append({"role": "assistant", "content": "おはようございます (ohayō gozaimasu) - a polite morning greeting. " * 3})
+    return history
+
+
+def time_per_call(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run_offline(iterations: int, turns: int) -> dict:
+    from backend import backend, RequestTemplate
+    from chat_history import Message, as_message
+
+    history = sample_history(turns)
+    user_message = "[Language Learning: 🇯🇵 Japanese - 🌱 Beginner] How do I say thank you?"
+    # The app keeps history as slotted Message objects, encoded straight from their fields
+    tail = [as_message(msg) for msg in history] + [Message("user", user_message)]
+    template = RequestTemplate(backend.model, backend.system_prompt)
+
+    legacy_us = time_per_call(lambda: legacy_body(backend.system_prompt, backend.openrouter_key, history, user_message), iterations)
+    template_us = time_per_call(lambda: template.encode(tail), iterations)
+
+    return {
+        "iterations": iterations,
+        "history_messages": len(history),
+        "legacy_us_per_call": round(legacy_us, 2),
+        "template_us_per_call": round(template_us, 2),
+        "saved_us_per_call": round(legacy_us - template_us, 2),
+        "speedup": round(legacy_us / template_us, 2) if template_us else None,
+        "legacy_body_bytes": len(legacy_body(backend.system_prompt, backend.openrouter_key, history, user_message)[1]),
+        "template_body_bytes": len(template.encode(tail)),
+    }
+
+
+def run_live(requests_per_mode: int, model: str) -> dict:
+    from backend import backend, RequestTemplate
+
+    tail = [{"role": "user", "content": "Reply with one word: hello in French?"}]
+    results = {}
+    for prompt_cache in (False, True):
+        template = RequestTemplate(model, backend.system_prompt, max_tokens=5, prompt_cache=prompt_cache)
+        latencies = []
+        for _ in range(requests_per_mode):
+            started = time.perf_counter()
+            response = backend.transport.post(backend.openrouter_url, headers=backend.headers,
+                                              data=template.encode(tail), timeout=30)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        results["cached_prefix" if prompt_cache else "plain_prefix"] = {
+            "median_ms": round(statistics.median(latencies), 1),
+            "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 1),
+            "requests": len(latencies),
+        }
+    results["model"] = model
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FluentBot request serialization microbenchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--turns", type=int, default=5, help="History turns (user + assistant pairs)")
+    parser.add_argument("--live", type=int, default=0, help="Also send N real requests per prompt-cache mode")
+    parser.add_argument("--model", default="anthropic/claude-3-haiku", help="Model for --live")
+    args = parser.parse_args()
+
+    if not args.live:
+        # The offline benchmark never calls the API, so a placeholder key is enough
+        os.environ.setdefault("OPENROUTER_API_KEY", "offline-benchmark")
+
+    report = {"serialization": run_offline(args.iterations, args.turns)}
+    if args.live:
+        report["provider_latency"] = run_live(args.live, args.model)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
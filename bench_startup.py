@@ -0,0 +1,144 @@
+# Startup benchmark: cold import of the backend, first build, and app.py cold run / warm rerun times
+#
+#   python bench_startup.py --out startup.json
+#   python bench_startup.py --baseline startup.json --max-regression 0.25   # exit 1 if startup got slower
+#
+# Every measurement runs in a fresh interpreter so module caches don't hide cold-start costs.
+# No API calls are made - a placeholder key and an unreachable endpoint are used.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = """
+import time
+started = time.perf_counter()
+import backend
+imported = time.perf_counter()
+backend.get_backend()
+built = time.perf_counter()
+print((imported - started) * 1000, (built - imported) * 1000)
+"""
+
+APP_PROBE = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=60)
+started = time.perf_counter()
+app.run()
+cold = time.perf_counter() - started
+assert not app.exception, [e.message for e in app.exception]
+warm = []
+for _ in range(int(sys.argv[2])):
+    started = time.perf_counter()
+    app.run()
+    warm.append(time.perf_counter() - started)
+print(cold * 1000, *(w * 1000 for w in warm))
+"""
+
+
+def probe_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENROUTER_API_KEY", "startup-benchmark")
+    env["FLUENTBOT_API_URL"] = "http://127.0.0.1:9/api/v1/chat/completions"
+    env["FLUENTBOT_PREWARM"] = "0"
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def run_probe(code: str, *args) -> list:
+    # stderr is dropped: AppTest warns about a missing ScriptRunContext in bare mode
+    output = subprocess.check_output([sys.executable, "-c", code, *args], cwd=ROOT, env=probe_env(), text=True,
+                                     stderr=subprocess.DEVNULL)
+    return [float(value) for value in output.split()]
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "median": round(statistics.median(samples), 2),
+        "min": round(min(samples), 2),
+        "max": round(max(samples), 2),
+    }
+
+
+def measure(runs: int, reruns: int, skip_app: bool) -> dict:
+    import_ms, build_ms = [], []
+    for _ in range(runs):
+        imported, built = run_probe(IMPORT_PROBE)
+        import_ms.append(imported)
+        build_ms.append(built)
+    results = {"backend_import_ms": summarize(import_ms), "backend_build_ms": summarize(build_ms)}
+
+    if not skip_app:
+        try:
+            import streamlit.testing.v1  # noqa: F401 - AppTest needs Streamlit >= 1.28
+        except ImportError:
+            results["app"] = "skipped (streamlit.testing unavailable)"
+            return results
+        cold_ms, warm_ms = [], []
+        for _ in range(runs):
+            timings = run_probe(APP_PROBE, os.path.join(ROOT, "app.py"), str(reruns))
+            cold_ms.append(timings[0])
+            warm_ms.extend(timings[1:])
+        results["app_cold_run_ms"] = summarize(cold_ms)
+        results["app_rerun_ms"] = summarize(warm_ms)
+    return results
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """
+    Median timings that got slower than the baseline by more than `max_regression` (fractional)
+    """
+    problems = []
+    for metric, new in report["results"].items():
+        old = baseline["results"].get(metric)
+        if not isinstance(new, dict) or not isinstance(old, dict):
+            continue
+        # Ignore sub-millisecond noise on tiny timings
+        if new["median"] > old["median"] * (1 + max_regression) and new["median"] - old["median"] > 1.0:
+            problems.append(f"{metric} {old['median']}ms -> {new['median']}ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FluentBot startup / rerun benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--reruns", type=int, default=5, help="Warm app reruns per interpreter")
+    parser.add_argument("--skip-app", action="store_true", help="Only time the backend import")
+    parser.add_argument("--out", help="Write the JSON report here as well as stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed fractional slowdown vs baseline")
+    args = parser.parse_args()
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {"runs": args.runs, "reruns": args.reruns},
+        "results": measure(args.runs, args.reruns, args.skip_app),
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        if problems:
+            print("❌ Startup regression vs baseline: " + "; ".join(problems), file=sys.stderr)
+            return 1
+        print("✅ No startup regression vs baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+from typing import Dict, Iterable, Iterator, Optional, Union
+from collections import deque
+import itertools
+import json
+from json.encoder import encode_basestring
+import sys
+import threading
+import weakref
+
+# Every message points at one of these shared strings instead of its own copy
+ROLES = {role: sys.intern(role) for role in ("system", "user", "assistant")}
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def intern_role(role: str) -> str:
+    return ROLES.get(role) or sys.intern(role)
+
+
+class Message:
+    """
+    One chat turn. Slotted (no per-instance dict) with an interned role; also readable
+    like the old {"role": ..., "content": ...} dicts, so msg["content"] keeps working.
+    """
+
+    __slots__ = ("role", "content", "id", "tokens", "summary", "html")
+
+    def __init__(self, role: str, content: str, id: Optional[int] = None):
+        self.role = intern_role(role)
+        self.content = content
+        self.id = id  # conversation store row id, once saved
+        # Worked out from content on first use and evicted with the message (see context_window and app)
+        self.tokens: Optional[int] = None
+        self.summary: Optional[str] = None
+        self.html: Optional[str] = None
+
+    def __getitem__(self, key: str):
+        if key in ("role", "content"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in ("role", "content", "id") else default
+
+    def __repr__(self) -> str:
+        return f"Message({self.role!r}, {self.content[:40]!r})"
+
+    def to_json(self) -> str:
+        """
+        The message as it goes over the wire, encoded straight from the slots
+        """
+        return '{"role":"%s","content":%s}' % (self.role, encode_basestring(self.content))
+
+    @property
+    def nbytes(self) -> int:
+        # Roles are shared, so only the object itself and its text count against the session
+        return sys.getsizeof(self) + sys.getsizeof(self.content)
+
+
+MessageLike = Union[Message, Dict]
+
+
+def as_message(message: MessageLike) -> Message:
+    if isinstance(message, Message):
+        return message
+    return Message(message["role"], message["content"], message.get("id"))
+
+
+def encode_message(message: MessageLike) -> str:
+    if isinstance(message, Message):
+        return message.to_json()
+    return _ENCODER.encode(message)
+
+
+# Every live history, so operators can see which sessions hold the most memory
+_live: "weakref.WeakSet[ChatHistory]" = weakref.WeakSet()
+_live_lock = threading.Lock()
+
+
+class ChatHistory:
+    """
+    Ring buffer of a session's newest messages, capped by count and by bytes.
+    Appending past either cap evicts the oldest messages (they stay in the conversation store).
+    """
+
+    def __init__(self, messages: Iterable[MessageLike] = (), max_messages: int = 40, max_bytes: int = 0,
+                 label: str = ""):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes  # 0 = only the message cap applies
+        self.label = label
+        self.evicted = 0
+        self._messages: deque = deque(maxlen=max_messages or None)
+        self._bytes = 0
+        self.extend(messages)
+        with _live_lock:
+            _live.add(self)
+
+    def append(self, role: str, content: str, id: Optional[int] = None) -> Message:
+        return self.add(Message(role, content, id))
+
+    def add(self, message: MessageLike) -> Message:
+        message = as_message(message)
+        messages = self._messages
+        if messages.maxlen is not None and len(messages) == messages.maxlen:
+            self._evict()
+        messages.append(message)
+        self._bytes += message.nbytes
+        # Always keep the newest message, even if it alone is over the byte cap
+        while self.max_bytes and self.nbytes > self.max_bytes and len(messages) > 1:
+            self._evict()
+        return message
+
+    def extend(self, messages: Iterable[MessageLike]):
+        for message in messages:
+            self.add(message)
+
+    def _evict(self):
+        self._bytes -= self._messages.popleft().nbytes
+        self.evicted += 1
+
+    def clear(self):
+        self._messages.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __bool__(self) -> bool:
+        return bool(self._messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._messages))
+            return list(itertools.islice(self._messages, start, stop, step))
+        return self._messages[index]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes held by this history: the ring buffer plus every message and its text
+        """
+        return sys.getsizeof(self._messages) + self._bytes
+
+    def stats(self) -> Dict:
+        return {
+            "label": self.label,
+            "messages": len(self._messages),
+            "bytes": self.nbytes,
+            "evicted": self.evicted,
+        }
+
+
+def memory_report(top: int = 20) -> Dict:
+    """
+    Live session histories in this process, largest first
+    """
+    with _live_lock:
+        histories = list(_live)
+    sessions = sorted((history.stats() for history in histories), key=lambda s: s["bytes"], reverse=True)
+    return {
+        "sessions": len(sessions),
+        "total_bytes": sum(s["bytes"] for s in sessions),
+        "largest": sessions[:top],
+    }
+
+
+def memory_gauges() -> Dict[str, float]:
+    report = memory_report(top=1)
+    largest = report["largest"][0]["bytes"] if report["largest"] else 0
+    return {
+        "fluentbot_chat_sessions": report["sessions"],
+        "fluentbot_chat_history_bytes": report["total_bytes"],
+        "fluentbot_chat_history_max_session_bytes": largest,
+    }
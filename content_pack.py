@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+import gzip
+import json
+import os
+
+# Languages and levels offered in the sidebar - the content pack covers every combination
+LANGUAGES = [
+    "🇫🇷 French", "🇯🇵 Japanese", "🇩🇪 German", "🇪🇸 Spanish", "🇮🇹 Italian",
+    "🇰🇷 Korean", "🇨🇳 Chinese (Mandarin)", "🇷🇺 Russian", "🇵🇹 Portuguese",
+    "🇳🇱 Dutch", "🇸🇦 Arabic", "🇮🇳 Hindi", "🇸🇪 Swedish", "🇳🇴 Norwegian",
+    "🇫🇮 Finnish", "🇵🇱 Polish", "🇹🇷 Turkish", "🇬🇷 Greek", "🇮🇱 Hebrew",
+    "🇻🇳 Vietnamese", "🇹🇭 Thai"
+]
+
+LEVELS = ["🌱 Beginner", "📚 Elementary", "🎯 Intermediate", "🚀 Advanced"]
+
+# Bump when the pack layout changes so old packs are ignored instead of misread
+CONTENT_PACK_VERSION = 1
+
+DEFAULT_PACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "lesson_pack.json.gz")
+
+SECTIONS = ("roadmap", "grammar", "practice", "vocab")
+
+# Appended to every generation prompt so replies can go straight to parse_json_reply
+JSON_ONLY = "Reply with valid JSON only - no markdown fences, no commentary."
+
+
+def plain_name(label: str) -> str:
+    """
+    Drop the flag / emoji prefix: "🇨🇳 Chinese (Mandarin)" -> "Chinese (Mandarin)"
+    """
+    return label.split(" ", 1)[1] if " " in label else label
+
+
+def load_content_pack(path: str = DEFAULT_PACK_PATH) -> Optional[Dict]:
+    """
+    Read a pack written by generate_content_packs.py (None if missing or from another version)
+    """
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        pack = json.load(f)
+    if pack.get("version") != CONTENT_PACK_VERSION:
+        return None
+    return pack
+
+
+def save_content_pack(content: Dict, path: str = DEFAULT_PACK_PATH, model: str = "") -> Dict:
+    """
+    Write a compact, versioned pack atomically so readers never see a half-written file
+    """
+    pack = {
+        "version": CONTENT_PACK_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "model": model,
+        "content": content,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+        json.dump(pack, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return pack
+
+
+def get_section(pack: Optional[Dict], language: str, level: str, section: str):
+    """
+    One section of the pack for a sidebar language / level label, or None
+    """
+    if not pack:
+        return None
+    return pack["content"].get(plain_name(language), {}).get(plain_name(level), {}).get(section)
+
+
+def format_roadmap(weeks: List[Dict], language: str, level: str) -> str:
+    lines = [f"**📅 30-Day {language} Roadmap - {level}**", ""]
+    for week in weeks:
+        lines.append(f"**{week['title']}**")
+        lines.extend(f"• {item}" for item in week["items"])
+        lines.append("")
+    lines.append("🎯 **Daily Goal**: 30 minutes of practice")
+    lines.append("📚 **Resources**: FluentBot AI assistance, vocabulary quizzes, daily practice")
+    return "\n".join(lines)
+
+
+def format_grammar(lesson: Dict, language: str, level: str) -> str:
+    lines = [
+        f"**📖 Grammar Lesson - {language} ({level})**",
+        "",
+        f"**Today's Topic: {lesson['topic']}**",
+        "",
+        f"**{plain_name(language)} Example:**",
+    ]
+    for example in lesson["examples"]:
+        pronunciation = f" - {example['pronunciation']}" if example.get("pronunciation") else ""
+        lines.append(f"• {example['text']} ({example['translation']}){pronunciation}")
+    lines += [
+        "",
+        f"**Pattern:** {lesson['pattern']}",
+        "",
+        f"**Practice:** {lesson['practice']}",
+        f"**Answer:** {lesson['answer']}",
+        "",
+        f"🎯 **Tip**: {lesson['tip']}",
+    ]
+    return "\n".join(lines)
+
+
+def parse_json_reply(text: str) -> dict:
+    """
+    Models sometimes wrap JSON in ``` fences - strip them before parsing
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("reply contained no JSON object")
+    return json.loads(text[start:end + 1])
@@ -0,0 +1,189 @@
+from typing import Dict, List, Sequence
+from dataclasses import dataclass, field
+import re
+
+from chat_history import Message, MessageLike, as_message
+
+# Rough tokens-per-character by script, tuned against BPE tokenizers used by OpenRouter models.
+# Latin text packs ~4 characters per token, while CJK, Thai and Indic scripts cost about a token per character.
+SCRIPT_RATES = (
+    # (first code point, last code point, tokens per character)
+    (0x0000, 0x007F, 0.25),   # ASCII
+    (0x0080, 0x024F, 0.35),   # Latin-1 / Latin Extended (French, German, Polish, Turkish...)
+    (0x0370, 0x03FF, 0.5),    # Greek
+    (0x0400, 0x04FF, 0.45),   # Cyrillic
+    (0x0590, 0x05FF, 0.6),    # Hebrew
+    (0x0600, 0x06FF, 0.6),    # Arabic
+    (0x0900, 0x097F, 0.9),    # Devanagari (Hindi)
+    (0x0E00, 0x0E7F, 1.0),    # Thai
+    (0x1E00, 0x1EFF, 0.6),    # Latin Extended Additional (Vietnamese)
+    (0x3040, 0x30FF, 1.0),    # Hiragana / Katakana
+    (0x3400, 0x9FFF, 1.2),    # CJK ideographs
+    (0xAC00, 0xD7AF, 1.0),    # Hangul syllables
+    (0x1F000, 0x1FAFF, 2.0),  # Emoji
+)
+OTHER_RATE = 1.0
+
+# Fixed per-message cost of the chat format (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of earlier conversation (oldest first):\n"
+
+
+def _char_rate(code_point: int) -> float:
+    for first, last, rate in SCRIPT_RATES:
+        if first <= code_point <= last:
+            return rate
+    return OTHER_RATE
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of `text` using per-script character rates
+    """
+    if not text:
+        return 0
+    if text.isascii():
+        return max(1, round(len(text) * 0.25))
+    return max(1, round(sum(_char_rate(ord(ch)) for ch in text)))
+
+
+def message_tokens(message: MessageLike) -> int:
+    # A session's Message keeps its count, so history turns are only measured once
+    if isinstance(message, Message):
+        if message.tokens is None:
+            message.tokens = estimate_tokens(message.content)
+        return message.tokens + MESSAGE_OVERHEAD_TOKENS
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _trim_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Keep the start of `text` within roughly `max_tokens`
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0.0
+    limit = max_tokens - 4  # room for the trim marker
+    for index, ch in enumerate(text):
+        used += 0.25 if ch.isascii() else _char_rate(ord(ch))
+        if used > limit:
+            return text[:index].rstrip() + " …[trimmed]"
+    return text
+
+
+def summarize_turn(role: str, content: str, max_chars: int = 160) -> str:
+    """
+    One-line extractive summary of a turn - its first sentence, clipped
+    """
+    text = " ".join(content.split())
+    first_sentence = re.split(r"(?<=[.!?。！？])\s", text, maxsplit=1)[0]
+    if len(first_sentence) > max_chars:
+        first_sentence = first_sentence[:max_chars].rstrip() + "…"
+    speaker = "Learner" if role == "user" else "FluentBot"
+    return f"- {speaker}: {first_sentence}"
+
+
+def turn_summary(message: MessageLike) -> str:
+    """
+    summarize_turn for a history entry, kept on a Message so the rolling summary
+    costs nothing for turns already seen
+    """
+    if isinstance(message, Message):
+        if message.summary is None:
+            message.summary = summarize_turn(message.role, message.content)
+        return message.summary
+    return summarize_turn(message["role"], message["content"])
+
+
+@dataclass
+class ContextWindow:
+    """
+    Messages chosen for one request and what it cost to send them.
+    History turns are the session's own Message objects, not copies.
+    """
+    messages: List[Message]
+    prompt_tokens: int
+    history_turns_sent: int
+    summarized_turns: int
+    dropped_turns: int = 0
+    budget_tokens: int = 0
+    breakdown: Dict = field(default_factory=dict)
+
+
+def build_context(system_prompt: str, history: Sequence[MessageLike], user_message: str,
+                  budget_tokens: int = 3000, summary_share: float = 0.15) -> ContextWindow:
+    """
+    Fit system prompt, history and the new message into `budget_tokens`.
+    Recent turns are kept verbatim (newest first); older turns are folded into a
+    rolling summary that gets at most `summary_share` of the budget.
+    """
+    system_message = Message("system", system_prompt)
+    system_cost = message_tokens(system_message)
+
+    # The current message always goes out - trim a huge paste rather than blow the budget
+    user_budget = max(budget_tokens - system_cost - MESSAGE_OVERHEAD_TOKENS, 64)
+    user_content = _trim_to_tokens(user_message, user_budget)
+    user_entry = Message("user", user_content)
+    user_cost = message_tokens(user_entry)
+
+    remaining = budget_tokens - system_cost - user_cost
+    summary_budget = int(budget_tokens * summary_share)
+
+    # Newest-first: keep whole turns while they fit, leaving room for the summary
+    recent: List[Message] = []
+    history_cost = 0
+    cut = len(history)
+    for index in range(len(history) - 1, -1, -1):
+        msg = history[index]
+        cost = message_tokens(msg)
+        reserve = summary_budget if index > 0 else 0
+        if history_cost + cost > remaining - reserve:
+            if not recent and remaining - reserve > 64:
+                # The latest turn alone is too big - send a trimmed copy so the reply stays on topic
+                trimmed = Message(msg["role"], _trim_to_tokens(msg["content"], remaining - reserve - MESSAGE_OVERHEAD_TOKENS))
+                recent.append(trimmed)
+                history_cost += message_tokens(trimmed)
+                cut = index
+            break
+        recent.append(as_message(msg))
+        history_cost += cost
+        cut = index
+    recent.reverse()
+
+    # Older turns become a rolling summary, newest lines kept first when space runs out
+    older = history[:cut]
+    summary_lines: List[str] = []
+    summary_cost = estimate_tokens(SUMMARY_PREFIX) + MESSAGE_OVERHEAD_TOKENS
+    summary_room = min(summary_budget, remaining - history_cost)
+    for msg in reversed(older):
+        line = turn_summary(msg)
+        cost = estimate_tokens(line) + 1
+        if summary_cost + cost > summary_room:
+            break
+        summary_lines.append(line)
+        summary_cost += cost
+    summary_lines.reverse()
+
+    messages = [system_message]
+    if summary_lines:
+        messages.append(Message("system", SUMMARY_PREFIX + "\n".join(summary_lines)))
+    else:
+        summary_cost = 0
+    messages.extend(recent)
+    messages.append(user_entry)
+
+    return ContextWindow(
+        messages=messages,
+        prompt_tokens=system_cost + summary_cost + history_cost + user_cost,
+        history_turns_sent=len(recent),
+        summarized_turns=len(summary_lines),
+        dropped_turns=len(older) - len(summary_lines),
+        budget_tokens=budget_tokens,
+        breakdown={
+            "system": system_cost,
+            "summary": summary_cost,
+            "history": history_cost,
+            "user": user_cost,
+        },
+    )
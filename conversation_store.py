@@ -0,0 +1,174 @@
+from typing import Dict, List
+import os
+import sqlite3
+import threading
+import time
+
+
+class ConversationStore:
+    """
+    Append-only chat log in one SQLite file (WAL mode, shared by every worker process).
+    Sessions keep only their recent turns in memory and page older ones in from here.
+    """
+
+    def __init__(self, path: str, retention_days: float = 90, max_messages_per_conversation: int = 5000):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_messages_per_conversation = max_messages_per_conversation
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._compactor = None
+        self.counters = {"appends": 0, "pages_loaded": 0, "compactions": 0, "removed": 0, "errors": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, so each thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY, conversation TEXT NOT NULL, role TEXT NOT NULL, "
+                "content TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation, id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "conversation TEXT PRIMARY KEY, messages INTEGER NOT NULL, user_messages INTEGER NOT NULL, "
+                "updated_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def append(self, conversation: str, role: str, content: str) -> int:
+        """
+        Add one message; returns its id (ids increase in append order)
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            message_id = conn.execute(
+                "INSERT INTO messages (conversation, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (conversation, role, content, now),
+            ).lastrowid
+            # Per-conversation counters so progress stats never scan the log
+            conn.execute(
+                "INSERT INTO conversations (conversation, messages, user_messages, updated_at) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT (conversation) DO UPDATE SET messages = messages + 1, "
+                "user_messages = user_messages + excluded.user_messages, updated_at = excluded.updated_at",
+                (conversation, int(role == "user"), now),
+            )
+        self._count("appends")
+        return message_id
+
+    def _rows(self, rows) -> List[Dict]:
+        return [{"id": row["id"], "role": row["role"], "content": row["content"]} for row in rows]
+
+    def recent(self, conversation: str, limit: int) -> List[Dict]:
+        """
+        The last `limit` messages, oldest first
+        """
+        rows = self._connection().execute(
+            "SELECT id, role, content FROM messages WHERE conversation = ? ORDER BY id DESC LIMIT ?",
+            (conversation, limit),
+        ).fetchall()
+        return self._rows(reversed(rows))
+
+    def before(self, conversation: str, message_id: int, limit: int) -> List[Dict]:
+        """
+        Up to `limit` messages older than `message_id`, oldest first - for scrolling back
+        """
+        rows = self._connection().execute(
+            "SELECT id, role, content FROM messages WHERE conversation = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (conversation, message_id, limit),
+        ).fetchall()
+        self._count("pages_loaded")
+        return self._rows(reversed(rows))
+
+    def counts(self, conversation: str) -> Dict:
+        """
+        Total and learner message counts for one conversation (O(1))
+        """
+        row = self._connection().execute(
+            "SELECT messages, user_messages FROM conversations WHERE conversation = ?", (conversation,)
+        ).fetchone()
+        if row is None:
+            return {"messages": 0, "user_messages": 0}
+        return {"messages": row["messages"], "user_messages": row["user_messages"]}
+
+    def compact(self) -> Dict:
+        """
+        Drop conversations idle past the retention period, trim very long ones to their
+        newest messages, then checkpoint the WAL and return freed pages to the OS
+        """
+        conn = self._connection()
+        cutoff = time.time() - self.retention_days * 86400
+        removed = 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = [row["conversation"] for row in conn.execute(
+                "SELECT conversation FROM conversations WHERE updated_at < ?", (cutoff,)
+            )]
+            for conversation in expired:
+                removed += conn.execute("DELETE FROM messages WHERE conversation = ?", (conversation,)).rowcount
+                conn.execute("DELETE FROM conversations WHERE conversation = ?", (conversation,))
+
+            oversized = conn.execute(
+                "SELECT conversation FROM conversations WHERE messages > ?", (self.max_messages_per_conversation,)
+            ).fetchall()
+            for row in oversized:
+                conversation = row["conversation"]
+                # The counters keep describing the whole conversation, not just what is still stored
+                removed += conn.execute(
+                    "DELETE FROM messages WHERE conversation = ? AND id < ("
+                    "SELECT id FROM messages WHERE conversation = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (conversation, conversation, self.max_messages_per_conversation - 1),
+                ).rowcount
+
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA incremental_vacuum")
+        self._count("compactions")
+        self._count("removed", removed)
+        return {"expired_conversations": len(expired), "removed_messages": removed}
+
+    def start_compaction(self, interval_seconds: float = 3600) -> threading.Thread:
+        """
+        Run compact() every `interval_seconds` in a daemon thread (once per store)
+        """
+        with self._lock:
+            if self._compactor is not None:
+                return self._compactor
+
+            def _loop():
+                while True:
+                    time.sleep(interval_seconds)
+                    try:
+                        self.compact()
+                    except sqlite3.Error:
+                        # Another process may hold the write lock - try again next round
+                        self._count("errors")
+
+            self._compactor = threading.Thread(target=_loop, name="fluentbot-chat-compaction", daemon=True)
+            self._compactor.start()
+            return self._compactor
+
+    def stats(self) -> Dict:
+        conn = self._connection()
+        with self._lock:
+            stats = dict(self.counters)
+        stats["conversations"] = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        stats["stored_messages"] = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        stats["file_bytes"] = os.path.getsize(self.path)
+        return stats
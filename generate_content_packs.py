@@ -0,0 +1,161 @@
+# Offline batch generator for the lesson content pack
+# Fills roadmap, grammar, daily practice and vocabulary for every language x level
+#
+#   python generate_content_packs.py                  # everything, 8 requests at a time
+#   python generate_content_packs.py --resume         # only fill sections missing from the current pack
+#   python generate_content_packs.py --languages French Japanese --levels Beginner
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+from content_pack import (
+    DEFAULT_PACK_PATH, JSON_ONLY, LANGUAGES, LEVELS, SECTIONS,
+    load_content_pack, parse_json_reply, plain_name, save_content_pack,
+)
+from lexicon import build_lexicon
+from vocab_store import build_vocab_store, builtin_entries, pack_entries
+
+PROMPTS = {
+    "roadmap": (
+        "Create a 30-day {language} learning roadmap for a {level} learner. "
+        'Return {{"weeks": [{{"title": "Week 1: <theme>", "items": ["Days 1-3: <focus>", ...]}}, ...]}} '
+        "with exactly 4 weeks and 3 items per week. " + JSON_ONLY
+    ),
+    "grammar": (
+        "Write one short {language} grammar lesson suited to a {level} learner. "
+        'Return {{"topic": str, "examples": [{{"text": str, "translation": str, "pronunciation": str}}, ...], '
+        '"pattern": str, "practice": str, "answer": str, "tip": str}} with 3 examples. '
+        "Examples must be in {language} native script. " + JSON_ONLY
+    ),
+    "practice": (
+        "Write 10 daily writing practice prompts in English for a {level} {language} learner. "
+        'Return {{"questions": [str, ...]}}. ' + JSON_ONLY
+    ),
+    "vocab": (
+        "List 25 useful {language} vocabulary words for a {level} learner. "
+        'Return {{"words": [{{"word": str, "translation": str, "pronunciation": str, "topic": str}}, ...]}} '
+        "with the word in native script, an English translation and an English-friendly pronunciation guide. "
+        + JSON_ONLY
+    ),
+}
+
+
+def validate_section(section: str, data: dict):
+    """
+    Convert a parsed reply into the stored shape, raising ValueError when fields are missing
+    """
+    if section == "roadmap":
+        weeks = [{"title": str(w["title"]), "items": [str(i) for i in w["items"]]} for w in data["weeks"]]
+        if not weeks:
+            raise ValueError("empty roadmap")
+        return weeks
+    if section == "grammar":
+        lesson = {key: str(data[key]) for key in ("topic", "pattern", "practice", "answer", "tip")}
+        lesson["examples"] = [
+            {"text": str(e["text"]), "translation": str(e["translation"]), "pronunciation": str(e.get("pronunciation", ""))}
+            for e in data["examples"]
+        ]
+        return lesson
+    if section == "practice":
+        questions = [str(q) for q in data["questions"] if str(q).strip()]
+        if not questions:
+            raise ValueError("no practice questions")
+        return questions
+    if section == "vocab":
+        words = [
+            {"word": str(w["word"]), "translation": str(w["translation"]),
+             "pronunciation": str(w.get("pronunciation", "")), "topic": str(w.get("topic", "general")).lower()}
+            for w in data["words"]
+        ]
+        if not words:
+            raise ValueError("no vocabulary words")
+        return words
+    raise ValueError(f"unknown section {section}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate FluentBot lesson content packs")
+    parser.add_argument("--out", default=DEFAULT_PACK_PATH, help="Where to write the pack")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--languages", nargs="*", help="Subset of languages by name (default: all 21)")
+    parser.add_argument("--levels", nargs="*", help="Subset of levels by name (default: all 4)")
+    parser.add_argument("--sections", nargs="*", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--resume", action="store_true", help="Keep the existing pack and fill only missing sections")
+    args = parser.parse_args()
+
+    # Import late so --help works without an API key
+    from backend import backend, run_batch_chat
+
+    languages = [plain_name(label) for label in LANGUAGES]
+    levels = [plain_name(label) for label in LEVELS]
+    if args.languages:
+        languages = [name for name in languages if name in args.languages]
+    if args.levels:
+        levels = [name for name in levels if name in args.levels]
+
+    existing = load_content_pack(args.out) if args.resume else None
+    content = existing["content"] if existing else {}
+
+    targets = []
+    for language in languages:
+        for level in levels:
+            for section in args.sections:
+                if section in content.get(language, {}).get(level, {}):
+                    continue
+                targets.append((language, level, section))
+
+    if not targets:
+        print("Nothing to generate - the pack is already complete.")
+        return 0
+
+    print(f"Generating {len(targets)} sections with concurrency {args.concurrency}...")
+    jobs = [(PROMPTS[section].format(language=language, level=level),) for language, level, section in targets]
+
+    started = time.perf_counter()
+    results = run_batch_chat(jobs, concurrency=args.concurrency)
+    elapsed = time.perf_counter() - started
+
+    failures = []
+    for (language, level, section), result in zip(targets, results):
+        try:
+            if not result.ok:
+                raise result.error
+            value = validate_section(section, parse_json_reply(result.response))
+        except Exception as e:
+            failures.append((language, level, section, e))
+            continue
+        content.setdefault(language, {}).setdefault(level, {})[section] = value
+
+    pack = save_content_pack(content, args.out, model=backend.model)
+    if "vocab" in args.sections:
+        # Keep the quiz's indexed store in step with the pack
+        words = build_vocab_store(itertools.chain(builtin_entries(), pack_entries(pack)),
+                                  os.path.join(os.path.dirname(os.path.abspath(args.out)), "vocab.db"))
+        print(f"Indexed {words} vocabulary words")
+        # ...and the lexicon behind instant word lookups
+        lexicon = build_lexicon(itertools.chain(builtin_entries(), pack_entries(pack)),
+                                os.path.join(os.path.dirname(os.path.abspath(args.out)), "lexicon.bin"))
+        print(f"Wrote lexicon with {lexicon['keys']} lookup keys ({lexicon['bytes'] / 1024:.1f} KB)")
+
+    size_kb = os.path.getsize(args.out) / 1024
+    print(f"Wrote {args.out} ({size_kb:.1f} KB) in {elapsed:.1f}s - "
+          f"{len(targets) - len(failures)} ok, {len(failures)} failed")
+    for language, level, section, error in failures:
+        print(f"  ❌ {language} / {level} / {section}: {error}", file=sys.stderr)
+    if failures:
+        print("Re-run with --resume to retry the failed sections.", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
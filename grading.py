@@ -0,0 +1,224 @@
+# AI grading for Daily Practice answers - one answer from the app, or a whole class from a CSV
+#
+#   python grading.py submissions.csv --out report.json             # 8 answers graded at a time
+#   python grading.py submissions.csv --concurrency 16 --retries 2
+#                                      # CSV columns: student,language,level,question,answer[,reference_answer]
+#
+# Batches go through the backend's async client at "batch" priority, so they queue behind live chat turns.
+
+from typing import Dict, List, Optional, Sequence
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+import argparse
+import csv
+import json
+import statistics
+import sys
+import time
+
+from content_pack import JSON_ONLY, parse_json_reply, plain_name
+
+MAX_SCORE = 10
+
+GRADING_PROMPT = (
+    "Grade this answer from a {level} {language} learner.\n"
+    "Task: {question}\n"
+    "{reference}"
+    "Learner's answer: {answer}\n\n"
+    "Score it from 0 to 10 for task completion, grammar and vocabulary, judged for a {level} learner. "
+    "List each mistake with its correction and a one-sentence explanation in English, "
+    "give a fully corrected version of the answer, and one sentence of encouraging feedback. "
+    'Return {{"score": int, "corrections": [{{"original": str, "correction": str, "explanation": str}}, ...], '
+    '"corrected_answer": str, "feedback": str}}. ' + JSON_ONLY
+)
+
+# Score bands for the class summary
+SCORE_BANDS = (("0-3", 0, 3), ("4-6", 4, 6), ("7-8", 7, 8), ("9-10", 9, 10))
+
+
+@dataclass
+class Grade:
+    """
+    A graded answer: score out of MAX_SCORE plus the corrections behind it
+    """
+    score: int
+    corrections: List[Dict] = field(default_factory=list)
+    corrected_answer: str = ""
+    feedback: str = ""
+
+
+@dataclass
+class Submission:
+    student: str
+    language: str
+    level: str
+    question: str
+    answer: str
+    reference_answer: str = ""
+
+
+@dataclass
+class GradeResult:
+    """
+    Outcome of grading one submission - exactly one of grade / error is set
+    """
+    submission: Submission
+    grade: Optional[Grade] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.grade is not None
+
+
+def grading_prompt(language: str, level: str, question: str, answer: str, reference_answer: str = "") -> str:
+    reference = f"Model answer (for reference, other correct answers are fine): {reference_answer}\n" \
+        if reference_answer else ""
+    return GRADING_PROMPT.format(language=plain_name(language), level=plain_name(level), question=question,
+                                 reference=reference, answer=answer)
+
+
+def parse_grade(text: str) -> Grade:
+    """
+    Turn a grading reply into a Grade, raising ValueError when it is unusable
+    """
+    data = parse_json_reply(text)
+    try:
+        score = int(round(float(data["score"])))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("reply has no numeric score")
+    corrections = [
+        {"original": str(c.get("original", "")), "correction": str(c.get("correction", "")),
+         "explanation": str(c.get("explanation", ""))}
+        for c in data.get("corrections") or [] if isinstance(c, dict)
+    ]
+    return Grade(
+        score=min(max(score, 0), MAX_SCORE),
+        corrections=corrections,
+        corrected_answer=str(data.get("corrected_answer", "")),
+        feedback=str(data.get("feedback", "")),
+    )
+
+
+def grade_answer(language: str, level: str, question: str, answer: str, reference_answer: str = "") -> Grade:
+    """
+    Grade one answer (blocking, interactive priority). Raises ValueError if the
+    service is unavailable or the reply can't be read.
+    """
+    from backend import get_chat_response
+
+    return parse_grade(get_chat_response(grading_prompt(language, level, question, answer, reference_answer)))
+
+
+def grade_batch(submissions: Sequence[Submission], concurrency: int = 8, retries: int = 1) -> List[GradeResult]:
+    """
+    Grade many submissions concurrently (at most `concurrency` in flight). Failed or
+    unreadable gradings are retried up to `retries` times; whatever still fails is
+    reported per submission instead of failing the batch.
+    """
+    from backend import run_batch_chat
+
+    results = [GradeResult(submission=s) for s in submissions]
+    pending = [index for index, s in enumerate(submissions) if s.answer.strip()]
+    for index, s in enumerate(submissions):
+        if not s.answer.strip():
+            results[index].error = "empty answer"
+
+    for _ in range(retries + 1):
+        if not pending:
+            break
+        jobs = [(grading_prompt(s.language, s.level, s.question, s.answer, s.reference_answer),)
+                for s in (submissions[index] for index in pending)]
+        failed = []
+        for index, outcome in zip(pending, run_batch_chat(jobs, concurrency=concurrency)):
+            result = results[index]
+            result.attempts += 1
+            try:
+                if not outcome.ok:
+                    raise outcome.error
+                result.grade, result.error = parse_grade(outcome.response), None
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+                failed.append(index)
+        pending = failed
+    return results
+
+
+def summarize(results: Sequence[GradeResult], elapsed_seconds: float) -> Dict:
+    """
+    Class-level report: score statistics, score bands and the per-student rows
+    """
+    scores = [r.grade.score for r in results if r.ok]
+    summary = {
+        "submissions": len(results),
+        "graded": len(scores),
+        "failed": len(results) - len(scores),
+        "elapsed_seconds": round(elapsed_seconds, 2),
+    }
+    if scores:
+        summary.update({
+            "mean_score": round(statistics.mean(scores), 2),
+            "median_score": statistics.median(scores),
+            "min_score": min(scores),
+            "max_score": max(scores),
+            "bands": {name: sum(1 for s in scores if low <= s <= high) for name, low, high in SCORE_BANDS},
+            "corrections_per_answer": round(
+                statistics.mean(len(r.grade.corrections) for r in results if r.ok), 2),
+        })
+    return summary
+
+
+def read_submissions(path: str) -> List[Submission]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            Submission(
+                student=row.get("student", "").strip() or f"row {number}",
+                language=row["language"].strip(),
+                level=row["level"].strip(),
+                question=row["question"].strip(),
+                answer=row.get("answer") or "",
+                reference_answer=(row.get("reference_answer") or "").strip(),
+            )
+            for number, row in enumerate(csv.DictReader(f), start=2)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade a class's Daily Practice answers")
+    parser.add_argument("submissions", help="CSV with student,language,level,question,answer[,reference_answer]")
+    parser.add_argument("--concurrency", type=int, default=8, help="Gradings in flight at once")
+    parser.add_argument("--retries", type=int, default=1, help="Extra attempts for gradings that failed")
+    parser.add_argument("--out", help="Write the JSON report here as well as stdout")
+    args = parser.parse_args()
+
+    submissions = read_submissions(args.submissions)
+    started = time.perf_counter()
+    results = grade_batch(submissions, concurrency=args.concurrency, retries=args.retries)
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"concurrency": args.concurrency, "retries": args.retries},
+        "summary": summarize(results, elapsed),
+        "results": [
+            {"student": r.submission.student, "question": r.submission.question, "attempts": r.attempts,
+             "grade": asdict(r.grade) if r.grade else None, "error": r.error}
+            for r in results
+        ],
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    summary = report["summary"]
+    print(f"Graded {summary['graded']}/{summary['submissions']} answers in {summary['elapsed_seconds']}s"
+          + (f" - mean score {summary['mean_score']}/{MAX_SCORE}" if summary["graded"] else ""), file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+# Learner analytics - an append-only log of learning events with per-learner rollups kept up to date as they happen
+#
+#   python learning_events.py                                 # cohort report for .cache/learning.db (JSON on stdout)
+#   python learning_events.py --db learning.db --active-days 7 --out cohort.json
+#   python learning_events.py --rebuild                       # recompute every rollup from the event log first
+#
+# The app records messages, quiz answers, practice submissions and lessons viewed; "My Progress" reads only
+# the rollup rows for one learner, so it costs the same after ten events or ten million. Raw events are
+# already folded into the rollups when they are written, so the log only keeps the last `retention_days`.
+
+from typing import Dict, Optional
+from datetime import date, datetime, timezone
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+
+from content_pack import plain_name
+
+DEFAULT_LEARNING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "learning.db")
+
+EVENT_KINDS = ("message", "quiz", "practice", "lesson")
+
+# A quiz word counts as mastered once its persisted review interval reaches this (the scheduler's
+# "mature" cards); reviews ahead of schedule don't grow the interval, so this takes weeks of real reviews
+MASTERED_INTERVAL_DAYS = 21
+# Gaps between a learner's events up to this long count as study time; longer ones start a new session
+SESSION_GAP_SECONDS = 300
+
+STREAK_BANDS = (("0", 0, 0), ("1-2", 1, 2), ("3-6", 3, 6), ("7-29", 7, 29), ("30+", 30, None))
+
+_ROLLUP_TABLES = ("learners", "learner_levels", "learner_languages", "learner_words")
+
+
+class LearningLog:
+    """
+    Learning events in one SQLite file (WAL mode, shared by every worker process).
+
+    Each event is appended and folded into small rollup rows - totals and streak per
+    learner, accuracy per language / level, study time per language and mastery per
+    quiz word - in the same transaction, so progress views never scan the log. Events
+    older than `retention_days` are pruned every few hundred writes (0 = keep them all).
+    """
+
+    def __init__(self, path: str, retention_days: float = 90):
+        self.path = path
+        self.retention_days = retention_days
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.counters = {"events": 0, "pruned_events": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, so each thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "id INTEGER PRIMARY KEY, learner TEXT NOT NULL, kind TEXT NOT NULL, language TEXT NOT NULL, "
+                "level TEXT NOT NULL, item TEXT NOT NULL DEFAULT '', correct INTEGER, score REAL, "
+                "interval_days REAL, created_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS events_learner ON events (learner, id);"
+                "CREATE INDEX IF NOT EXISTS events_created ON events (created_at);"
+                "CREATE TABLE IF NOT EXISTS learners ("
+                "learner TEXT PRIMARY KEY, events INTEGER NOT NULL DEFAULT 0, messages INTEGER NOT NULL DEFAULT 0, "
+                "user_messages INTEGER NOT NULL DEFAULT 0, quiz_answers INTEGER NOT NULL DEFAULT 0, "
+                "quiz_correct INTEGER NOT NULL DEFAULT 0, practice_submissions INTEGER NOT NULL DEFAULT 0, "
+                "lessons_viewed INTEGER NOT NULL DEFAULT 0, words_mastered INTEGER NOT NULL DEFAULT 0, "
+                "study_seconds REAL NOT NULL DEFAULT 0, current_streak INTEGER NOT NULL DEFAULT 0, "
+                "longest_streak INTEGER NOT NULL DEFAULT 0, active_days INTEGER NOT NULL DEFAULT 0, "
+                "last_day INTEGER NOT NULL DEFAULT 0, first_at REAL NOT NULL, last_at REAL NOT NULL) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS learner_levels ("
+                "learner TEXT NOT NULL, language TEXT NOT NULL, level TEXT NOT NULL, "
+                "quiz_answers INTEGER NOT NULL DEFAULT 0, quiz_correct INTEGER NOT NULL DEFAULT 0, "
+                "practice_submissions INTEGER NOT NULL DEFAULT 0, practice_graded INTEGER NOT NULL DEFAULT 0, "
+                "practice_points REAL NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (learner, language, level)) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS learner_languages ("
+                "learner TEXT NOT NULL, language TEXT NOT NULL, events INTEGER NOT NULL DEFAULT 0, "
+                "study_seconds REAL NOT NULL DEFAULT 0, last_at REAL NOT NULL, "
+                "PRIMARY KEY (learner, language)) WITHOUT ROWID;"
+                "CREATE TABLE IF NOT EXISTS learner_words ("
+                "learner TEXT NOT NULL, language TEXT NOT NULL, word TEXT NOT NULL, "
+                "reviews INTEGER NOT NULL DEFAULT 0, mastered INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (learner, language, word)) WITHOUT ROWID;"
+            )
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def record(self, learner: str, kind: str, language: str, level: str, item: str = "",
+               correct: Optional[bool] = None, score: Optional[float] = None,
+               interval_days: Optional[float] = None, now: Optional[float] = None) -> int:
+        """
+        Append one event and update the learner's rollups; returns the event id.
+
+        kind is one of EVENT_KINDS. For "message" item is the role, for "quiz" the word
+        (with correct and the card's new interval_days), for "practice" the question (with
+        score when it was graded) and for "lesson" the section viewed.
+        """
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"unknown event kind {kind!r}")
+        event = {
+            "learner": learner, "kind": kind, "language": plain_name(language), "level": plain_name(level),
+            "item": item, "correct": None if correct is None else int(bool(correct)), "score": score,
+            "interval_days": interval_days, "created_at": time.time() if now is None else now,
+        }
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            event_id = conn.execute(
+                "INSERT INTO events (learner, kind, language, level, item, correct, score, interval_days, created_at) "
+                "VALUES (:learner, :kind, :language, :level, :item, :correct, :score, :interval_days, :created_at)",
+                event,
+            ).lastrowid
+            _apply(conn, event)
+        with self._lock:
+            self.counters["events"] += 1
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= 500
+            if prune:
+                self._writes_since_prune = 0
+        if prune:
+            self.prune_events()
+        return event_id
+
+    def prune_events(self, now: Optional[float] = None) -> int:
+        """
+        Drop raw events older than retention_days - the rollups already hold what they counted
+        """
+        if not self.retention_days:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.retention_days * 86400
+        removed = self._connection().execute("DELETE FROM events WHERE created_at < ?", (cutoff,)).rowcount
+        with self._lock:
+            self.counters["pruned_events"] += removed
+        return removed
+
+    def progress(self, learner: str, now: Optional[float] = None) -> Dict:
+        """
+        Everything "My Progress" shows for one learner, read from the rollups only.
+        The current streak is 0 once a whole day has passed without activity.
+        """
+        conn = self._connection()
+        row = conn.execute("SELECT * FROM learners WHERE learner = ?", (learner,)).fetchone()
+        if row is None:
+            return empty_progress()
+        progress = {key: row[key] for key in row.keys() if key != "learner"}
+        today = date.fromtimestamp(time.time() if now is None else now).toordinal()
+        progress["current_streak"] = row["current_streak"] if row["last_day"] >= today - 1 else 0
+        progress["active_today"] = row["last_day"] == today
+        progress["quiz_accuracy"] = row["quiz_correct"] / row["quiz_answers"] if row["quiz_answers"] else None
+        progress["levels"] = [
+            {"language": level["language"], "level": level["level"], "quiz_answers": level["quiz_answers"],
+             "quiz_accuracy": level["quiz_correct"] / level["quiz_answers"] if level["quiz_answers"] else None,
+             "practice_submissions": level["practice_submissions"],
+             "practice_mean_score": level["practice_points"] / level["practice_graded"]
+             if level["practice_graded"] else None}
+            for level in conn.execute(
+                "SELECT * FROM learner_levels WHERE learner = ? ORDER BY language, level", (learner,))
+        ]
+        progress["languages"] = [
+            {"language": language["language"], "events": language["events"],
+             "study_seconds": language["study_seconds"]}
+            for language in conn.execute(
+                "SELECT language, events, study_seconds FROM learner_languages WHERE learner = ? "
+                "ORDER BY study_seconds DESC", (learner,))
+        ]
+        return progress
+
+    def rebuild(self) -> int:
+        """
+        Recompute every rollup from the event log (after changing how events are
+        counted, or importing events from elsewhere); returns the events replayed.
+        Only events still in the log count, so pruned history drops out of the totals.
+        """
+        conn = self._connection()
+        replayed = 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for table in _ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            # A second connection streams the log while this one writes the rollups
+            reader = sqlite3.connect(self.path, timeout=5)
+            reader.row_factory = sqlite3.Row
+            try:
+                for event in reader.execute("SELECT * FROM events ORDER BY id"):
+                    _apply(conn, dict(event))
+                    replayed += 1
+            finally:
+                reader.close()
+        return replayed
+
+    def cohort(self, active_days: int = 7, now: Optional[float] = None) -> Dict:
+        """
+        Cohort dashboard over every learner, aggregated from the rollups (one row per
+        learner, language or level) rather than from the events themselves
+        """
+        conn = self._connection()
+        today = date.fromtimestamp(time.time() if now is None else now).toordinal()
+        learners = conn.execute(
+            "SELECT words_mastered, study_seconds, longest_streak, active_days, "
+            "CASE WHEN last_day >= ? THEN current_streak ELSE 0 END AS streak, last_day FROM learners",
+            (today - 1,),
+        ).fetchall()
+        totals = conn.execute(
+            "SELECT COUNT(*) AS learners, COALESCE(SUM(events), 0) AS events, "
+            "COALESCE(SUM(messages), 0) AS messages, COALESCE(SUM(quiz_answers), 0) AS quiz_answers, "
+            "COALESCE(SUM(quiz_correct), 0) AS quiz_correct, "
+            "COALESCE(SUM(practice_submissions), 0) AS practice_submissions, "
+            "COALESCE(SUM(lessons_viewed), 0) AS lessons_viewed FROM learners"
+        ).fetchone()
+        report = {key: totals[key] for key in totals.keys()}
+        report["active_learners"] = sum(1 for row in learners if row["last_day"] > today - active_days)
+        report["active_days_window"] = active_days
+        report["quiz_accuracy"] = _ratio(totals["quiz_correct"], totals["quiz_answers"])
+
+        if learners:
+            streaks = [row["streak"] for row in learners]
+            mastered = [row["words_mastered"] for row in learners]
+            minutes = [row["study_seconds"] / 60 for row in learners]
+            report.update({
+                "streaks": {
+                    "mean": round(statistics.mean(streaks), 2),
+                    "longest": max(row["longest_streak"] for row in learners),
+                    "bands": {name: sum(1 for s in streaks if low <= s and (high is None or s <= high))
+                              for name, low, high in STREAK_BANDS},
+                },
+                "words_mastered": {"total": sum(mastered), "mean": round(statistics.mean(mastered), 2),
+                                   "median": statistics.median(mastered), "max": max(mastered)},
+                "study_minutes": {"total": round(sum(minutes), 1), "mean": round(statistics.mean(minutes), 1),
+                                  "median": round(statistics.median(minutes), 1)},
+                "mean_active_days": round(statistics.mean(row["active_days"] for row in learners), 2),
+            })
+
+        report["levels"] = [
+            {"language": row["language"], "level": row["level"], "learners": row["learners"],
+             "quiz_answers": row["quiz_answers"], "quiz_accuracy": _ratio(row["quiz_correct"], row["quiz_answers"]),
+             "practice_submissions": row["practice_submissions"],
+             "practice_mean_score": _ratio(row["practice_points"], row["practice_graded"])}
+            for row in conn.execute(
+                "SELECT language, level, COUNT(*) AS learners, SUM(quiz_answers) AS quiz_answers, "
+                "SUM(quiz_correct) AS quiz_correct, SUM(practice_submissions) AS practice_submissions, "
+                "SUM(practice_graded) AS practice_graded, SUM(practice_points) AS practice_points "
+                "FROM learner_levels GROUP BY language, level ORDER BY language, level")
+        ]
+        report["languages"] = [
+            {"language": row["language"], "learners": row["learners"], "events": row["events"],
+             "study_minutes": round(row["study_seconds"] / 60, 1)}
+            for row in conn.execute(
+                "SELECT language, COUNT(*) AS learners, SUM(events) AS events, SUM(study_seconds) AS study_seconds "
+                "FROM learner_languages GROUP BY language ORDER BY study_seconds DESC")
+        ]
+        return report
+
+    def stats(self) -> Dict:
+        conn = self._connection()
+        with self._lock:
+            stats = dict(self.counters)
+        stats["learners"] = conn.execute("SELECT COUNT(*) FROM learners").fetchone()[0]
+        stats["stored_events"] = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        stats["file_bytes"] = os.path.getsize(self.path)
+        return stats
+
+
+def empty_progress() -> Dict:
+    return {
+        "events": 0, "messages": 0, "user_messages": 0, "quiz_answers": 0, "quiz_correct": 0,
+        "practice_submissions": 0, "lessons_viewed": 0, "words_mastered": 0, "study_seconds": 0.0,
+        "current_streak": 0, "longest_streak": 0, "active_days": 0, "active_today": False,
+        "quiz_accuracy": None, "levels": [], "languages": [],
+    }
+
+
+def _ratio(part, whole) -> Optional[float]:
+    return round(part / whole, 3) if whole else None
+
+
+def _apply(conn: sqlite3.Connection, event: Dict):
+    # Fold one event into the rollups. Every statement touches a single row, so the cost doesn't grow with history.
+    learner, kind, at = event["learner"], event["kind"], event["created_at"]
+    day = date.fromtimestamp(at).toordinal()
+    row = conn.execute(
+        "SELECT current_streak, longest_streak, last_day, last_at FROM learners WHERE learner = ?", (learner,)
+    ).fetchone()
+    if row is None:
+        streak, longest, new_day, gap = 1, 1, 1, 0.0
+    else:
+        current_streak, longest_streak, last_day, last_at = row
+        new_day = int(day > last_day)
+        if day == last_day or day < last_day:
+            streak = current_streak  # same day, or an out-of-order event from an earlier day
+        elif day == last_day + 1:
+            streak = current_streak + 1
+        else:
+            streak = 1
+        longest = max(longest_streak, streak)
+        gap = at - last_at
+        gap = gap if 0 < gap <= SESSION_GAP_SECONDS else 0.0
+
+    mastered_change = 0
+    if kind == "quiz" and event["item"]:
+        previous = conn.execute(
+            "SELECT mastered FROM learner_words WHERE learner = ? AND language = ? AND word = ?",
+            (learner, event["language"], event["item"]),
+        ).fetchone()
+        was_mastered = previous[0] if previous is not None else 0
+        reached = int((event["interval_days"] or 0) >= MASTERED_INTERVAL_DAYS)
+        # Only forgetting the word (a wrong answer) takes mastery away - a correct answer never lowers it
+        mastered = reached if event["correct"] == 0 else max(was_mastered, reached)
+        mastered_change = mastered - was_mastered
+        conn.execute(
+            "INSERT INTO learner_words (learner, language, word, reviews, mastered) VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT (learner, language, word) DO UPDATE SET reviews = reviews + 1, mastered = excluded.mastered",
+            (learner, event["language"], event["item"], mastered),
+        )
+
+    is_message = int(kind == "message")
+    quiz = int(kind == "quiz")
+    quiz_correct = int(quiz and bool(event["correct"]))
+    practice = int(kind == "practice")
+    conn.execute(
+        "INSERT INTO learners (learner, events, messages, user_messages, quiz_answers, quiz_correct, "
+        "practice_submissions, lessons_viewed, words_mastered, study_seconds, current_streak, longest_streak, "
+        "active_days, last_day, first_at, last_at) VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, 0, 1, 1, 1, ?, ?, ?) "
+        "ON CONFLICT (learner) DO UPDATE SET events = events + 1, messages = messages + excluded.messages, "
+        "user_messages = user_messages + excluded.user_messages, "
+        "quiz_answers = quiz_answers + excluded.quiz_answers, quiz_correct = quiz_correct + excluded.quiz_correct, "
+        "practice_submissions = practice_submissions + excluded.practice_submissions, "
+        "lessons_viewed = lessons_viewed + excluded.lessons_viewed, "
+        "words_mastered = words_mastered + excluded.words_mastered, study_seconds = study_seconds + ?, "
+        "current_streak = ?, longest_streak = ?, active_days = active_days + ?, last_day = MAX(last_day, ?), "
+        "last_at = MAX(last_at, excluded.last_at)",
+        (learner, is_message, int(is_message and event["item"] == "user"), quiz, quiz_correct, practice,
+         int(kind == "lesson"), mastered_change, day, at, at, gap, streak, longest, new_day, day),
+    )
+
+    graded = int(practice and event["score"] is not None)
+    if quiz or practice:
+        conn.execute(
+            "INSERT INTO learner_levels (learner, language, level, quiz_answers, quiz_correct, practice_submissions, "
+            "practice_graded, practice_points) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (learner, language, level) DO UPDATE SET quiz_answers = quiz_answers + excluded.quiz_answers, "
+            "quiz_correct = quiz_correct + excluded.quiz_correct, "
+            "practice_submissions = practice_submissions + excluded.practice_submissions, "
+            "practice_graded = practice_graded + excluded.practice_graded, "
+            "practice_points = practice_points + excluded.practice_points",
+            (learner, event["language"], event["level"], quiz, quiz_correct, practice, graded,
+             event["score"] if graded else 0.0),
+        )
+    conn.execute(
+        "INSERT INTO learner_languages (learner, language, events, study_seconds, last_at) VALUES (?, ?, 1, ?, ?) "
+        "ON CONFLICT (learner, language) DO UPDATE SET events = events + 1, "
+        "study_seconds = study_seconds + excluded.study_seconds, last_at = MAX(last_at, excluded.last_at)",
+        (learner, event["language"], gap, at),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cohort-level learning analytics from the learning event log")
+    parser.add_argument("--db", default=os.environ.get("FLUENTBOT_LEARNING_DB", DEFAULT_LEARNING_PATH),
+                        help="Learning event database")
+    parser.add_argument("--active-days", type=int, default=7, help="Learners active within this many days count as active")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompute all rollups from the event log first (only events still kept count)")
+    parser.add_argument("--out", help="Write the JSON report here as well as stdout")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No learning database at {args.db}", file=sys.stderr)
+        return 1
+    log = LearningLog(args.db)
+    started = time.perf_counter()
+    replayed = log.rebuild() if args.rebuild else None
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "database": args.db,
+        "cohort": log.cohort(active_days=args.active_days),
+    }
+    if replayed is not None:
+        report["rebuilt_from_events"] = replayed
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    cohort = report["cohort"]
+    print(f"{cohort['learners']} learners ({cohort['active_learners']} active in the last {args.active_days} days), "
+          f"{cohort['events']} events in {report['elapsed_seconds']}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+import math
+import re
+import threading
+import time
+import unicodedata
+
+from content_pack import LANGUAGES, LEVELS, format_grammar, format_roadmap, load_content_pack, plain_name
+from vocab_store import builtin_entries, pack_entries
+
+# Curated answers to the questions learners ask most about studying (and about FluentBot itself):
+# (question, other words learners use for it, answer)
+FAQ = (
+    ("What languages can I learn with FluentBot?", "available supported offer teach list",
+     "FluentBot covers " + ", ".join(plain_name(label) for label in LANGUAGES) + ". Pick one under "
+     "**🌍 Choose Your Language** in the sidebar, and your level under **Your Level**."),
+    ("Which level should I choose?", "pick select start beginner elementary intermediate advanced right",
+     "**🌱 Beginner** if you know only a few words, **📚 Elementary** if you can handle greetings and simple "
+     "sentences, **🎯 Intermediate** if you can hold a basic conversation, and **🚀 Advanced** if you want to "
+     "polish fluency and nuance. Not sure? Start one level lower and take the **🧠 Vocabulary Quiz** - "
+     "if it feels easy, move up."),
+    ("How long should I study every day?", "daily time minutes hours per practice often",
+     "Short daily sessions beat long weekly ones. Aim for **30 minutes a day**: 10 minutes of vocabulary review, "
+     "10 minutes of grammar or reading, and 10 minutes of writing or conversation practice with FluentBot."),
+    ("How do I remember new vocabulary?", "memorize retain learn words faster forget",
+     "Use **spaced repetition**: review a word just before you would forget it. The **🧠 Vocabulary Quiz** does "
+     "this for you - words you miss come back soon, words you know come back later. Learn words in small "
+     "themed groups, say them out loud, and use each new word in a sentence of your own."),
+    ("How does the vocabulary quiz work?", "quiz test flashcards use",
+     "Open **🧠 Vocabulary Quiz** in the sidebar. Type the English meaning of each word and press **Check**, or "
+     "reveal the answer if you don't know it. Your answers schedule each word's next review, so the quiz "
+     "focuses on the words you find hardest."),
+    ("What is daily practice?", "daily practice writing task exercise use",
+     "**📝 Daily Practice** gives you a short writing task for your language and level. Write your answer and "
+     "submit it to get a score out of 10, corrections for each mistake and a corrected version. Press "
+     "**New Question** for another task."),
+    ("What is the 30-day roadmap?", "roadmap plan schedule month curriculum",
+     "**📅 30-Day Roadmap** is a four-week plan for your language and level: foundations first, then daily-life "
+     "topics, communication skills and finally review. Follow one item every day or two and use the quiz and "
+     "daily practice alongside it."),
+    ("How do I learn grammar?", "study grammar rules improve",
+     "Learn grammar in context: read the pattern, study a few examples, then produce your own sentences. Open "
+     "**📖 Grammar Lesson** for a short lesson with examples and a practice exercise, and ask FluentBot to "
+     "explain anything that is unclear."),
+    ("How can I practise conversation?", "practice speaking talk chat roleplay dialogue",
+     "Ask FluentBot for a role-play - ordering food, asking for directions, meeting someone new - and reply in "
+     "your target language. FluentBot keeps the conversation going and points out mistakes as you go."),
+    ("How can I improve my pronunciation?", "pronunciation pronounce accent speaking sound tips",
+     "Listen first, then imitate: repeat short phrases out loud right after a native recording, record yourself "
+     "and compare. FluentBot gives an English-friendly pronunciation guide for every word - stress the syllable "
+     "written in capitals."),
+    ("How do I learn a new writing system or alphabet?", "script characters letters read write kanji hiragana hangul",
+     "Learn the script in small sets of characters, a few each day, with the sound and an example word for each. "
+     "Write them by hand, read the romanization alongside native script at first, and drop it once you can."),
+    ("How long does it take to learn a language?", "fluent fluency months years become",
+     "With 30 minutes a day most learners reach simple everyday conversation in 3-6 months. Languages close to "
+     "English (Spanish, Italian, Dutch, Swedish...) tend to go faster than those with a new script or very "
+     "different grammar (Japanese, Chinese, Korean, Arabic...). Consistency matters more than speed."),
+    ("How do I track my progress?", "progress stats statistics see check",
+     "Open **📈 My Progress** in the sidebar to see your chat activity and today's goals. Taking the quiz and "
+     "daily practice regularly is the best measure of how far you have come."),
+    ("I keep forgetting what I learned. What should I do?", "forget remember review",
+     "Forgetting is normal. Review little and often with the vocabulary quiz, re-read the previous grammar "
+     "lesson before starting a new one, and use new words in daily practice so they stick."),
+    ("How do I stay motivated?", "motivation motivated keep going give up bored",
+     "Set a small daily goal - five new words and one short conversation - and keep a streak going. Learn with "
+     "topics you enjoy (music, food, travel), and celebrate small wins like your first full conversation."),
+)
+
+# Words that say how the learner asks, not what about
+STOPWORDS = frozenset("""
+a an the is are am was were be been being do does did i you he she it we they me my your our this that these
+those what whats which who whom how why when where can could would should will shall may might must to of in on
+at for from by with about as into and or but if so not no please tell give show explain know want need let lets
+say said says mean means meaning meant translate translation translated word words phrase called language
+some any there here just also very really each every get got fluentbot
+""".split())
+
+_LANGUAGE_NAMES = {}
+for _label in LANGUAGES:
+    _name = plain_name(_label)
+    for _token in re.findall(r"\w+", _name.lower()):
+        _LANGUAGE_NAMES[_token] = _name
+_LEVEL_NAMES = {plain_name(label).lower(): plain_name(label) for label in LEVELS}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# Scripts written without spaces - each character is also indexed on its own
+_UNSPACED = re.compile(r"[฀-๿぀-ヿ㐀-鿿가-힯]")
+_CONTEXT = re.compile(r"\[Language Learning: (.+?) - (.+?)\]")
+
+
+def _fold(token: str) -> str:
+    # "adiós" -> "adios", but only where the result is plain ASCII (Devanagari or Thai marks are kept)
+    folded = "".join(ch for ch in unicodedata.normalize("NFKD", token) if not unicodedata.combining(ch))
+    return folded if folded.isascii() else token
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(_fold(token))
+        if len(token) > 1 and _UNSPACED.search(token):
+            tokens.extend(ch for ch in token if _UNSPACED.match(ch))
+    return tokens
+
+
+def parse_language_context(language_context: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (language, level) plain names from a "[Language Learning: 🇫🇷 French - 🌱 Beginner] " prefix
+    """
+    match = _CONTEXT.search(language_context or "")
+    if not match:
+        return None, None
+    return plain_name(match.group(1).strip()), plain_name(match.group(2).strip())
+
+
+@dataclass
+class LessonDoc:
+    kind: str                 # "vocab", "grammar", "roadmap" or "faq"
+    title: str
+    text: str                 # what is searched
+    answer: str               # what is shown
+    language: Optional[str] = None
+    level: Optional[str] = None
+
+
+@dataclass
+class Hit:
+    doc: LessonDoc
+    score: float
+    coverage: float           # share of the query's terms found in the document
+
+
+class LessonIndex:
+    """
+    In-memory BM25 index over FluentBot's own lesson content: vocabulary, grammar lessons,
+    roadmaps and the FAQ. Built once per process; a search is a few dict lookups per query term.
+    """
+
+    def __init__(self, docs: Iterable[LessonDoc], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: List[LessonDoc] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._lengths: List[int] = []
+
+        started = time.perf_counter()
+        for doc in docs:
+            doc_id = len(self.docs)
+            self.docs.append(doc)
+            terms = Counter(token for token in tokenize(doc.text) if token not in STOPWORDS)
+            self._lengths.append(sum(terms.values()))
+            for term, count in terms.items():
+                self._postings[term].append((doc_id, count))
+        self._postings = dict(self._postings)
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 1.0
+        count = len(self.docs)
+        self._idf = {term: math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self._postings.items()}
+        self.build_seconds = time.perf_counter() - started
+
+    def search(self, query: str, language: Optional[str] = None, level: Optional[str] = None, k: int = 5,
+               kinds: Optional[Sequence[str]] = None) -> List[Hit]:
+        """
+        Best matches for `query`. A language named in the query ("... in Spanish") wins over
+        `language`; documents for other languages are left out, FAQ answers always qualify.
+        """
+        tokens = tokenize(query)
+        named = [_LANGUAGE_NAMES[t] for t in tokens if t in _LANGUAGE_NAMES]
+        if named:
+            language = named[-1]
+        terms = list(dict.fromkeys(t for t in tokens if t not in STOPWORDS and t not in _LANGUAGE_NAMES
+                                   and t not in _LEVEL_NAMES))
+        if not terms:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for term in terms:
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self._postings[term]:
+                doc = self.docs[doc_id]
+                if language and doc.language and doc.language != language:
+                    continue
+                if kinds and doc.kind not in kinds:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+                matched[doc_id] += 1
+
+        hits = []
+        for doc_id, score in scores.items():
+            doc = self.docs[doc_id]
+            if level and doc.level == level:
+                score *= 1.2
+            hits.append(Hit(doc, score, matched[doc_id] / len(terms)))
+        hits.sort(key=lambda hit: (hit.coverage, hit.score), reverse=True)
+        return hits[:k]
+
+    def answer(self, query: str, language: Optional[str] = None, level: Optional[str] = None,
+               kinds: Optional[Sequence[str]] = None, min_coverage: float = 1.0) -> Optional[str]:
+        """
+        A ready-made reply when the best match covers at least `min_coverage` of the query,
+        else None. Vocabulary matches are listed together (up to three).
+        """
+        hits = [hit for hit in self.search(query, language, level, k=5, kinds=kinds) if hit.coverage >= min_coverage]
+        if not hits:
+            return None
+        best = hits[0]
+        if best.doc.kind != "vocab":
+            return best.doc.answer
+        return "\n\n".join(hit.doc.answer for hit in hits[:3] if hit.doc.kind == "vocab")
+
+    def stats(self) -> Dict:
+        return {
+            "documents": len(self.docs),
+            "terms": len(self._postings),
+            "by_kind": dict(Counter(doc.kind for doc in self.docs)),
+            "build_ms": round(self.build_seconds * 1000, 1),
+        }
+
+
+def vocab_doc(entry: Dict) -> LessonDoc:
+    pronunciation = f"\n🗣️ Pronunciation: {entry['pronunciation']}" if entry.get("pronunciation") else ""
+    return LessonDoc(
+        kind="vocab",
+        title=entry["word"],
+        text=f"{entry['word']} {entry['translation']} {entry.get('topic', '')}",
+        answer=f"**{entry['word']}** - {entry['translation']} ({entry['language']}, {entry['level']}){pronunciation}",
+        language=entry["language"],
+        level=entry["level"],
+    )
+
+
+def lesson_docs(pack: Optional[Dict]) -> Iterable[LessonDoc]:
+    """
+    Every searchable document: starter + pack vocabulary, pack grammar lessons and roadmaps, the FAQ
+    """
+    for entry in builtin_entries():
+        yield vocab_doc(entry)
+    for entry in pack_entries(pack):
+        yield vocab_doc(entry)
+    for language, levels in (pack["content"].items() if pack else ()):
+        for level, sections in levels.items():
+            lesson = sections.get("grammar")
+            if lesson:
+                examples = " ".join(f"{e['text']} {e['translation']}" for e in lesson["examples"])
+                yield LessonDoc("grammar", lesson["topic"],
+                                f"grammar {lesson['topic']} {lesson['pattern']} {examples} {lesson['tip']}",
+                                format_grammar(lesson, language, level), language, level)
+            weeks = sections.get("roadmap")
+            if weeks:
+                items = " ".join(f"{week['title']} {' '.join(week['items'])}" for week in weeks)
+                yield LessonDoc("roadmap", f"30-day {language} roadmap", f"roadmap plan 30 day {items}",
+                                format_roadmap(weeks, language, level), language, level)
+    for question, keywords, answer in FAQ:
+        yield LessonDoc("faq", question, f"{question} {keywords}", answer)
+
+
+_index: Optional[LessonIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_lesson_index() -> LessonIndex:
+    """
+    The process-wide index, built from the lesson pack on first call
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LessonIndex(lesson_docs(load_content_pack()))
+    return _index
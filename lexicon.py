@@ -0,0 +1,374 @@
+# Compact bilingual lexicon for instant "how do I say X" answers and word autocomplete
+#
+#   python lexicon.py                                   # build content/lexicon.bin from the vocab store (or pack + starter words)
+#   python lexicon.py --csv words.csv --out content/lexicon.bin
+#                                   # CSV columns: language,level,topic,word,translation,pronunciation[,romanization]
+#
+# The file is a path-compressed byte trie. It is memory-mapped read-only, so every session (and every
+# worker process) shares one copy through the page cache, and a lookup touches only the nodes on its path.
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import deque
+from functools import lru_cache
+import argparse
+import csv
+import itertools
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import unicodedata
+
+from content_pack import LANGUAGES, LEVELS, load_content_pack, plain_name
+from vocab_store import DEFAULT_VOCAB_PATH, VocabStore, builtin_entries, pack_entries
+
+LEXICON_MAGIC = b"FBLX"
+LEXICON_VERSION = 1
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "lexicon.bin")
+
+LANGUAGE_NAMES = [plain_name(label) for label in LANGUAGES]
+LEVEL_NAMES = [plain_name(label) for label in LEVELS]
+
+# Key spaces inside each language: English meaning -> word, and word (native script or romanized) -> meaning
+ENGLISH, NATIVE = b"e", b"n"
+
+_HEADER = struct.Struct("<4sHHIII")   # magic, version, reserved, root offset, entries, keys
+_NODE = struct.Struct("<BHH")         # edge length, children, entries - then edge, child first bytes, offsets
+_U32 = struct.Struct("<I")
+_ENTRY = struct.Struct("<BB")         # language, level - then five u16-length-prefixed strings
+_FIELDS = ("word", "romanization", "pronunciation", "translation", "topic")
+_MAX_EDGE = 255
+
+_LOOKUP_PATTERNS = (
+    # (pattern, key space to search first)
+    (re.compile(r"^how (?:do|would|can|should) (?:i|you|we) (?:say|write) (.+?)(?: in ([\w() ]+?))?$"), ENGLISH),
+    (re.compile(r"^how to (?:say|write) (.+?)(?: in ([\w() ]+?))?$"), ENGLISH),
+    (re.compile(r"^what(?:'s| is) (?:the (?:\w+ )?word for )?(.+?) in ([\w() ]+?)$"), ENGLISH),
+    (re.compile(r"^(?:the )?(?:\w+ )?word for (.+?)(?: in ([\w() ]+?))?$"), ENGLISH),
+    (re.compile(r"^translate (.+?)(?: (?:in|into|to) ([\w() ]+?))?$"), ENGLISH),
+    (re.compile(r"^what does (.+?) mean(?: in ([\w() ]+?))?$"), NATIVE),
+    (re.compile(r"^(?:what is )?(?:the )?meaning of (.+?)(?: in ([\w() ]+?))?$"), NATIVE),
+)
+
+
+def normalize_key(text: str) -> str:
+    """
+    Lookup form of a word or meaning: lower case, no surrounding quotes or punctuation,
+    accents dropped where that leaves plain ASCII ("Adiós" -> "adios", "猫" stays "猫")
+    """
+    text = unicodedata.normalize("NFKC", text).lower().strip()
+    text = re.sub(r"\s+", " ", text).strip(" \t\"'“”‘’«»「」.,!?¿¡:;")
+    folded = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return folded if folded.isascii() else text
+
+
+def meaning_keys(translation: str) -> Iterator[str]:
+    # "Hello/Good morning" -> "hello", "good morning"; "to eat" also answers for "eat"
+    for part in re.split(r"[/,;]", translation):
+        key = normalize_key(re.sub(r"\(.*?\)", "", part))
+        if not key:
+            continue
+        yield key
+        for article in ("to ", "the ", "a ", "an "):
+            if key.startswith(article) and len(key) > len(article):
+                yield key[len(article):]
+
+
+def language_id(language: str) -> Optional[int]:
+    # Sidebar labels ("🇨🇳 Chinese (Mandarin)"), plain names, or one word of them ("mandarin")
+    name = language.strip()
+    if name and not name[0].isalnum():
+        name = plain_name(name)
+    name = name.lower()
+    for index, known in enumerate(LANGUAGE_NAMES):
+        if name == known.lower() or name in known.lower().replace("(", "").replace(")", "").split():
+            return index
+    return None
+
+
+class _BuildNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: Dict[int, "_BuildNode"] = {}
+        self.entries: List[int] = []
+
+
+def build_lexicon(entries: Iterable[Dict], path: str = DEFAULT_LEXICON_PATH) -> Dict:
+    """
+    Write a lexicon file atomically from vocab entries (language, level, topic, word, translation,
+    pronunciation and optionally romanization). Returns {"entries", "keys", "bytes"}.
+    """
+    records = bytearray(_HEADER.size)
+    root = _BuildNode()
+    keys = 0
+    seen = set()
+
+    def insert(key: bytes, offset: int):
+        nonlocal keys
+        node = root
+        for byte in key:
+            node = node.children.setdefault(byte, _BuildNode())
+        if not node.entries:
+            keys += 1
+        if offset not in node.entries:
+            node.entries.append(offset)
+
+    count = 0
+    for entry in entries:
+        lang = language_id(entry.get("language", ""))
+        word = (entry.get("word") or "").strip()
+        translation = (entry.get("translation") or "").strip()
+        if lang is None or not word or not translation:
+            continue
+        identity = (lang, word, translation)
+        if identity in seen:
+            continue
+        seen.add(identity)
+        level = plain_name(entry.get("level") or "")
+        offset = len(records)
+        records += _ENTRY.pack(lang, LEVEL_NAMES.index(level) if level in LEVEL_NAMES else 255)
+        for name in _FIELDS:
+            value = (entry.get(name) or "").strip().encode("utf-8")[:65535]
+            records += struct.pack("<H", len(value)) + value
+        count += 1
+
+        prefix = bytes([lang])
+        for key in set(meaning_keys(translation)):
+            insert(prefix + ENGLISH + key.encode("utf-8"), offset)
+        for form in (word, entry.get("romanization") or ""):
+            key = normalize_key(form)
+            if key:
+                insert(prefix + NATIVE + key.encode("utf-8"), offset)
+
+    out = records
+
+    def write(node: _BuildNode, edge: bytes) -> int:
+        # Path compression: single-child chains without entries collapse into one edge
+        while len(node.children) == 1 and not node.entries and len(edge) < _MAX_EDGE:
+            (byte, child), = node.children.items()
+            edge += bytes([byte])
+            node = child
+        children = sorted(node.children.items())
+        child_offsets = [write(child, bytes([byte])) for byte, child in children]
+        offset = len(out)
+        out.extend(_NODE.pack(len(edge), len(children), len(node.entries)))
+        out.extend(edge)
+        out.extend(bytes(byte for byte, _ in children))
+        for value in itertools.chain(child_offsets, node.entries):
+            out.extend(_U32.pack(value))
+        return offset
+
+    root_offset = write(root, b"")
+    out[:_HEADER.size] = _HEADER.pack(LEXICON_MAGIC, LEXICON_VERSION, 0, root_offset, count, keys)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(out)
+    os.replace(tmp_path, path)
+    return {"entries": count, "keys": keys, "bytes": len(out)}
+
+
+class Lexicon:
+    """
+    Read-only, memory-mapped lexicon written by build_lexicon
+    """
+
+    def __init__(self, path: str = DEFAULT_LEXICON_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._root, self.entry_count, self.key_count = _HEADER.unpack_from(self._data, 0)
+        if magic != LEXICON_MAGIC or version != LEXICON_VERSION:
+            raise ValueError(f"{path} is not a version {LEXICON_VERSION} FluentBot lexicon")
+        # Decoded entries, cached per lexicon so a dropped one (and its mmap) can be freed
+        self.entry = lru_cache(maxsize=8192)(self._entry)
+
+    def _node(self, offset: int) -> Tuple[bytes, bytes, int, int]:
+        # (edge, child first bytes, offset of the child offsets, entry count)
+        edge_length, children, entries = _NODE.unpack_from(self._data, offset)
+        start = offset + _NODE.size
+        edge = self._data[start:start + edge_length]
+        firsts = self._data[start + edge_length:start + edge_length + children]
+        return edge, firsts, start + edge_length + children, entries
+
+    def _find(self, key: bytes, prefix: bool = False) -> Optional[int]:
+        """
+        Node for `key`. With prefix=True the node whose path starts with `key` (it may extend past it).
+        """
+        offset, position = self._root, 0
+        while True:
+            edge, firsts, pointers, _ = self._node(offset)
+            remaining = key[position:]
+            if len(remaining) < len(edge):
+                return offset if prefix and edge.startswith(remaining) else None
+            if not remaining.startswith(edge):
+                return None
+            position += len(edge)
+            if position == len(key):
+                return offset
+            index = firsts.find(key[position:position + 1])
+            if index < 0:
+                return None
+            offset = _U32.unpack_from(self._data, pointers + 4 * index)[0]
+
+    def _entries_at(self, offset: int) -> List[int]:
+        _, firsts, pointers, entries = self._node(offset)
+        start = pointers + 4 * len(firsts)
+        return [_U32.unpack_from(self._data, start + 4 * i)[0] for i in range(entries)]
+
+    def _entry(self, offset: int) -> Dict:
+        language, level = _ENTRY.unpack_from(self._data, offset)
+        entry = {"language": LANGUAGE_NAMES[language], "level": LEVEL_NAMES[level] if level < len(LEVEL_NAMES) else ""}
+        position = offset + _ENTRY.size
+        for name in _FIELDS:
+            length = struct.unpack_from("<H", self._data, position)[0]
+            entry[name] = self._data[position + 2:position + 2 + length].decode("utf-8")
+            position += 2 + length
+        return entry
+
+    def _key(self, language: str, space: bytes, text: str) -> Optional[bytes]:
+        lang = language_id(language)
+        if lang is None:
+            return None
+        key = normalize_key(text)
+        return bytes([lang]) + space + key.encode("utf-8") if key else None
+
+    def lookup(self, language: str, text: str, space: bytes = ENGLISH) -> List[Dict]:
+        """
+        Exact matches: words meaning `text` (space=ENGLISH) or entries for the word `text` (space=NATIVE)
+        """
+        key = self._key(language, space, text)
+        offset = self._find(key) if key else None
+        return [self.entry(e) for e in self._entries_at(offset)] if offset is not None else []
+
+    def complete(self, language: str, prefix: str, space: bytes = ENGLISH, k: int = 8) -> List[Dict]:
+        """
+        Up to k entries whose key starts with `prefix`, shortest keys first
+        """
+        key = self._key(language, space, prefix)
+        start = self._find(key, prefix=True) if key else None
+        if start is None:
+            return []
+        found, results = set(), []
+        queue = deque([start])
+        while queue and len(results) < k:
+            offset = queue.popleft()
+            for entry_offset in self._entries_at(offset):
+                if entry_offset not in found:
+                    found.add(entry_offset)
+                    results.append(self.entry(entry_offset))
+            _, firsts, pointers, _ = self._node(offset)
+            queue.extend(_U32.unpack_from(self._data, pointers + 4 * i)[0] for i in range(len(firsts)))
+        return results[:k]
+
+    def stats(self) -> Dict:
+        return {"entries": self.entry_count, "keys": self.key_count, "file_bytes": len(self._data)}
+
+    def close(self):
+        self._data.close()
+
+
+def parse_lookup(text: str) -> Optional[Tuple[str, Optional[str], bytes]]:
+    """
+    (term, language named in the question or None, key space) for "how do I say X in Y" style
+    questions, or None when `text` isn't a single word / phrase lookup
+    """
+    question = re.sub(r"\s+", " ", text.strip().lower()).rstrip(" ?!.")
+    for pattern, space in _LOOKUP_PATTERNS:
+        match = pattern.match(question)
+        if match:
+            term, named = match.group(1), match.group(2)
+            if named is not None and language_id(named) is None:
+                # "in the morning", "in a restaurant" - part of the phrase, not a language
+                term, named = f"{term} in {named}", None
+            if len(term.split()) <= 4:
+                return term, named, space
+    return None
+
+
+def format_entry(entry: Dict) -> str:
+    romanization = f" ({entry['romanization']})" if entry.get("romanization") else ""
+    pronunciation = f"\n🗣️ Pronunciation: {entry['pronunciation']}" if entry.get("pronunciation") else ""
+    return f"**{entry['word']}**{romanization} - {entry['translation']} ({entry['language']}){pronunciation}"
+
+
+def answer_lookup(lexicon: "Lexicon", text: str, language: Optional[str]) -> Optional[str]:
+    """
+    A reply for a single word / phrase lookup, or None if `text` isn't one or the word is unknown
+    """
+    parsed = parse_lookup(text)
+    if parsed is None:
+        return None
+    term, named, space = parsed
+    language = named or language
+    if not language:
+        return None
+    other = NATIVE if space == ENGLISH else ENGLISH
+    entries = lexicon.lookup(language, term, space) or lexicon.lookup(language, term, other)
+    if not entries:
+        return None
+    return "\n\n".join(format_entry(entry) for entry in entries[:3])
+
+
+def lexicon_entries(pack: Optional[Dict] = None, csv_paths: Iterable[str] = ()) -> Iterator[Dict]:
+    """
+    Words for the lexicon: the built vocab store if there is one, otherwise starter + pack words; plus CSVs
+    """
+    store = VocabStore(DEFAULT_VOCAB_PATH)
+    if store.available:
+        yield from store.entries()
+    else:
+        yield from builtin_entries()
+        yield from pack_entries(pack if pack is not None else load_content_pack())
+    for path in csv_paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield {key: (value or "").strip() for key, value in row.items() if key}
+
+
+_lexicon: Optional[Lexicon] = None
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon() -> Optional[Lexicon]:
+    """
+    The process-wide lexicon: content/lexicon.bin, else one built into .cache/ from the available words
+    (None if neither can be opened)
+    """
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                try:
+                    _lexicon = Lexicon(DEFAULT_LEXICON_PATH)
+                except (OSError, ValueError):
+                    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "lexicon.bin")
+                    try:
+                        build_lexicon(lexicon_entries(), path)
+                        _lexicon = Lexicon(path)
+                    except (OSError, ValueError):
+                        return None
+    return _lexicon
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the FluentBot bilingual lexicon")
+    parser.add_argument("--out", default=DEFAULT_LEXICON_PATH, help="Where to write the lexicon")
+    parser.add_argument("--pack", default=None, help="Lesson pack to take vocab from when there is no vocab store")
+    parser.add_argument("--csv", nargs="*", default=[],
+                        help="Extra word lists (language,level,topic,word,translation,pronunciation[,romanization])")
+    args = parser.parse_args()
+
+    pack = load_content_pack(args.pack) if args.pack else None
+    stats = build_lexicon(lexicon_entries(pack, args.csv), args.out)
+    print(f"Wrote {args.out}: {stats['entries']} words, {stats['keys']} lookup keys, {stats['bytes'] / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# Load-test harness for get_chat_response / stream_chat_response
+#
+#   python loadtest.py --mock --concurrency 32 --requests 2000 --out results.json
+#   python loadtest.py --mock --stream --error-rate 0.05 --latency lognormal:0.8:0.6
+#   python loadtest.py --mock --baseline results.json --max-regression 0.15   # exit 1 on a p95/p99 regression
+#
+# With --mock a local OpenRouter stand-in is started in-process, so no API credit is used.
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from mock_openrouter import add_mock_arguments, mock_from_args
+
+QUESTIONS = [
+    "How do I say hello in French?",
+    "What is 'cat' in Spanish?",
+    "Explain the difference between ser and estar",
+    "Give me a short conversation practice about ordering coffee",
+    "How do Japanese particles wa and ga differ?",
+    "Correct this sentence: Je suis allé au magasin hier et j'ai acheté des pommes",
+]
+
+
+def percentile(ordered, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, ttfts, errors: int, total: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    report = {
+        "requests": total,
+        "succeeded": total - errors,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50) * 1000, 1),
+            "p95": round(percentile(ordered, 0.95) * 1000, 1),
+            "p99": round(percentile(ordered, 0.99) * 1000, 1),
+            "mean": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+            "max": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+        },
+    }
+    if ttfts:
+        ordered_ttft = sorted(ttfts)
+        report["ttft_ms"] = {
+            "p50": round(percentile(ordered_ttft, 0.50) * 1000, 1),
+            "p95": round(percentile(ordered_ttft, 0.95) * 1000, 1),
+            "p99": round(percentile(ordered_ttft, 0.99) * 1000, 1),
+        }
+    return report
+
+
+def breakdown(records) -> dict:
+    """
+    Where the time went, from the backend's per-call metrics records
+    """
+    report = {}
+    for field in ("queue_seconds", "connect_seconds", "ttfb_seconds", "first_token_seconds", "total_seconds"):
+        ordered = sorted(getattr(r, field) for r in records if getattr(r, field) is not None)
+        if ordered:
+            report[field.replace("_seconds", "_ms")] = {
+                "p50": round(percentile(ordered, 0.50) * 1000, 1),
+                "p95": round(percentile(ordered, 0.95) * 1000, 1),
+            }
+    report["prompt_tokens"] = sum(r.prompt_tokens or 0 for r in records)
+    report["completion_tokens"] = sum(r.completion_tokens or 0 for r in records)
+    report["new_connections"] = sum(r.new_connections for r in records)
+    return report
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """
+    Metrics that got worse than the baseline by more than `max_regression` (fractional)
+    """
+    problems = []
+    for metric in ("p95", "p99"):
+        old, new = baseline["results"]["latency_ms"][metric], report["results"]["latency_ms"][metric]
+        if old and new > old * (1 + max_regression):
+            problems.append(f"latency {metric} {old}ms -> {new}ms")
+    old_rps, new_rps = baseline["results"]["throughput_rps"], report["results"]["throughput_rps"]
+    if old_rps and new_rps < old_rps * (1 - max_regression):
+        problems.append(f"throughput {old_rps} -> {new_rps} req/s")
+    old_err, new_err = baseline["results"]["error_rate"], report["results"]["error_rate"]
+    if new_err > old_err + max_regression / 10:
+        problems.append(f"error rate {old_err} -> {new_err}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FluentBot load-test benchmark")
+    parser.add_argument("--concurrency", type=int, default=16, help="Simulated concurrent sessions")
+    parser.add_argument("--requests", type=int, default=500, help="Total chat turns to send")
+    parser.add_argument("--stream", action="store_true", help="Use stream_chat_response and record time to first token")
+    parser.add_argument("--history-turns", type=int, default=4, help="Prior turns sent with each request")
+    parser.add_argument("--unique", action="store_true", help="Make every question unique (defeats cache / coalescing)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Write the JSON report here as well as stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed fractional slowdown vs baseline")
+    parser.add_argument("--mock", action="store_true", help="Start the local OpenRouter stand-in")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    mock = None
+    if args.mock:
+        mock = mock_from_args(args).start()
+        os.environ["FLUENTBOT_API_URL"] = mock.url
+        os.environ.setdefault("OPENROUTER_API_KEY", "mock-key")
+        # Measure the backend, not our own outbound limiter, unless the caller set one
+        os.environ.setdefault("FLUENTBOT_RPS", "0")
+        os.environ.setdefault("FLUENTBOT_POOL_SIZE", str(args.concurrency))
+
+    # Import after the environment is set - the backend reads it at construction
+    import backend
+    import metrics
+
+    records = []
+    metrics.add_hook(records.append)
+
+    history = []
+    for i in range(args.history_turns):
+        history.append({"role": "user", "content": random.choice(QUESTIONS)})
+        history.append({"role": "assistant", "content": "Here is a detailed explanation with examples. " * 8})
+    language_context = "[Language Learning: 🇫🇷 French - 🌱 Beginner] "
+
+    latencies, ttfts = [], []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_turn(index: int):
+        nonlocal errors
+        question = random.choice(QUESTIONS) + (f" (#{index})" if args.unique else "")
+        started = time.perf_counter()
+        first_token = None
+        if args.stream:
+            parts = []
+            for delta in backend.stream_chat_response(question, history, language_context):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                parts.append(delta)
+            reply = "".join(parts)
+        else:
+            reply = backend.get_chat_response(question, history, language_context)
+        elapsed = time.perf_counter() - started
+        with lock:
+            if backend.is_offline_message(reply):
+                errors += 1
+            else:
+                latencies.append(elapsed)
+                if first_token is not None:
+                    ttfts.append(first_token)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one_turn, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "stream": args.stream,
+            "history_turns": args.history_turns,
+            "unique": args.unique,
+            "target": "mock" if mock else backend.backend.openrouter_url,
+            "mock": {key: getattr(args, key) for key in ("latency", "ttft", "tokens_per_second", "error_rate",
+                                                          "rate_limit_rate", "max_rps", "fail_models")} if mock else None,
+        },
+        "results": summarize(latencies, ttfts, errors, args.requests, elapsed),
+        "breakdown": breakdown(records),
+        "backend": {
+            "pool": backend.get_pool_stats(),
+            "resilience": {k: v for k, v in backend.get_resilience_stats().items() if k != "models"},
+            "scheduler": backend.get_scheduler_stats(),
+            "cache": backend.get_cache_stats(),
+        },
+    }
+    if mock:
+        report["mock_counters"] = dict(mock.counters)
+        mock.stop()
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        if problems:
+            print("❌ Regression vs baseline: " + "; ".join(problems), file=sys.stderr)
+            return 1
+        print("✅ No regression vs baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import threading
+import time
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# ---------------------------------------------------------------------------
+# Connect-time capture: urllib3 connects lazily in the calling thread, so a
+# thread-local accumulator tells each attempt how long its TCP/TLS setup took.
+# ---------------------------------------------------------------------------
+
+_timing = threading.local()
+
+
+def reset_connect_timer():
+    _timing.connect_seconds = 0.0
+    _timing.new_connections = 0
+
+
+def connect_timer() -> Tuple[float, int]:
+    """
+    (seconds spent connecting, new connections) in this thread since the last reset
+    """
+    return getattr(_timing, "connect_seconds", 0.0), getattr(_timing, "new_connections", 0)
+
+
+def _record_connect(seconds: float):
+    _timing.connect_seconds = getattr(_timing, "connect_seconds", 0.0) + seconds
+    _timing.new_connections = getattr(_timing, "new_connections", 0) + 1
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _record_connect(time.perf_counter() - started)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _record_connect(time.perf_counter() - started)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+TIMED_POOL_CLASSES = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+# ---------------------------------------------------------------------------
+# Per-call records and hooks
+# ---------------------------------------------------------------------------
+
+_call_ids = itertools.count(1)
+
+
+@dataclass
+class CallRecord:
+    """
+    Everything measured about one chat call (one record per call, covering all its attempts)
+    """
+    call_id: int
+    mode: str                      # "chat", "stream" or "async"
+    priority: str
+    started_at: float = field(default_factory=time.time)
+    model: Optional[str] = None
+    attempts: int = 0
+    queue_seconds: float = 0.0
+    connect_seconds: float = 0.0
+    new_connections: int = 0
+    ttfb_seconds: Optional[float] = None          # response headers received
+    first_token_seconds: Optional[float] = None   # streaming only
+    total_seconds: float = 0.0
+    estimated_prompt_tokens: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cache_status: str = "off"     # "off", "hit", "miss", "coalesced" or "local" (lesson library)
+    intent: str = "general"       # router intent: lookup, grammar, conversation, correction or general
+    error_class: Optional[str] = None
+    status_code: Optional[int] = None
+
+    def fail(self, error: Exception):
+        # Unwrap the fallback chain's summary error to the upstream cause
+        cause = getattr(error, "errors", None)
+        root = cause[-1] if cause else error
+        self.error_class = type(root).__name__
+        response = getattr(root, "response", None)
+        self.status_code = getattr(response, "status_code", self.status_code)
+
+    def record_usage(self, usage: Optional[Dict]):
+        if usage:
+            self.prompt_tokens = usage.get("prompt_tokens")
+            self.completion_tokens = usage.get("completion_tokens")
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+_hooks: List[Callable[[CallRecord], None]] = []
+_hooks_lock = threading.Lock()
+
+
+def add_hook(hook: Callable[[CallRecord], None]):
+    """
+    Register a callable that receives every finished CallRecord (e.g. a logger or tracer)
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[CallRecord], None]):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def emit(record: CallRecord):
+    registry.observe(record)
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook(record)
+        except Exception:
+            # Instrumentation must never break a chat turn
+            pass
+
+
+class JsonLinesHook:
+    """
+    Hook that appends each CallRecord as one JSON line (FLUENTBOT_METRICS_LOG)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record: CallRecord):
+        line = json.dumps(record.as_dict(), ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def track_call(mode: str, priority: str):
+    """
+    Time a chat call and emit its record when the block exits
+    """
+    record = CallRecord(call_id=next(_call_ids), mode=mode, priority=priority)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.total_seconds = time.perf_counter() - started
+        emit(record)
+
+# ---------------------------------------------------------------------------
+# Prometheus text exposition
+# ---------------------------------------------------------------------------
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Aggregates CallRecords into counters and histograms, rendered in Prometheus text format
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, _Histogram]] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self.help = {
+            "fluentbot_requests_total": ("counter", "Chat calls by model, mode, outcome, cache status and intent"),
+            "fluentbot_errors_total": ("counter", "Failed chat calls by error class"),
+            "fluentbot_attempts_total": ("counter", "Upstream attempts including retries and hedges"),
+            "fluentbot_tokens_total": ("counter", "Tokens reported by the provider"),
+            "fluentbot_new_connections_total": ("counter", "TCP/TLS connections opened by chat calls"),
+            "fluentbot_request_duration_seconds": ("histogram", "End-to-end chat call latency"),
+            "fluentbot_ttfb_seconds": ("histogram", "Time until response headers arrived"),
+            "fluentbot_first_token_seconds": ("histogram", "Streaming time to first token"),
+            "fluentbot_connect_seconds": ("histogram", "TCP/TLS connect time when a new connection was needed"),
+            "fluentbot_queue_seconds": ("histogram", "Time spent waiting in the rate-limit queue"),
+        }
+
+    def _inc(self, name: str, labels: Dict, amount: float = 1.0):
+        key = tuple(sorted(labels.items()))
+        series = self._counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + amount
+
+    def _observe(self, name: str, labels: Dict, value: Optional[float]):
+        if value is None:
+            return
+        key = tuple(sorted(labels.items()))
+        self._histograms.setdefault(name, {}).setdefault(key, _Histogram()).observe(value)
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]]):
+        """
+        Gauges sampled at scrape time - `collector()` returns {metric_name: value}
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def observe(self, record: CallRecord):
+        model = record.model or "unknown"
+        outcome = "error" if record.error_class else "ok"
+        with self._lock:
+            self._inc("fluentbot_requests_total", {"model": model, "mode": record.mode, "outcome": outcome,
+                                                   "cache": record.cache_status, "intent": record.intent})
+            self._inc("fluentbot_attempts_total", {"model": model}, record.attempts)
+            if record.error_class:
+                self._inc("fluentbot_errors_total", {"error_class": record.error_class,
+                                                     "status": record.status_code or ""})
+            if record.prompt_tokens:
+                self._inc("fluentbot_tokens_total", {"model": model, "kind": "prompt"}, record.prompt_tokens)
+            if record.completion_tokens:
+                self._inc("fluentbot_tokens_total", {"model": model, "kind": "completion"}, record.completion_tokens)
+            if record.new_connections:
+                self._inc("fluentbot_new_connections_total", {"model": model}, record.new_connections)
+                self._observe("fluentbot_connect_seconds", {}, record.connect_seconds)
+
+            labels = {"model": model, "mode": record.mode}
+            self._observe("fluentbot_request_duration_seconds", {**labels, "intent": record.intent}, record.total_seconds)
+            self._observe("fluentbot_ttfb_seconds", labels, record.ttfb_seconds)
+            self._observe("fluentbot_first_token_seconds", labels, record.first_token_seconds)
+            self._observe("fluentbot_queue_seconds", {"priority": record.priority}, record.queue_seconds)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                kind, text = self.help[name]
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(dict(key))} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                kind, text = self.help[name]
+                lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+                for key, histogram in sorted(series.items()):
+                    labels = dict(key)
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': f'{bound:g}'})} {count}")
+                    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.total:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            try:
+                gauges = collector()
+            except Exception:
+                continue
+            for name, value in sorted(gauges.items()):
+                if value is None:
+                    continue
+                lines += [f"# TYPE {name} gauge", f"{name} {float(value):g}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Extra JSON views served next to /metrics (path -> callable returning something json.dumps can handle)
+_endpoints: Dict[str, Callable[[], object]] = {}
+
+
+def add_endpoint(path: str, report: Callable[[], object]):
+    """
+    Serve `report()` as JSON at `path` on the metrics server (e.g. per-session memory)
+    """
+    _endpoints[path] = report
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics in Prometheus text format (plus any add_endpoint views) from a daemon thread
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                body = registry.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path in _endpoints:
+                body = json.dumps(_endpoints[path](), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fluentbot-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,226 @@
+# Local stand-in for OpenRouter's /api/v1/chat/completions endpoint - for load tests without API credit
+#
+#   python mock_openrouter.py --port 8787 --latency lognormal:0.6:0.5 --error-rate 0.02 --rate-limit-rate 0.01
+#   FLUENTBOT_API_URL=http://127.0.0.1:8787/api/v1/chat/completions streamlit run app.py
+
+from typing import Callable, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import math
+import random
+import socket
+import threading
+import time
+
+CHAT_PATH = "/api/v1/chat/completions"
+
+REPLY_WORDS = (
+    "Great question! In French you say « Bonjour » (bon-ZHOOR) to greet someone politely. "
+    "Try using it with a smile when you enter a shop - it's considered good manners. 🇫🇷"
+).split(" ")
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Latency distribution in seconds:
+      fixed:0.3 | uniform:0.1:0.8 | lognormal:<median>:<sigma> | exp:<mean>
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / values[0])
+    raise ValueError(f"unknown latency distribution {spec!r}")
+
+
+class MockOpenRouter:
+    """
+    Threaded HTTP server mimicking chat completions: latency, streaming, 5xx errors and 429s
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "lognormal:0.4:0.4",
+                 ttft: str = "fixed:0.15", tokens_per_second: float = 50, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, max_rps: Optional[float] = None, fail_models: str = ""):
+        self.latency = parse_latency(latency)
+        self.ttft = parse_latency(ttft)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_rps = max_rps
+        self.fail_models = tuple(m for m in fail_models.split(",") if m)
+
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.counters = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0}
+
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{CHAT_PATH}"
+
+    def start(self) -> "MockOpenRouter":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-openrouter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _over_rps(self) -> bool:
+        if not self.max_rps:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            return self._window_count > self.max_rps
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def setup(self):
+                super().setup()
+                # Small SSE frames must not sit in Nagle's buffer
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: Optional[dict] = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path in ("/healthz", "/api/v1/models"):
+                    self._send_json(200, {"status": "ok", "counters": dict(mock.counters)})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                if self.path != CHAT_PATH:
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                mock._count("requests")
+                model = payload.get("model", "mock/model")
+
+                if mock._over_rps() or random.random() < mock.rate_limit_rate:
+                    mock._count("rate_limited")
+                    self._send_json(429, {"error": {"code": 429, "message": "Rate limit exceeded"}}, {"Retry-After": "1"})
+                    return
+                if model in mock.fail_models or random.random() < mock.error_rate:
+                    mock._count("errors")
+                    time.sleep(mock.latency() / 4)
+                    self._send_json(502, {"error": {"code": 502, "message": "Upstream provider error"}})
+                    return
+
+                max_tokens = int(payload.get("max_tokens") or 1000)
+                words = REPLY_WORDS[:max(1, min(len(REPLY_WORDS), max_tokens))]
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in payload.get("messages", [])) // 4
+
+                if payload.get("stream"):
+                    mock._count("streamed")
+                    self._stream(model, words, prompt_tokens)
+                    return
+
+                time.sleep(mock.latency())
+                self._send_json(200, {
+                    "id": f"gen-mock-{random.randrange(1 << 30)}",
+                    "model": model,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": " ".join(words)}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                              "total_tokens": prompt_tokens + len(words)},
+                })
+
+            def _stream(self, model: str, words, prompt_tokens: int):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._write_chunk(b": OPENROUTER PROCESSING\n\n")
+                time.sleep(mock.ttft())
+                for index, word in enumerate(words):
+                    text = word if index == 0 else " " + word
+                    event = {"model": model, "choices": [{"index": 0, "delta": {"content": text}}]}
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    time.sleep(1.0 / mock.tokens_per_second)
+                usage = {"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                         "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                                   "total_tokens": prompt_tokens + len(words)}}
+                self._write_chunk(f"data: {json.dumps(usage)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", default="lognormal:0.4:0.4", help="Non-streaming completion latency distribution")
+    parser.add_argument("--ttft", default="fixed:0.15", help="Streaming time-to-first-token distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="Streaming generation speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 502")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--max-rps", type=float, default=None, help="Hard requests/sec limit (excess gets 429)")
+    parser.add_argument("--fail-models", default="", help="Comma-separated models that always fail")
+
+
+def mock_from_args(args, host: str = "127.0.0.1", port: int = 0) -> MockOpenRouter:
+    return MockOpenRouter(
+        host=host, port=port, latency=args.latency, ttft=args.ttft, tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, max_rps=args.max_rps,
+        fail_models=args.fail_models,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenRouter stand-in for FluentBot load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    mock = mock_from_args(args, args.host, args.port)
+    print(f"Mock OpenRouter listening on {mock.url}")
+    print(f"Point FluentBot at it with: FLUENTBOT_API_URL={mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
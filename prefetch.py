@@ -0,0 +1,165 @@
+from typing import Callable, Dict, Hashable, List, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+
+from content_pack import JSON_ONLY, parse_json_reply, plain_name
+
+# Rotated through so back-to-back batches for the same level don't come back identical
+# (and don't collapse into one response-cache entry)
+PRACTICE_THEMES = (
+    "daily routine", "food and restaurants", "travel and directions", "family and friends", "work and study",
+    "hobbies", "shopping", "weather and seasons", "health", "plans for the weekend", "childhood memories",
+    "city life", "technology", "celebrations", "opinions and preferences",
+)
+
+PRACTICE_PROMPT = (
+    "Write {count} short daily writing practice tasks for a {level} {language} learner about {theme}. "
+    "Give each task in English, plus a short model answer written in {language}. "
+    'Return {{"items": [{{"question": str, "reference_answer": str}}, ...]}}. ' + JSON_ONLY
+)
+
+
+class _Queue:
+    __slots__ = ("key", "items", "filling", "last_seen")
+
+    def __init__(self, key: Hashable, depth: int):
+        self.key = key
+        self.items: deque = deque(maxlen=depth)
+        self.filling = False
+        self.last_seen = time.monotonic()
+
+
+class Prefetcher:
+    """
+    Small per-session queues of ready-made items (practice questions, quiz words...),
+    topped up by a shared background pool while the learner works on the current one.
+
+    Spending is bounded three ways: each queue holds at most `depth` items, a queue is
+    only refilled right after its session took an item (and never once the session has
+    been idle for `idle_seconds`), and at most `max_pending` fills wait for a worker.
+    Refills wait until a queue is down to `low_water` items, so one call brings back several.
+    """
+
+    def __init__(self, depth: int = 3, workers: int = 2, idle_seconds: float = 300,
+                 max_pending: int = 32, max_queues: int = 2000, low_water: Optional[int] = None):
+        self.depth = depth
+        self.low_water = depth // 2 if low_water is None else low_water
+        self.idle_seconds = idle_seconds
+        self.max_pending = max_pending
+        self.max_queues = max_queues
+
+        self._queues: "OrderedDict[tuple, _Queue]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fluentbot-prefetch")
+        self.counters = {"served": 0, "misses": 0, "produced": 0, "fills": 0, "skipped_idle": 0,
+                         "skipped_busy": 0, "errors": 0}
+
+    def _queue(self, session: str, kind: str, key: Hashable) -> _Queue:
+        # Caller holds the lock. Least recently used queues are dropped past max_queues.
+        queue = self._queues.get((session, kind))
+        if queue is None or queue.key != key:
+            # New session, or the learner switched language / level - items for the old one are useless
+            queue = _Queue(key, self.depth)
+            self._queues[(session, kind)] = queue
+        self._queues.move_to_end((session, kind))
+        while len(self._queues) > self.max_queues:
+            self._queues.popitem(last=False)
+        queue.last_seen = time.monotonic()
+        return queue
+
+    def take(self, session: str, kind: str, key: Hashable, producer: Callable[[int], List[Dict]]) -> Optional[Dict]:
+        """
+        A ready item, or None if the queue is still empty; either way the queue is topped up
+        in the background. `producer(count)` returns up to `count` new items (it may block).
+        """
+        with self._lock:
+            queue = self._queue(session, kind, key)
+            item = queue.items.popleft() if queue.items else None
+            self.counters["served" if item is not None else "misses"] += 1
+            self._schedule(queue, producer)
+        return item
+
+    def warm(self, session: str, kind: str, key: Hashable, producer: Callable[[int], List[Dict]]):
+        """
+        Start filling a session's queue ahead of its first take (e.g. when a panel opens)
+        """
+        with self._lock:
+            self._schedule(self._queue(session, kind, key), producer)
+
+    def _schedule(self, queue: _Queue, producer: Callable[[int], List[Dict]]):
+        if queue.filling or len(queue.items) > self.low_water:
+            return
+        if self._pending >= self.max_pending:
+            self.counters["skipped_busy"] += 1
+            return
+        queue.filling = True
+        self._pending += 1
+        self._executor.submit(self._fill, queue, producer)
+
+    def _fill(self, queue: _Queue, producer: Callable[[int], List[Dict]]):
+        try:
+            with self._lock:
+                self._pending -= 1
+                wanted = self.depth - len(queue.items)
+                idle = time.monotonic() - queue.last_seen > self.idle_seconds
+                if idle:
+                    self.counters["skipped_idle"] += 1
+            if wanted <= 0 or idle:
+                return
+            items = producer(wanted)
+            with self._lock:
+                queue.items.extend(items[:wanted])
+                self.counters["fills"] += 1
+                self.counters["produced"] += min(len(items), wanted)
+        except Exception:
+            # A failed fill just means the next click falls back to built-in content
+            with self._lock:
+                self.counters["errors"] += 1
+        finally:
+            queue.filling = False
+
+    def ready(self, session: str, kind: str) -> int:
+        with self._lock:
+            queue = self._queues.get((session, kind))
+            return len(queue.items) if queue is not None else 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["queues"] = len(self._queues)
+            stats["ready_items"] = sum(len(queue.items) for queue in self._queues.values())
+            stats["pending_fills"] = self._pending
+        served = stats["served"] + stats["misses"]
+        stats["hit_rate"] = round(stats["served"] / served, 3) if served else 0.0
+        return stats
+
+    def gauges(self) -> Dict[str, float]:
+        stats = self.stats()
+        return {
+            "fluentbot_prefetch_ready_items": stats["ready_items"],
+            "fluentbot_prefetch_pending_fills": stats["pending_fills"],
+            "fluentbot_prefetch_served": stats["served"],
+            "fluentbot_prefetch_misses": stats["misses"],
+            "fluentbot_prefetch_errors": stats["errors"],
+        }
+
+
+def generate_practice_items(language: str, level: str, count: int) -> List[Dict]:
+    """
+    AI-written practice questions with model answers, sent at "background" priority so
+    they never hold up a learner's chat turn
+    """
+    from backend import get_chat_response
+
+    prompt = PRACTICE_PROMPT.format(count=count, level=plain_name(level), language=plain_name(language),
+                                    theme=random.choice(PRACTICE_THEMES))
+    data = parse_json_reply(get_chat_response(prompt, priority="background"))
+    items = [
+        {"question": str(item["question"]).strip(), "reference_answer": str(item.get("reference_answer", "")).strip()}
+        for item in data["items"]
+    ]
+    return [item for item in items if item["question"]]
@@ -0,0 +1,241 @@
+from typing import Dict, List, Optional
+from collections import deque
+from contextlib import contextmanager
+import cProfile
+import os
+import sys
+import threading
+import time
+
+
+class _Rerun:
+    """
+    Timings for one run of the app script (on the thread running it)
+    """
+
+    def __init__(self, session: str, name: str):
+        self.session = session
+        self.name = name
+        self.started = time.perf_counter()
+        self.sections: Dict[str, float] = {}
+        self.stack: List[str] = []          # open sections, outermost first (read by the sampler)
+        self.marked: Optional[float] = None  # when the current top-level mark() section started
+        self.profile: Optional[cProfile.Profile] = None
+        self.sampler: Optional["StackSampler"] = None
+
+
+class _Current(threading.local):
+    rerun: Optional[_Rerun] = None
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds and counts identical stacks,
+    labelled with the profiler sections open at the time - the "collapsed stacks" format
+    flamegraph.pl, speedscope and inferno read. Sampling stops by itself once the thread is
+    no longer running `root_file`.
+    """
+
+    def __init__(self, thread_id: int, root_file: str, sections: List[str], interval: float = 0.001,
+                 root: str = "rerun"):
+        self.thread_id = thread_id
+        self.root = root
+        self.root_file = os.path.abspath(root_file)
+        self.sections = sections
+        self.interval = interval
+        self.counts: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fluentbot-stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            # Drop Streamlit's script runner above the app script itself
+            frames.reverse()
+            for start, candidate in enumerate(frames):
+                if os.path.abspath(candidate.f_code.co_filename) == self.root_file:
+                    frames = frames[start:]
+                    break
+            else:
+                # The script returned or raised without end() (or its thread is gone) - nothing left to sample
+                return
+            names = [f"{f.f_code.co_name} ({os.path.basename(f.f_code.co_filename)}:{f.f_code.co_firstlineno})"
+                     for f in frames]
+            stack = ";".join([self.root] + list(self.sections) + names)
+            self.counts[stack] = self.counts.get(stack, 0) + 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+
+
+class RerunProfiler:
+    """
+    Opt-in timing of the app script. mark() splits the script into consecutive top-level
+    sections and section() times a block inside one (a backend call, say). Every rerun
+    keeps its own breakdown, the last `window` timings of each section feed rolling
+    percentiles, and a chosen rerun can be run under cProfile plus a stack sampler and
+    dumped to disk.
+
+    Timings belong to the thread running the script, so concurrent sessions don't mix.
+    When a session isn't being profiled, mark() and section() cost one attribute lookup.
+    A run cut short before end() (st.rerun(), st.stop() or an exception) is finished by the
+    next begin() on its thread; a capture's sampler stops as soon as the script is gone.
+    """
+
+    def __init__(self, window: int = 500, profile_dir: Optional[str] = None, sample_interval: float = 0.001):
+        self.window = window
+        self.profile_dir = profile_dir
+        self.sample_interval = sample_interval
+        self._local = _Current()
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        self._last: Dict[str, Dict] = {}
+        self.dumps: List[Dict] = []
+
+    def active(self) -> bool:
+        return self._local.rerun is not None
+
+    def begin(self, session: str, root_file: str, enabled: bool, capture: bool = False, name: str = "rerun"):
+        """
+        Start timing a run of the script (`name` is what its total is recorded as);
+        `capture` also records it with cProfile and the stack sampler
+        """
+        stale = self._local.rerun
+        if stale is not None:
+            # Cut short by st.rerun() / st.stop() - keep its sections and capture, but not a total
+            self._finish(stale, complete=False)
+        if not enabled:
+            return
+        rerun = _Rerun(session, name)
+        if capture:
+            rerun.profile = cProfile.Profile()
+            rerun.sampler = StackSampler(threading.get_ident(), root_file, rerun.stack, self.sample_interval, name)
+            rerun.sampler.start()
+            rerun.profile.enable()
+        self._local.rerun = rerun
+
+    def end(self) -> Optional[Dict]:
+        """
+        Finish the current run (if any); returns the capture files it wrote, if any
+        """
+        rerun = self._local.rerun
+        return self._finish(rerun, complete=True) if rerun is not None else None
+
+    def _finish(self, rerun: _Rerun, complete: bool) -> Optional[Dict]:
+        # Always on the script's thread: cProfile is attached to the thread that enabled it
+        self._local.rerun = None
+        self._close_mark(rerun)
+        dump = None
+        if rerun.profile is not None:
+            rerun.profile.disable()
+            rerun.sampler.stop()
+            dump = self._write(rerun)
+        if complete:
+            total = time.perf_counter() - rerun.started
+            self._record(rerun.name, total)
+            with self._lock:
+                self._last[rerun.session] = {"name": rerun.name, "total": total, "sections": dict(rerun.sections)}
+        return dump
+
+    def mark(self, name: str):
+        """
+        End the current top-level section and start the next one
+        """
+        rerun = self._local.rerun
+        if rerun is None:
+            return
+        self._close_mark(rerun)
+        rerun.stack[:] = [name]
+        rerun.marked = time.perf_counter()
+
+    def _close_mark(self, rerun: _Rerun):
+        if rerun.marked is not None:
+            self._add(rerun, rerun.stack[0], time.perf_counter() - rerun.marked)
+            rerun.stack[:] = []
+            rerun.marked = None
+
+    @contextmanager
+    def section(self, name: str):
+        """
+        Time a block of the script (named "top/inner" inside a mark() section)
+        """
+        rerun = self._local.rerun
+        if rerun is None:
+            yield
+            return
+        rerun.stack.append(name)
+        path = "/".join(rerun.stack)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            rerun.stack.pop()
+            self._add(rerun, path, time.perf_counter() - started)
+
+    def _add(self, rerun: _Rerun, path: str, seconds: float):
+        rerun.sections[path] = rerun.sections.get(path, 0.0) + seconds
+        self._record(path, seconds)
+
+    def _record(self, name: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def _write(self, rerun: _Rerun) -> Optional[Dict]:
+        if not self.profile_dir:
+            return None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.profile_dir, f"{rerun.name.replace(':', '-')}-{stamp}-{rerun.session[:8]}")
+        rerun.profile.dump_stats(base + ".prof")
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            f.write(rerun.sampler.collapsed())
+        dump = {"session": rerun.session, "name": rerun.name, "prof": base + ".prof", "folded": base + ".folded",
+                "samples": sum(rerun.sampler.counts.values()),
+                "seconds": round(time.perf_counter() - rerun.started, 4)}
+        with self._lock:
+            self.dumps = (self.dumps + [dump])[-20:]
+        return dump
+
+    def last(self, session: str) -> Optional[Dict]:
+        """
+        Section timings of the session's last completed rerun
+        """
+        with self._lock:
+            return self._last.get(session)
+
+    def stats(self) -> Dict:
+        """
+        Rolling p50 / p90 / p99 (milliseconds) per section, slowest p90 first
+        """
+        with self._lock:
+            windows = {name: sorted(samples) for name, samples in self._samples.items()}
+            dumps = list(self.dumps)
+        sections = {}
+        for name, ordered in windows.items():
+            count = len(ordered)
+            sections[name] = {
+                "count": count,
+                "p50_ms": round(ordered[min(count - 1, int(count * 0.5))] * 1000, 2),
+                "p90_ms": round(ordered[min(count - 1, int(count * 0.9))] * 1000, 2),
+                "p99_ms": round(ordered[min(count - 1, int(count * 0.99))] * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return {
+            "window": self.window,
+            "sections": dict(sorted(sections.items(), key=lambda item: -item[1]["p90_ms"])),
+            "dumps": dumps,
+        }
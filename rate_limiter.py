@@ -0,0 +1,323 @@
+from typing import Callable, Dict, Optional
+from collections import deque
+from concurrent.futures import Future
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+# Lower number = served first. Interactive chat turns jump ahead of prefetch and batch work.
+PRIORITIES = {"interactive": 0, "background": 1, "batch": 2}
+
+
+class QueueTimeout(Exception):
+    """
+    Raised when a request could not be admitted before its deadline
+    """
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` units per second, bursts up to `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """
+        Seconds until `amount` units are available (0 if they are available now)
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket, not forever
+        if self._tokens >= amount:
+            return 0.0
+        return (amount - self._tokens) / self.rate
+
+    def take(self, amount: float):
+        self._tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Requests/second and tokens/minute buckets checked together (0 disables a bucket).
+    Not thread-safe on its own - the scheduler serializes access.
+    """
+
+    def __init__(self, requests_per_second: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_second, max(1.0, requests_per_second)) if requests_per_second else None
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+
+    def delay_for(self, tokens: int) -> float:
+        now = time.monotonic()
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay_for(1, now))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.delay_for(tokens, now))
+        return delay
+
+    def take(self, tokens: int):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+
+
+class SharedRateLimiter:
+    """
+    RateLimiter whose buckets live in a SQLite file, so every worker process on the host
+    draws from one budget instead of each getting the full rate.
+
+    delay_for() reserves the units in the same transaction when they are available, so
+    take() - which the scheduler always calls straight after - has nothing left to do.
+    If the file can't be used, this falls back to a per-process RateLimiter.
+    """
+
+    def __init__(self, path: str, requests_per_second: float = 0, tokens_per_minute: float = 0):
+        self.path = path
+        # (bucket name, refill per second, capacity)
+        self.buckets = []
+        if requests_per_second:
+            self.buckets.append(("requests", requests_per_second, max(1.0, requests_per_second)))
+        if tokens_per_minute:
+            self.buckets.append(("tokens", tokens_per_minute / 60.0, tokens_per_minute))
+        self.fallback = RateLimiter(requests_per_second, tokens_per_minute)
+        self.disk_errors = 0
+        self._used_fallback = False
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, so each thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def delay_for(self, tokens: int) -> float:
+        if not self.buckets:
+            return 0.0
+        try:
+            conn = self._connection()
+            # Wall-clock time, since monotonic clocks aren't comparable between processes
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                delay = 0.0
+                levels = []
+                for name, rate, capacity in self.buckets:
+                    amount = 1 if name == "requests" else min(tokens, capacity)
+                    if not amount:
+                        continue
+                    row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                    level = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                    if level < amount:
+                        delay = max(delay, (amount - level) / rate)
+                    levels.append((name, level - amount))
+                if delay <= 0:
+                    conn.executemany("INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                                     [(name, level, now) for name, level in levels])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._used_fallback = False
+            return delay
+        except sqlite3.Error:
+            self.disk_errors += 1
+            self._used_fallback = True
+            return self.fallback.delay_for(tokens)
+
+    def take(self, tokens: int):
+        if self._used_fallback:
+            self.fallback.take(tokens)
+
+
+class _Ticket:
+    __slots__ = ("priority", "tokens", "enqueued", "cancelled")
+
+    def __init__(self, priority: int, tokens: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.cancelled = False
+
+
+class PriorityScheduler:
+    """
+    Process-wide admission control for outbound LLM calls.
+    Callers queue by priority; the head of the queue is admitted as soon as the rate limiter allows.
+    """
+
+    def __init__(self, limiter: RateLimiter, wait_window: int = 500):
+        self.limiter = limiter
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._peak_depth = 0
+        self._admitted = {name: 0 for name in PRIORITIES}
+        self._timeouts = 0
+        self._waits = {name: deque(maxlen=wait_window) for name in PRIORITIES}
+
+    def _priority_name(self, priority: str) -> str:
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r} - use one of {list(PRIORITIES)}")
+        return priority
+
+    def _drop_cancelled(self):
+        while self._queue and self._queue[0][2].cancelled:
+            heapq.heappop(self._queue)
+
+    def _admit(self, name: str, ticket: _Ticket) -> float:
+        self.limiter.take(ticket.tokens)
+        waited = time.monotonic() - ticket.enqueued
+        self._admitted[name] += 1
+        self._waits[name].append(waited)
+        self._cond.notify_all()
+        return waited
+
+    def acquire(self, priority: str = "interactive", tokens: int = 0, timeout: Optional[float] = None) -> float:
+        """
+        Block until this request may go upstream; returns the seconds spent queued
+        """
+        name = self._priority_name(priority)
+        ticket = _Ticket(PRIORITIES[name], tokens)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            heapq.heappush(self._queue, (ticket.priority, next(self._seq), ticket))
+            self._peak_depth = max(self._peak_depth, len(self._queue))
+            try:
+                while True:
+                    self._drop_cancelled()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        ticket.cancelled = True
+                        self._timeouts += 1
+                        self._cond.notify_all()
+                        raise QueueTimeout(f"not admitted within {timeout:.1f}s (queue depth {len(self._queue)})")
+
+                    if self._queue[0][2] is ticket:
+                        delay = self.limiter.delay_for(tokens)
+                        if delay <= 0:
+                            heapq.heappop(self._queue)
+                            return self._admit(name, ticket)
+                        # Head of the queue: sleep until the bucket refills (or someone more urgent arrives)
+                        self._cond.wait(delay if remaining is None else min(delay, remaining))
+                    else:
+                        self._cond.wait(remaining)
+            finally:
+                if ticket.cancelled:
+                    self._drop_cancelled()
+
+    def try_acquire(self, priority: str = "batch", tokens: int = 0, queued_since: Optional[float] = None) -> float:
+        """
+        Non-blocking admission for asyncio callers: 0 when admitted, otherwise a suggested retry delay.
+        Never jumps ahead of anyone already queued. Pass the time.monotonic() of the first
+        attempt as `queued_since` so the wait shows up in the stats.
+        """
+        name = self._priority_name(priority)
+        with self._cond:
+            self._drop_cancelled()
+            if self._queue:
+                return 0.05
+            delay = self.limiter.delay_for(tokens)
+            if delay > 0:
+                return delay
+            ticket = _Ticket(PRIORITIES[name], tokens)
+            if queued_since is not None:
+                ticket.enqueued = queued_since
+            self._admit(name, ticket)
+            return 0.0
+
+    def depth(self) -> int:
+        """
+        Requests currently waiting for admission
+        """
+        with self._cond:
+            return sum(1 for _, _, ticket in self._queue if not ticket.cancelled)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            self._drop_cancelled()
+            depth_by_priority = {name: 0 for name in PRIORITIES}
+            by_number = {number: name for name, number in PRIORITIES.items()}
+            for _, _, ticket in self._queue:
+                if not ticket.cancelled:
+                    depth_by_priority[by_number[ticket.priority]] += 1
+            waits = {}
+            for name, samples in self._waits.items():
+                ordered = sorted(samples)
+                waits[name] = {
+                    "admitted": self._admitted[name],
+                    "p50_wait_seconds": round(ordered[len(ordered) // 2], 4) if ordered else 0.0,
+                    "p95_wait_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4) if ordered else 0.0,
+                    "max_wait_seconds": round(ordered[-1], 4) if ordered else 0.0,
+                }
+            return {
+                "queue_depth": sum(depth_by_priority.values()),
+                "queue_depth_by_priority": depth_by_priority,
+                "peak_queue_depth": self._peak_depth,
+                "timeouts": self._timeouts,
+                "priorities": waits,
+            }
+
+
+class RequestCoalescer:
+    """
+    Single-flight: identical requests already in flight share one upstream call
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def run(self, key: str, fn: Callable):
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"in_flight": len(self._in_flight), "upstream_calls": self.leaders, "coalesced_waiters": self.coalesced}
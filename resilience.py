@@ -0,0 +1,406 @@
+from typing import Callable, Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import asyncio
+import random
+import sys
+import threading
+import time
+
+import requests
+
+
+class AllModelsFailed(Exception):
+    """
+    Raised when every attempt across the fallback chain failed or the deadline ran out
+    """
+
+    def __init__(self, message: str, errors: List[Exception]):
+        super().__init__(message)
+        self.errors = errors
+
+
+def status_code_of(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Timeouts, connection problems, 429s and 5xx are worth another attempt; bad requests and bad keys are not
+    """
+    status = status_code_of(error)
+    if status is not None:
+        return status in (404, 408, 409, 429) or status >= 500
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    # Only the async API imports httpx - if it isn't loaded, this can't be an httpx error
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    # Malformed / truncated upstream bodies are usually transient too
+    return isinstance(error, (ValueError, KeyError, RuntimeError))
+
+
+def _discard_callback(discard: Callable) -> Callable:
+    def _on_done(future):
+        if future.exception() is None:
+            discard(future.result())
+    return _on_done
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: opens after `failure_threshold` consecutive failures, then lets a
+    single probe through once `recovery_seconds` have passed
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.recovery_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release_probe(self):
+        """
+        Hand back a half-open probe that never reached the model, so the next call can probe
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.times_opened += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies for one model
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, never sleeping past the deadline
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.25, max_delay: float = 4.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class ResilientCaller:
+    """
+    Runs a call across an ordered model fallback chain with deadline-aware retries,
+    per-model circuit breakers and optional hedging.
+
+    `fn(model, timeout)` performs one attempt. With hedging on, when the first attempt has
+    not finished by its model's p95 latency a second attempt goes to the next model and
+    whichever succeeds first wins; `discard(result)` cleans up the loser.
+    `on_attempt(model, seconds, error)` is told about every attempt (error is None on success);
+    a call can pass its own on_attempt instead, e.g. to tell the router which route it was for.
+
+    `admit(model, timeout)` (optional, per call) runs before each attempt and returns the
+    time left for it - e.g. waiting for a local rate limiter. Its wait and its errors belong
+    to us, not the model, so they never reach the breaker, the latency window, the hedge
+    delay or on_attempt.
+    """
+
+    def __init__(self, models: List[str], deadline_seconds: float = 30, retry: Optional[RetryPolicy] = None,
+                 hedge: bool = False, hedge_default_delay: float = 4.0, hedge_min_delay: float = 0.3,
+                 hedge_min_samples: int = 20, failure_threshold: int = 5, recovery_seconds: float = 30,
+                 max_workers: int = 32, on_attempt: Optional[Callable] = None):
+        if not models:
+            raise ValueError("at least one model is required")
+        self.models = list(models)
+        self.deadline_seconds = deadline_seconds
+        self.retry = retry or RetryPolicy()
+        self.hedge = hedge
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.on_attempt = on_attempt
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fluentbot-hedge") if hedge else None
+        self.counters = {"calls": 0, "attempts": 0, "retries": 0, "fallbacks": 0, "hedges": 0,
+                         "hedge_wins": 0, "breaker_skips": 0, "failures": 0}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.recovery_seconds)
+            return self._breakers[model]
+
+    def latency(self, model: str) -> LatencyTracker:
+        with self._lock:
+            if model not in self._latency:
+                self._latency[model] = LatencyTracker()
+            return self._latency[model]
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def hedge_delay(self, model: str) -> float:
+        tracker = self.latency(model)
+        if len(tracker) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, tracker.percentile(0.95))
+
+    def _candidates(self, start: int, chain: List[str]) -> List[str]:
+        # Rotate the chain so each retry moves on to the next model
+        return chain[start % len(chain):] + chain[:start % len(chain)]
+
+    def _next_allowed(self, start: int, chain: List[str], exclude=()) -> Optional[str]:
+        for model in self._candidates(start, chain):
+            if model in exclude:
+                continue
+            if self.breaker(model).allow():
+                return model
+            self._count("breaker_skips")
+        return None
+
+    def _admit(self, admit: Optional[Callable], model: str, timeout: float) -> float:
+        if admit is None:
+            return timeout
+        try:
+            return admit(model, timeout)
+        except Exception:
+            # allow() may have handed this model its half-open probe - it never went out
+            self.breaker(model).release_probe()
+            raise
+
+    def _attempt(self, fn: Callable, model: str, timeout: float, admit: Optional[Callable] = None,
+                 on_attempt: Optional[Callable] = None):
+        timeout = self._admit(admit, model, timeout)
+        started = time.monotonic()
+        self._count("attempts")
+        try:
+            result = fn(model, timeout)
+        except Exception as e:
+            self.breaker(model).record_failure()
+            self._observe(model, started, e, on_attempt)
+            raise
+        self.breaker(model).record_success()
+        self.latency(model).record(time.monotonic() - started)
+        self._observe(model, started, None, on_attempt)
+        return result
+
+    def _observe(self, model: str, started: float, error: Optional[Exception] = None,
+                 on_attempt: Optional[Callable] = None):
+        on_attempt = on_attempt or self.on_attempt
+        if on_attempt is not None:
+            on_attempt(model, time.monotonic() - started, error)
+
+    def call(self, fn: Callable, models: Optional[List[str]] = None, deadline_seconds: Optional[float] = None,
+             discard: Optional[Callable] = None, admit: Optional[Callable] = None,
+             on_attempt: Optional[Callable] = None):
+        chain = list(models or self.models)
+        deadline = time.monotonic() + (deadline_seconds or self.deadline_seconds)
+        errors: List[Exception] = []
+        self._count("calls")
+
+        for attempt in range(self.retry.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            model = self._next_allowed(attempt, chain)
+            if model is None:
+                errors.append(RuntimeError("all models in the fallback chain have open circuit breakers"))
+                break
+            if attempt > 0:
+                self._count("retries")
+                if model != chain[0]:
+                    self._count("fallbacks")
+
+            try:
+                if self.hedge and len(chain) > 1:
+                    return self._hedged(fn, model, attempt, chain, deadline, discard, admit, on_attempt)
+                return self._attempt(fn, model, remaining, admit, on_attempt)
+            except Exception as e:
+                errors.append(e)
+                if not is_retryable(e):
+                    break
+
+            # Jittered backoff, but never past the deadline
+            sleep_for = min(self.retry.delay(attempt), deadline - time.monotonic())
+            if sleep_for > 0:
+                time.sleep(sleep_for)
+
+        self._count("failures")
+        last = errors[-1] if errors else TimeoutError("deadline exceeded before the first attempt")
+        raise AllModelsFailed(f"{len(errors)} attempt(s) failed: {last}", errors) from last
+
+    def _hedged(self, fn: Callable, model: str, attempt: int, chain: List[str], deadline: float,
+                discard: Optional[Callable], admit: Optional[Callable] = None,
+                on_attempt: Optional[Callable] = None):
+        # Admitted here so the hedge delay only counts time spent waiting on the model
+        timeout = self._admit(admit, model, deadline - time.monotonic())
+        primary = self._executor.submit(self._attempt, fn, model, timeout, None, on_attempt)
+        done, _ = wait([primary], timeout=min(self.hedge_delay(model), max(deadline - time.monotonic(), 0)))
+        if done:
+            return primary.result()
+
+        backup_model = self._next_allowed(attempt + 1, chain, exclude=(model,))
+        if backup_model is None:
+            return primary.result(timeout=max(deadline - time.monotonic(), 0))
+
+        self._count("hedges")
+        backup = self._executor.submit(self._attempt, fn, backup_model, deadline - time.monotonic(), admit,
+                                       on_attempt)
+        pending = {primary, backup}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count("hedge_wins")
+                    # The slower request keeps running; clean up its result when it lands
+                    if discard is not None:
+                        for loser in pending:
+                            loser.add_done_callback(_discard_callback(discard))
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error or TimeoutError("hedged attempts did not finish before the deadline")
+
+    async def call_async(self, fn: Callable, models: Optional[List[str]] = None,
+                         deadline_seconds: Optional[float] = None, admit: Optional[Callable] = None,
+                         on_attempt: Optional[Callable] = None):
+        """
+        Async variant (retries, fallback chain and breakers - no hedging) for the batch API;
+        `admit` is a coroutine function here
+        """
+        chain = list(models or self.models)
+        deadline = time.monotonic() + (deadline_seconds or self.deadline_seconds)
+        errors: List[Exception] = []
+        self._count("calls")
+
+        for attempt in range(self.retry.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            model = self._next_allowed(attempt, chain)
+            if model is None:
+                errors.append(RuntimeError("all models in the fallback chain have open circuit breakers"))
+                break
+            if attempt > 0:
+                self._count("retries")
+                if model != chain[0]:
+                    self._count("fallbacks")
+
+            if admit is not None:
+                try:
+                    remaining = await admit(model, remaining)
+                except Exception as e:
+                    self.breaker(model).release_probe()
+                    errors.append(e)
+                    break
+
+            started = time.monotonic()
+            self._count("attempts")
+            try:
+                result = await asyncio.wait_for(fn(model, remaining), timeout=remaining)
+            except Exception as e:
+                self.breaker(model).record_failure()
+                self._observe(model, started, e, on_attempt)
+                errors.append(e)
+                if not is_retryable(e) and not isinstance(e, asyncio.TimeoutError):
+                    break
+            else:
+                self.breaker(model).record_success()
+                self.latency(model).record(time.monotonic() - started)
+                self._observe(model, started, None, on_attempt)
+                return result
+
+            sleep_for = min(self.retry.delay(attempt), deadline - time.monotonic())
+            if sleep_for > 0:
+                await asyncio.sleep(sleep_for)
+
+        self._count("failures")
+        last = errors[-1] if errors else TimeoutError("deadline exceeded before the first attempt")
+        raise AllModelsFailed(f"{len(errors)} attempt(s) failed: {last}", errors) from last
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+            models = list(dict.fromkeys(self.models + list(self._breakers)))
+        stats["models"] = {
+            model: {
+                "breaker": self.breaker(model).state,
+                "times_opened": self.breaker(model).times_opened,
+                "p50_seconds": self.latency(model).percentile(0.5),
+                "p95_seconds": self.latency(model).percentile(0.95),
+                "hedge_delay_seconds": round(self.hedge_delay(model), 3),
+            }
+            for model in models
+        }
+        stats["hedging"] = self.hedge
+        stats["deadline_seconds"] = self.deadline_seconds
+        return stats
@@ -0,0 +1,195 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+def normalize_user_input(text: str) -> str:
+    """
+    Fold case, whitespace and trailing punctuation so near-identical questions share an entry
+    """
+    text = " ".join(text.casefold().split())
+    return re.sub(r"[\s?!.。？！]+$", "", text)
+
+
+def make_cache_key(model: str, system_prompt: str, history: List[Dict], language_context: str, user_input: str) -> str:
+    """
+    Stable key for one request: model, system prompt, truncated history, language context and normalized input
+    """
+    material = json.dumps(
+        [
+            model,
+            hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+            [[msg["role"], msg["content"]] for msg in history],
+            language_context.strip(),
+            normalize_user_input(user_input),
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-memory LRU in front of an optional SQLite file.
+    The SQLite tier runs in WAL mode so several Streamlit worker processes can share it.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, path: Optional[str] = None,
+                 max_disk_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_prune = 0
+
+        self.counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "disk_errors": 0,
+        }
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, so each thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters["hits"] += 1
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self.counters["expirations"] += 1
+
+        if self.path:
+            try:
+                row = self._connection().execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+                self._count("disk_errors")
+            if row is not None:
+                value, expires_at = row
+                # Promote to memory so the next lookup in this process skips SQLite
+                self._remember(key, value, expires_at)
+                with self._lock:
+                    self.counters["hits"] += 1
+                    self.counters["disk_hits"] += 1
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, value, expires_at)
+        self._count("sets")
+
+        if self.path:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now),
+                )
+                with self._lock:
+                    self._writes_since_prune += 1
+                    prune = self._writes_since_prune >= 500
+                    if prune:
+                        self._writes_since_prune = 0
+                if prune:
+                    self.prune_disk()
+            except sqlite3.Error:
+                self._count("disk_errors")
+
+    def prune_disk(self) -> int:
+        """
+        Drop expired rows and trim the file back to max_disk_entries (oldest first)
+        """
+        if not self.path:
+            return 0
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+        self._count("expirations", removed)
+
+        overflow = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY created_at LIMIT ?)",
+                (overflow,),
+            )
+            self._count("evictions", overflow)
+            removed += overflow
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            self._connection().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        if self.path:
+            try:
+                stats["disk_entries"] = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            except sqlite3.Error:
+                stats["disk_entries"] = None
+        return stats
@@ -0,0 +1,206 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field, replace
+import math
+import re
+import threading
+import time
+
+INTENTS = ("lookup", "grammar", "conversation", "correction", "general")
+
+# Lookups don't need the full tutor persona - a short prompt keeps prompt processing (and the reply) small
+LOOKUP_SYSTEM_PROMPT = (
+    "You are FluentBot, a language learning assistant. Answer word and phrase lookups in at most three short lines: "
+    "the translation in native script, romanization if the language uses another script, a pronunciation guide, "
+    "and one short example only if it helps."
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    How one kind of request is sent: which models to try (in order), how long a reply
+    may be and how much of the conversation goes with it
+    """
+    intent: str
+    prefer: Tuple[str, ...] = ()          # preferred models, best first; the rest of the chain follows
+    max_tokens: int = 1000
+    history_turns: Optional[int] = None   # newest turns considered for the context (None = all)
+    context_tokens: Optional[int] = None  # context budget (None = the backend's FLUENTBOT_CONTEXT_TOKENS)
+    latency_target: float = 5.0           # models slower than this (moving average) lose their place
+    deadline_seconds: Optional[float] = None
+    system_prompt: Optional[str] = None   # None = the full FluentBot system prompt
+    models: Tuple[str, ...] = field(default=(), compare=False)  # filled in per request by the router
+
+
+ROUTES: Dict[str, Route] = {
+    "lookup": Route("lookup", prefer=("meta-llama/llama-3.1-8b-instruct", "openai/gpt-4o-mini"), max_tokens=150,
+                    history_turns=0, context_tokens=600, latency_target=1.0, deadline_seconds=10,
+                    system_prompt=LOOKUP_SYSTEM_PROMPT),
+    "grammar": Route("grammar", prefer=("openai/gpt-4o-mini",), max_tokens=700, history_turns=4,
+                     context_tokens=2000, latency_target=4.0),
+    "conversation": Route("conversation", prefer=("openai/gpt-3.5-turbo", "openai/gpt-4o-mini"), max_tokens=300,
+                          latency_target=2.5),
+    "correction": Route("correction", prefer=("openai/gpt-4o-mini",), max_tokens=1200, history_turns=2,
+                        context_tokens=3000, latency_target=8.0),
+    "general": Route("general"),
+}
+
+_LOOKUP = re.compile(
+    r"^\W*(?:how (?:do|would|can|should) (?:i|you|we) (?:say|write|spell|pronounce)|how to (?:say|write|spell|pronounce)"
+    r"|what(?:'s| is| are| does)\b.{0,40}\b(?:in|mean|means)\b|translate\b|meaning of\b|(?:the )?words? for\b"
+    r"|what does\b|define\b|spell\b|pronounce\b)",
+    re.IGNORECASE,
+)
+_GRAMMAR = re.compile(
+    r"\b(?:grammar|conjugat\w*|tenses?|subjunctive|imperative|preterite|imperfect|infinitive|participle|gerund"
+    r"|articles?|gender|plural|declension|cases?|particles?|pronouns?|prepositions?|adjective agreement|word order"
+    r"|difference between|when (?:do|should|to) (?:i |you )?use|why (?:is|do|does)|explain|rule)\b",
+    re.IGNORECASE,
+)
+_CORRECTION = re.compile(
+    r"\b(?:correct|corrections?|check|proofread|fix|mistakes?|errors?|review|improve|edit)\b",
+    re.IGNORECASE,
+)
+_CONVERSATION = re.compile(
+    r"\b(?:let'?s (?:talk|chat|practi[cs]e|speak)|role[- ]?play|chat with me|talk to me|conversation|pretend (?:to be|you)"
+    r"|practi[cs]e (?:speaking|talking|with me))\b",
+    re.IGNORECASE,
+)
+# A short message with none of these is most likely the learner writing in the target language
+_ENGLISH_WORDS = frozenset(
+    # (short words that are also common in other languages - "a", "me", "in", "do" - are left out)
+    "the an is are am was were does did i you it this that what how why when where can could would should "
+    "my your to of for and or with about please not have give tell show help want need some".split()
+)
+
+
+def classify_intent(text: str) -> str:
+    """
+    Local (no API call) guess at what a learner's message is asking for - one of INTENTS
+    """
+    words = re.findall(r"[^\W\d_]+(?:'[^\W\d_]+)?", text.lower())
+    count = len(words)
+    if count >= 80 or (count >= 15 and _CORRECTION.search(text)):
+        return "correction"
+    if _CONVERSATION.search(text):
+        return "conversation"
+    if count <= 40 and _GRAMMAR.search(text):
+        return "grammar"
+    if 0 < count <= 12 and _LOOKUP.search(text):
+        return "lookup"
+    if 0 < count <= 30 and not _ENGLISH_WORDS.intersection(words):
+        return "conversation"
+    return "general"
+
+
+class _ModelStats:
+    __slots__ = ("latency", "error_rate", "samples", "failures", "updated")
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.failures = 0
+        self.updated = time.monotonic()
+
+
+class ModelRouter:
+    """
+    Picks a Route for each message and orders its models by what was observed recently.
+
+    Every upstream attempt feeds an exponential moving average of latency (successes only)
+    and of error rate per (route, model) - a 150-token lookup is judged against other
+    lookups, not 1200-token corrections. A model keeps its preferred place in a route while
+    it meets the route's latency target and stays under `max_error_rate`; otherwise it drops
+    behind the healthy ones, which are ranked by latency weighted by errors. Error rates decay
+    with `recovery_seconds` half-life, so a demoted model gets another chance later.
+    """
+
+    def __init__(self, models: Sequence[str], routes: Optional[Dict[str, Route]] = None, enabled: bool = True,
+                 alpha: float = 0.2, max_error_rate: float = 0.3, error_penalty: float = 4.0,
+                 recovery_seconds: float = 60.0):
+        self.models = list(models)
+        self.routes = dict(routes or ROUTES)
+        self.enabled = enabled
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.error_penalty = error_penalty
+        self.recovery_seconds = recovery_seconds
+
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], _ModelStats] = {}
+        self.counters = {intent: 0 for intent in self.routes}
+
+    def observe(self, intent: str, model: str, seconds: float, error: Optional[Exception] = None):
+        """
+        Record one upstream attempt made for a route - ResilientCaller's on_attempt hook with
+        the intent bound (rate-limiter waits and their timeouts are never reported here)
+        """
+        with self._lock:
+            key = (intent, model)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _ModelStats()
+            stats.error_rate = self._decayed_error(stats)
+            stats.error_rate += self.alpha * ((1.0 if error is not None else 0.0) - stats.error_rate)
+            if error is None:
+                stats.latency = seconds if stats.latency is None else stats.latency + self.alpha * (seconds - stats.latency)
+            else:
+                stats.failures += 1
+            stats.samples += 1
+            stats.updated = time.monotonic()
+
+    def _decayed_error(self, stats: _ModelStats) -> float:
+        age = time.monotonic() - stats.updated
+        return stats.error_rate * math.pow(0.5, age / self.recovery_seconds)
+
+    def route(self, text: str) -> Route:
+        """
+        The route for `text` with its model chain ordered for right now
+        """
+        intent = classify_intent(text) if self.enabled else "general"
+        route = self.routes.get(intent) or self.routes["general"]
+        with self._lock:
+            self.counters[route.intent] = self.counters.get(route.intent, 0) + 1
+            models = self._order(route)
+        return replace(route, models=tuple(models))
+
+    def _order(self, route: Route) -> List[str]:
+        # Caller holds the lock. Preferred models outside the configured chain are ignored.
+        chain = [m for m in route.prefer if m in self.models]
+        chain += [m for m in self.models if m not in chain]
+        healthy, slow = [], []
+        for model in chain:
+            stats = self._stats.get((route.intent, model))
+            if stats is None:
+                healthy.append(model)
+                continue
+            error_rate = self._decayed_error(stats)
+            latency = stats.latency if stats.latency is not None else route.latency_target
+            if error_rate <= self.max_error_rate and latency <= route.latency_target:
+                healthy.append(model)
+            else:
+                slow.append((latency * (1 + self.error_penalty * error_rate), model))
+        return healthy + [model for _, model in sorted(slow)]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            routes = {
+                intent: {
+                    "requests": self.counters.get(intent, 0),
+                    "max_tokens": route.max_tokens,
+                    "latency_target": route.latency_target,
+                    "models": self._order(route),
+                    "observed": {
+                        model: {
+                            "latency_seconds": round(stats.latency, 3) if stats.latency is not None else None,
+                            "error_rate": round(self._decayed_error(stats), 3),
+                            "samples": stats.samples,
+                            "failures": stats.failures,
+                        }
+                        for (route_intent, model), stats in self._stats.items() if route_intent == intent
+                    },
+                }
+                for intent, route in self.routes.items()
+            }
+        return {"enabled": self.enabled, "routes": routes}
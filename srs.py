@@ -0,0 +1,259 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+DAY = 86400.0
+
+# A lapsed card comes back within the same sitting before moving on to day intervals
+RELEARN_SECONDS = 600.0
+
+MIN_EASE = 1.3
+START_EASE = 2.5
+
+
+class Card:
+    """
+    SM-2 state for one word (card_id is the vocab store word id)
+    """
+
+    __slots__ = ("card_id", "ease", "interval_days", "reps", "lapses", "due", "last_review")
+
+    def __init__(self, card_id: int, due: float, ease: float = START_EASE, interval_days: float = 0.0,
+                 reps: int = 0, lapses: int = 0, last_review: Optional[float] = None):
+        self.card_id = card_id
+        self.ease = ease
+        self.interval_days = interval_days
+        self.reps = reps
+        self.lapses = lapses
+        self.due = due
+        self.last_review = last_review
+
+    def as_row(self) -> tuple:
+        return (self.card_id, self.ease, self.interval_days, self.reps, self.lapses, self.due, self.last_review)
+
+
+def sm2(card: Card, grade: int, now: float):
+    """
+    Apply one SM-2 review: grade 0-5, where 3+ counts as remembered. A correct answer
+    before the card is due only reschedules it (see below); a wrong one is always a lapse.
+    """
+    if not 0 <= grade <= 5:
+        raise ValueError("grade must be between 0 and 5")
+    if grade >= 3:
+        if card.reps == 0:
+            interval = 1.0
+        elif card.reps == 1:
+            interval = 6.0
+        else:
+            interval = card.interval_days * card.ease
+        if card.reps and now < card.due and card.interval_days:
+            # Reviewed ahead: grow only by the share of the interval that has passed, and leave
+            # ease / reps alone - remembering a word seconds after seeing it proves little
+            elapsed = now - (card.last_review if card.last_review is not None else now)
+            share = min(max(elapsed / (card.interval_days * DAY), 0.0), 1.0)
+            card.interval_days = round(card.interval_days + (interval - card.interval_days) * share, 2)
+            card.due = now + card.interval_days * DAY
+            card.last_review = now
+            return
+        card.interval_days = round(interval, 2)
+        card.reps += 1
+        card.due = now + card.interval_days * DAY
+    else:
+        card.reps = 0
+        card.lapses += 1
+        card.interval_days = 0.0
+        card.due = now + RELEARN_SECONDS
+    card.ease = max(MIN_EASE, card.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    card.last_review = now
+
+
+class SrsScheduler:
+    """
+    One learner's cards, indexed by a min-heap on due time.
+
+    Reviews push a fresh heap entry and leave the old one behind; stale entries are
+    skipped when they reach the top. So the next card and each review cost O(log n),
+    and the heap is compacted once stale entries outnumber live ones.
+    """
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self.cards: Dict[int, Card] = {}
+        self._heap: List[tuple] = []
+        self.reviews = 0
+        self.correct = 0
+        self.last_activity: Optional[float] = None
+        for card in cards:
+            self.cards[card.card_id] = card
+            if card.last_review is not None and (self.last_activity is None or card.last_review > self.last_activity):
+                self.last_activity = card.last_review
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __contains__(self, card_id: int) -> bool:
+        return card_id in self.cards
+
+    def _rebuild(self):
+        self._heap = [(card.due, card.card_id) for card in self.cards.values()]
+        heapq.heapify(self._heap)
+
+    def _push(self, card: Card):
+        heapq.heappush(self._heap, (card.due, card.card_id))
+        if len(self._heap) > 2 * len(self.cards) + 64:
+            self._rebuild()
+
+    def _peek(self) -> Optional[Card]:
+        heap = self._heap
+        while heap:
+            due, card_id = heap[0]
+            card = self.cards.get(card_id)
+            if card is not None and card.due == due:
+                return card
+            heapq.heappop(heap)
+        return None
+
+    def add(self, card_id: int, now: Optional[float] = None) -> Card:
+        """
+        Start tracking a new word (due immediately); returns the existing card if already tracked
+        """
+        card = self.cards.get(card_id)
+        if card is None:
+            card = Card(card_id, due=time.time() if now is None else now)
+            self.cards[card_id] = card
+            self._push(card)
+        return card
+
+    def next_due(self, now: Optional[float] = None) -> Optional[Card]:
+        """
+        The most overdue card, or None if nothing is due yet
+        """
+        card = self._peek()
+        if card is None or card.due > (time.time() if now is None else now):
+            return None
+        return card
+
+    def next_upcoming(self) -> Optional[Card]:
+        """
+        The card due soonest, even if it isn't due yet (for reviewing ahead)
+        """
+        return self._peek()
+
+    def review(self, card_id: int, grade: int, now: Optional[float] = None) -> Card:
+        """
+        Record an answer and reschedule the card
+        """
+        now = time.time() if now is None else now
+        card = self.add(card_id, now)
+        sm2(card, grade, now)
+        self._push(card)
+        self.reviews += 1
+        self.correct += grade >= 3
+        self.last_activity = now
+        return card
+
+    def reschedule_overdue(self, now: Optional[float] = None, spread_days: float = 7.0) -> int:
+        """
+        Spread every overdue card over the next `spread_days`, most overdue first, so a
+        learner coming back from a break isn't buried under one day's backlog.
+        Returns the number of cards moved.
+        """
+        now = time.time() if now is None else now
+        overdue = sorted((card for card in self.cards.values() if card.due <= now), key=lambda card: card.due)
+        if not overdue:
+            return 0
+        step = spread_days * DAY / len(overdue)
+        for index, card in enumerate(overdue):
+            card.due = now + index * step
+        self._rebuild()
+        return len(overdue)
+
+    def catch_up(self, now: Optional[float] = None, break_days: float = 3.0, spread_days: float = 7.0) -> int:
+        """
+        Bulk reschedule when the learner has been away for more than `break_days`
+        """
+        now = time.time() if now is None else now
+        if self.last_activity is None or now - self.last_activity < break_days * DAY:
+            return 0
+        self.last_activity = now
+        return self.reschedule_overdue(now, spread_days)
+
+    def stats(self, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        due = sum(1 for card in self.cards.values() if card.due <= now)
+        return {
+            "cards": len(self.cards),
+            "due": due,
+            "reviews": self.reviews,
+            "accuracy": round(self.correct / self.reviews, 3) if self.reviews else 0.0,
+            "mature": sum(1 for card in self.cards.values() if card.interval_days >= 21),
+        }
+
+
+class CardStore:
+    """
+    Every learner's cards in one SQLite file (WAL mode, shared by every worker process),
+    keyed by (learner, language, level, word) so they outlive the session. The word, not
+    its id, is the key: ids change when the vocab store is rebuilt.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, so each thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cards ("
+                "learner TEXT NOT NULL, language TEXT NOT NULL, level TEXT NOT NULL, word TEXT NOT NULL, "
+                "card_id INTEGER NOT NULL, ease REAL NOT NULL, interval_days REAL NOT NULL, reps INTEGER NOT NULL, "
+                "lapses INTEGER NOT NULL, due REAL NOT NULL, last_review REAL, "
+                "PRIMARY KEY (learner, language, level, word)) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+        return conn
+
+    def load(self, learner: str, language: str, level: str) -> List[Tuple[str, Card]]:
+        """
+        (word, card) for each of the learner's cards in one language / level
+        """
+        return self._select("", (learner, language, level))
+
+    def load_due(self, learner: str, language: str, level: str, now: float) -> List[Tuple[str, Card]]:
+        """
+        (word, card) for the learner's cards in one language / level that are due by `now`
+        """
+        return self._select(" AND due <= ?", (learner, language, level, now))
+
+    def _select(self, condition: str, params: tuple) -> List[Tuple[str, Card]]:
+        rows = self._connection().execute(
+            "SELECT word, card_id, ease, interval_days, reps, lapses, due, last_review FROM cards "
+            "WHERE learner = ? AND language = ? AND level = ?" + condition,
+            params,
+        ).fetchall()
+        return [(row[0], Card(row[1], row[6], ease=row[2], interval_days=row[3], reps=row[4], lapses=row[5],
+                              last_review=row[7])) for row in rows]
+
+    def save(self, learner: str, language: str, level: str, cards: Iterable[Tuple[str, Card]]):
+        """
+        Insert or update (word, card) pairs in one transaction
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO cards (learner, language, level, word, card_id, ease, interval_days, reps, "
+                "lapses, due, last_review) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(learner, language, level, word) + card.as_row() for word, card in cards],
+            )
@@ -0,0 +1,349 @@
+# Indexed vocabulary store for the quiz - one SQLite file, rows clustered by language / level / topic
+#
+#   python vocab_store.py                                # rebuild content/vocab.db from the lesson pack + built-in words
+#   python vocab_store.py --csv words.csv --out content/vocab.db
+#                                                        # CSV columns: language,level,topic,word,translation,pronunciation
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import csv
+import math
+import os
+import random
+import sqlite3
+import sys
+import threading
+
+from content_pack import LEVELS, load_content_pack, plain_name
+
+VOCAB_STORE_VERSION = 1
+
+DEFAULT_VOCAB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "vocab.db")
+
+# Starter words so the quiz works before any pack has been generated
+BUILTIN_VOCAB = {
+    ("French", "Beginner"): [
+        ("greetings", "Bonjour", "Hello/Good morning", "bon-ZHOOR"),
+        ("courtesy", "Merci", "Thank you", "mer-SEE"),
+        ("greetings", "Au revoir", "Goodbye", "oh ruh-VWAHR"),
+        ("courtesy", "S'il vous plaît", "Please", "see voo PLEH"),
+        ("courtesy", "Excusez-moi", "Excuse me", "ex-kew-ZAY mwah"),
+        ("introductions", "Je m'appelle", "My name is", "zhuh mah-PELL"),
+        ("greetings", "Comment allez-vous?", "How are you?", "koh-mahn tah-lay VOO"),
+        ("basics", "Oui", "Yes", "WEE"),
+        ("basics", "Non", "No", "nohn"),
+        ("courtesy", "Pardon", "Sorry/Pardon", "par-DOHN"),
+    ],
+    ("Spanish", "Beginner"): [
+        ("greetings", "Hola", "Hello", "OH-lah"),
+        ("courtesy", "Gracias", "Thank you", "GRAH-see-ahs"),
+        ("greetings", "Adiós", "Goodbye", "ah-DYOHS"),
+        ("courtesy", "Por favor", "Please", "por fah-VOR"),
+        ("courtesy", "Perdón", "Excuse me/Sorry", "per-DOHN"),
+    ],
+}
+
+LEVEL_ORDER = [plain_name(label) for label in LEVELS]
+
+
+def builtin_entries() -> Iterable[Dict]:
+    for (language, level), words in BUILTIN_VOCAB.items():
+        for topic, word, translation, pronunciation in words:
+            yield {"language": language, "level": level, "topic": topic, "word": word,
+                   "translation": translation, "pronunciation": pronunciation}
+
+
+def pack_entries(pack: Optional[Dict]) -> Iterable[Dict]:
+    """
+    Vocabulary sections of a lesson pack (see generate_content_packs.py) as store entries
+    """
+    if not pack:
+        return
+    for language, levels in pack["content"].items():
+        for level, sections in levels.items():
+            for entry in sections.get("vocab") or []:
+                yield {"language": language, "level": level, "topic": entry.get("topic") or "general",
+                       "word": entry["word"], "translation": entry["translation"],
+                       "pronunciation": entry.get("pronunciation", "")}
+
+
+def csv_entries(path: str) -> Iterable[Dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {key: (row.get(key) or "").strip() for key in
+                   ("language", "level", "topic", "word", "translation", "pronunciation")}
+
+
+def build_vocab_store(entries: Iterable[Dict], path: str = DEFAULT_VOCAB_PATH) -> int:
+    """
+    Write a fresh store atomically. Rows are sorted by (language, level, topic) so every
+    language / level / topic slice is a contiguous id range. Returns the number of words.
+    """
+    rows = {}
+    for entry in entries:
+        language, level = plain_name(entry["language"]), plain_name(entry["level"])
+        word = entry["word"].strip()
+        if not word or not entry["translation"].strip():
+            continue
+        topic = (entry.get("topic") or "general").strip().lower()
+        # Later sources override earlier ones for the same word
+        rows[(language, level, word.casefold())] = (language, level, topic, word, entry["translation"].strip(),
+                                                    (entry.get("pronunciation") or "").strip())
+    ordered = sorted(rows.values(), key=lambda row: (row[0], row[1], row[2], row[3].casefold()))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Per-process temp name - several app workers may rebuild the same fallback store at once
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(f"""
+            PRAGMA user_version = {VOCAB_STORE_VERSION};
+            CREATE TABLE words (
+                id INTEGER PRIMARY KEY, language TEXT NOT NULL, level TEXT NOT NULL, topic TEXT NOT NULL,
+                word TEXT NOT NULL, translation TEXT NOT NULL, pronunciation TEXT NOT NULL
+            );
+            CREATE TABLE slices (
+                language TEXT NOT NULL, level TEXT NOT NULL, topic TEXT NOT NULL,
+                first_id INTEGER NOT NULL, count INTEGER NOT NULL,
+                PRIMARY KEY (language, level, topic)
+            ) WITHOUT ROWID;
+        """)
+        conn.executemany(
+            "INSERT INTO words (id, language, level, topic, word, translation, pronunciation) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((index, *row) for index, row in enumerate(ordered, start=1)),
+        )
+        # topic "" is the whole language / level
+        conn.execute("""
+            INSERT INTO slices SELECT language, level, topic, MIN(id), COUNT(*) FROM words GROUP BY language, level, topic
+        """)
+        conn.execute("""
+            INSERT INTO slices SELECT language, level, '', MIN(id), COUNT(*) FROM words GROUP BY language, level
+        """)
+        conn.execute("CREATE INDEX words_lookup ON words (language, word COLLATE NOCASE)")
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return len(ordered)
+
+
+class VocabDeck:
+    """
+    Shuffled walk over one slice without storing the shuffle: position i maps to
+    first_id + (a*i + b) mod count with gcd(a, count) = 1, so every word comes up once per pass.
+    A deck is a few integers - cheap to keep in each session's state.
+    """
+
+    __slots__ = ("language", "level", "topic", "first_id", "count", "_a", "_b", "position")
+
+    def __init__(self, language: str, level: str, topic: str, first_id: int, count: int,
+                 rng: Optional[random.Random] = None):
+        self.language = language
+        self.level = level
+        self.topic = topic
+        self.first_id = first_id
+        self.count = count
+        self.position = 0
+        self._reshuffle(rng or random)
+
+    def _reshuffle(self, rng):
+        self._b = rng.randrange(self.count)
+        self._a = 1
+        if self.count > 2:
+            while True:
+                a = rng.randrange(1, self.count)
+                if math.gcd(a, self.count) == 1:
+                    self._a = a
+                    break
+
+    def next_id(self) -> int:
+        if self.position >= self.count:
+            # Every word has been seen - start a new pass in a different order
+            self.position = 0
+            self._reshuffle(random)
+        word_id = self.first_id + (self._a * self.position + self._b) % self.count
+        self.position += 1
+        return word_id
+
+    @property
+    def remaining(self) -> int:
+        return self.count - self.position
+
+
+class VocabStore:
+    """
+    Read-only access to a store built by build_vocab_store. Nothing is loaded up front:
+    slices are id ranges and words are fetched one primary-key lookup at a time.
+    """
+
+    def __init__(self, path: str = DEFAULT_VOCAB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, so each thread opens its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            # Memory-mapped reads share one copy of the file between sessions and processes
+            conn.execute("PRAGMA mmap_size = 67108864")
+            conn.execute("PRAGMA cache_size = -256")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @property
+    def available(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            return self._connection().execute("PRAGMA user_version").fetchone()[0] == VOCAB_STORE_VERSION
+        except sqlite3.Error:
+            return False
+
+    def _slice(self, language: str, level: str, topic: str = "") -> Optional[Tuple[int, int]]:
+        row = self._connection().execute(
+            "SELECT first_id, count FROM slices WHERE language = ? AND level = ? AND topic = ?",
+            (plain_name(language), plain_name(level), (topic or "").lower()),
+        ).fetchone()
+        return (row["first_id"], row["count"]) if row else None
+
+    def count(self, language: str, level: str, topic: str = "") -> int:
+        found = self._slice(language, level, topic)
+        return found[1] if found else 0
+
+    def topics(self, language: str, level: str) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT topic FROM slices WHERE language = ? AND level = ? AND topic != '' ORDER BY topic",
+            (plain_name(language), plain_name(level)),
+        ).fetchall()
+        return [row["topic"] for row in rows]
+
+    def levels_with_words(self, language: str) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT level FROM slices WHERE language = ? AND topic = ''", (plain_name(language),)
+        ).fetchall()
+        found = {row["level"] for row in rows}
+        return [level for level in LEVEL_ORDER if level in found]
+
+    def deck(self, language: str, level: str, topic: str = "", rng: Optional[random.Random] = None) -> Optional[VocabDeck]:
+        found = self._slice(language, level, topic)
+        if not found:
+            return None
+        return VocabDeck(plain_name(language), plain_name(level), (topic or "").lower(), *found, rng=rng)
+
+    def deck_with_fallback(self, language: str, level: str, topic: str = "") -> Optional[VocabDeck]:
+        """
+        Deck for this level, else the nearest level of the same language that has words
+        """
+        deck = self.deck(language, level, topic)
+        if deck is not None:
+            return deck
+        levels = self.levels_with_words(language)
+        if not levels:
+            return None
+        wanted = LEVEL_ORDER.index(plain_name(level)) if plain_name(level) in LEVEL_ORDER else 0
+        nearest = min(levels, key=lambda name: (abs(LEVEL_ORDER.index(name) - wanted), LEVEL_ORDER.index(name)))
+        return self.deck(language, nearest)
+
+    def get(self, word_id: int) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT id, language, level, topic, word, translation, pronunciation FROM words WHERE id = ?", (word_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_many(self, word_ids: Iterable[int]) -> Dict[int, Dict]:
+        """
+        Entries by id for every id that exists, a few round trips however many are asked for
+        """
+        ids = list(dict.fromkeys(word_ids))
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(ids), 500):  # under SQLite's bound-parameter limit
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                "SELECT id, language, level, topic, word, translation, pronunciation FROM words "
+                f"WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update((row["id"], dict(row)) for row in rows)
+        return found
+
+    def draw(self, deck: VocabDeck) -> Optional[Dict]:
+        return self.get(deck.next_id())
+
+    def sample(self, language: str, level: str, k: int, topic: str = "") -> List[Dict]:
+        """
+        Up to k distinct random words from one slice
+        """
+        found = self._slice(language, level, topic)
+        if not found:
+            return []
+        first_id, count = found
+        ids = [first_id + offset for offset in random.sample(range(count), min(k, count))]
+        placeholders = ",".join("?" * len(ids))
+        rows = self._connection().execute(
+            f"SELECT id, language, level, topic, word, translation, pronunciation FROM words WHERE id IN ({placeholders})",
+            ids,
+        ).fetchall()
+        by_id = {row["id"]: dict(row) for row in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def lookup(self, language: str, word: str) -> List[Dict]:
+        """
+        Entries for `word` in `language` (case-insensitive), across levels
+        """
+        rows = self._connection().execute(
+            "SELECT id, language, level, topic, word, translation, pronunciation FROM words "
+            "WHERE language = ? AND word = ? COLLATE NOCASE",
+            (plain_name(language), word.strip()),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def entries(self) -> Iterable[Dict]:
+        """
+        Every word in the store, in id order
+        """
+        rows = self._connection().execute(
+            "SELECT language, level, topic, word, translation, pronunciation FROM words ORDER BY id"
+        )
+        for row in rows:
+            yield dict(row)
+
+    def stats(self) -> Dict:
+        conn = self._connection()
+        return {
+            "words": conn.execute("SELECT COUNT(*) FROM words").fetchone()[0],
+            "languages": conn.execute("SELECT COUNT(DISTINCT language) FROM slices").fetchone()[0],
+            "slices": conn.execute("SELECT COUNT(*) FROM slices WHERE topic != ''").fetchone()[0],
+            "file_bytes": os.path.getsize(self.path),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the FluentBot vocabulary store")
+    parser.add_argument("--out", default=DEFAULT_VOCAB_PATH, help="Where to write the store")
+    parser.add_argument("--pack", default=None, help="Lesson pack to take vocab sections from (default: content/lesson_pack.json.gz)")
+    parser.add_argument("--csv", nargs="*", default=[], help="Extra word lists (language,level,topic,word,translation,pronunciation)")
+    args = parser.parse_args()
+
+    pack = load_content_pack(args.pack) if args.pack else load_content_pack()
+
+    def entries():
+        yield from builtin_entries()
+        yield from pack_entries(pack)
+        for path in args.csv:
+            yield from csv_entries(path)
+
+    total = build_vocab_store(entries(), args.out)
+    stats = VocabStore(args.out).stats()
+    print(f"Wrote {args.out}: {total} words, {stats['languages']} languages, {stats['slices']} topic slices, "
+          f"{stats['file_bytes'] / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())